@@ -0,0 +1,56 @@
+"""
+Compares the binary MessageCodec against the JSON serialization of Message.
+
+Run from src/: python -m benchmarks.codec_benchmark
+"""
+import json
+import random
+import time
+from robot.codec import MessageCodec
+from robot.drone import Message, Position, State
+from scenario import SCENARIO_DICT
+
+def make_message(num_states: int, rng: random.Random) -> Message:
+    message = Message()
+    for id in range(num_states):
+        inference_result = rng.choice(["", "The drone should move to the region up.", "Move right toward the trapped person."])
+        state = State(id, Position(rng.randint(0, 999), rng.randint(0, 999)), rng.choice(list(SCENARIO_DICT.values())), inference_result)
+        message.add_state(id, state)
+    return message
+
+def time_per_call(function, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+def benchmark_codec(num_states: int = 100, repeats: int = 200, seed: int = 0) -> list[dict]:
+    """Encoded size and encode/decode time per message for JSON and the binary codec."""
+    message = make_message(num_states, random.Random(seed))
+    serialized = Message.serialize_to_string(message)
+    results = [{
+        "format": "json",
+        "num_states": num_states,
+        "bytes": len(serialized.encode("utf-8")),
+        "encode_seconds": time_per_call(lambda: Message.serialize_to_string(message), repeats),
+        "decode_seconds": time_per_call(lambda: Message.deserialize_from_string(serialized), repeats),
+    }]
+    for compress in (False, True):
+        codec = MessageCodec(SCENARIO_DICT.values(), compress=compress)
+        encoded = codec.encode(message)
+        results.append({
+            "format": "binary+zlib" if compress else "binary",
+            "num_states": num_states,
+            "bytes": len(encoded),
+            "encode_seconds": time_per_call(lambda: codec.encode(message), repeats),
+            "decode_seconds": time_per_call(lambda: codec.decode(encoded), repeats),
+        })
+    return results
+
+def main():
+    for num_states in (1, 10, 100, 1000):
+        for result in benchmark_codec(num_states, repeats=max(10, 2000 // num_states)):
+            print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
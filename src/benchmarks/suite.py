@@ -0,0 +1,208 @@
+"""
+Benchmark suite for the simulation hot paths. Every benchmark is seeded and uses a local
+planner, so results are reproducible and need no network access.
+
+Prints one JSON object per line, each tagged with the name of its benchmark.
+Run from src/: python -m benchmarks.suite [--quick]
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+from benchmarks.codec_benchmark import benchmark_codec, make_message, time_per_call
+from events import EventSimulator
+from robot.drone import GridMap, Position
+from perception import random_events
+from robot.pathing import PathPlanner
+from robot.planning import ConcurrentPlanner, FakePlanner
+from simulator import Simulator, make_drones
+
+class StubPlanner:
+    """Answers instantly, so tick benchmarks measure the simulation and not the planner."""
+    @staticmethod
+    def execute_prompt(prompt: str) -> str:
+        return "The drone should move to the region up."
+
+def quiet(function, *args, **kwargs):
+    """Calls function without the per-drone prints of the constructors."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+def benchmark_ticks(num_drones: int, map_dimensions, region_dimensions=(3, 3), n_ticks: int = 50, vectorized: bool = False, seed: int = 0) -> dict:
+    """Tick throughput of a full Simulator run."""
+    simulator = quiet(Simulator, map_dimensions, region_dimensions, num_drones, planner=StubPlanner, vectorized=vectorized, seed=seed)
+    start = time.perf_counter()
+    simulator.run(n_ticks)
+    elapsed = time.perf_counter() - start
+    return {
+        "benchmark": "ticks",
+        "num_drones": num_drones,
+        "map_dimensions": list(map_dimensions),
+        "vectorized": vectorized,
+        "n_ticks": n_ticks,
+        "ticks_per_second": n_ticks / elapsed,
+        "seconds_per_tick": elapsed / n_ticks,
+    }
+
+def benchmark_events(num_drones: int, map_dimensions, region_dimensions=(10, 10), n_ticks: int = 20, seed: int = 0) -> list[dict]:
+    """Simulated ticks per second of the lock-step Simulator against the EventSimulator on the same sparse map."""
+    results = []
+    for name, core in (("lockstep", Simulator), ("event_driven", EventSimulator)):
+        simulator = quiet(core, map_dimensions, region_dimensions, num_drones, planner=StubPlanner, seed=seed)
+        start = time.perf_counter()
+        simulator.run(n_ticks)
+        elapsed = time.perf_counter() - start
+        if core is EventSimulator:
+            simulator.close()
+        results.append({
+            "benchmark": "events",
+            "core": name,
+            "num_drones": num_drones,
+            "map_dimensions": list(map_dimensions),
+            "n_ticks": n_ticks,
+            "ticks_per_second": n_ticks / elapsed,
+        })
+    return results
+
+def benchmark_grid_map(map_dimensions, region_dimensions=(3, 3), repeats: int = 2000, seed: int = 0) -> dict:
+    """Time per call of the GridMap queries the drones make while moving and planning."""
+    rng = random.Random(seed)
+    grid_map = GridMap(map_dimensions, region_dimensions)
+    for _ in range(map_dimensions[0] * map_dimensions[1]):
+        grid_map.visit_cell(Position(rng.randrange(map_dimensions[0]), rng.randrange(map_dimensions[1])))
+    positions = [Position(rng.randrange(map_dimensions[0]), rng.randrange(map_dimensions[1])) for _ in range(repeats)]
+    regions = [grid_map.get_region(position) for position in positions]
+    return {
+        "benchmark": "grid_map",
+        "map_dimensions": list(map_dimensions),
+        "region_dimensions": list(region_dimensions),
+        "visit_cell_seconds": time_per_call(lambda: [grid_map.visit_cell(position) for position in positions], 1) / repeats,
+        "get_region_seconds": time_per_call(lambda: [grid_map.get_region(position) for position in positions], 1) / repeats,
+        "region_exploration_score_seconds": time_per_call(lambda: [grid_map.region_exploration_score(x, y) for y, x in regions], 1) / repeats,
+        "least_visited_cell_seconds": time_per_call(lambda: [grid_map.get_position_of_least_visited_cell_in_region(region) for region in regions], 1) / repeats,
+    }
+
+def benchmark_message(num_states: int, repeats: int = 200, seed: int = 0) -> dict:
+    """Time per call of the JSON round trip and of prompt construction for a message."""
+    message = make_message(num_states, random.Random(seed))
+    serialized = message.serialize_to_string(message)
+    return {
+        "benchmark": "message",
+        "num_states": num_states,
+        "serialize_seconds": time_per_call(lambda: message.serialize_to_string(message), repeats),
+        "deserialize_seconds": time_per_call(lambda: message.deserialize_from_string(serialized), repeats),
+        "get_prompt_seconds": time_per_call(lambda: message.get_prompt(0), repeats),
+        "prompt_chars": len(message.get_prompt(0)),
+    }
+
+def benchmark_perception(num_events: int, num_drones: int, sensor_radius: int, map_dimensions=(1000, 1000), repeats: int = 20, seed: int = 0) -> dict:
+    """Time of one batched detection for all drones against many events."""
+    rng = random.Random(seed)
+    engine = random_events(map_dimensions, num_events, rng, sensor_radius=sensor_radius)
+    positions = [(rng.randrange(map_dimensions[0]), rng.randrange(map_dimensions[1])) for _ in range(num_drones)]
+    engine.nearest(positions)
+    return {
+        "benchmark": "perception",
+        "num_events": num_events,
+        "num_drones": num_drones,
+        "sensor_radius": sensor_radius,
+        "map_dimensions": list(map_dimensions),
+        "seconds_per_tick": time_per_call(lambda: engine.nearest(positions), repeats),
+    }
+
+def benchmark_pathing(map_dimensions, num_drones: int, num_targets: int, region_dimensions=(10, 10), obstacle_fraction: float = 0.1, seed: int = 0) -> dict:
+    """Time of the first batched path step (computing the fields) and of a step from the cache."""
+    rng = random.Random(seed)
+    planner = PathPlanner(map_dimensions, region_dimensions)
+    cells = map_dimensions[0] * map_dimensions[1]
+    planner.set_obstacles([divmod(cell, map_dimensions[1]) for cell in rng.sample(range(cells), int(cells * obstacle_fraction))])
+    positions = [(rng.randrange(map_dimensions[0]), rng.randrange(map_dimensions[1])) for _ in range(num_drones)]
+    hotspots = [(rng.randrange(map_dimensions[0]), rng.randrange(map_dimensions[1])) for _ in range(num_targets)]
+    targets = [hotspots[i % num_targets] for i in range(num_drones)]
+    return {
+        "benchmark": "pathing",
+        "map_dimensions": list(map_dimensions),
+        "num_drones": num_drones,
+        "num_targets": num_targets,
+        "first_step_seconds": time_per_call(lambda: planner.next_steps(positions, targets), 1),
+        "cached_step_seconds": time_per_call(lambda: planner.next_steps(positions, targets), 5),
+        "fields": planner.field_misses,
+    }
+
+def _drones_with_observations(num_drones: int, map_dimensions, region_dimensions, seed: int) -> list:
+    drones = quiet(make_drones, map_dimensions, region_dimensions, num_drones, seed)
+    for drone in drones:
+        drone.observe("there is a trapped person.")
+    return drones
+
+def benchmark_planning(num_drones: int, latency: float, max_concurrency: int = 8, map_dimensions=(30, 30), region_dimensions=(3, 3), seed: int = 0) -> list[dict]:
+    """Wall time of one planning stage for a tick in which every drone calls the planner."""
+    results = []
+    for stage in ("sequential", "concurrent"):
+        drones = _drones_with_observations(num_drones, map_dimensions, region_dimensions, seed)
+        planner = FakePlanner(latency=latency, rng=random.Random(seed))
+        start = time.perf_counter()
+        if stage == "sequential":
+            for drone in drones:
+                drone.update(planner)
+        else:
+            concurrent_planner = ConcurrentPlanner(planner, max_concurrency=max_concurrency)
+            concurrent_planner.update(drones)
+            concurrent_planner.close()
+        elapsed = time.perf_counter() - start
+        results.append({
+            "benchmark": "planning",
+            "stage": stage,
+            "num_drones": num_drones,
+            "latency": latency,
+            "max_concurrency": max_concurrency if stage == "concurrent" else 1,
+            "planner_calls": planner.calls,
+            "seconds_per_tick": elapsed,
+        })
+    return results
+
+def run_suite(quick: bool = False):
+    """Yields the results of every benchmark. `quick` runs smaller sizes, e.g. as a smoke test."""
+    drone_counts = (10, 50) if quick else (10, 50, 100, 200, 400)
+    map_sizes = ((20, 20),) if quick else ((20, 20), (50, 50), (100, 100), (200, 200))
+    n_ticks = 5 if quick else 50
+    for num_drones in drone_counts:
+        for vectorized in (False, True):
+            yield benchmark_ticks(num_drones, (50, 50), n_ticks=n_ticks, vectorized=vectorized)
+    for num_drones in ((200,) if quick else (1000, 5000)):
+        yield from benchmark_events(num_drones, (100, 100) if quick else (500, 500), n_ticks=n_ticks if quick else 20)
+    for map_dimensions in map_sizes:
+        yield benchmark_ticks(50, map_dimensions, n_ticks=n_ticks)
+        yield benchmark_grid_map(map_dimensions, repeats=200 if quick else 2000)
+    for num_states in ((1, 10) if quick else (1, 10, 100, 1000)):
+        yield benchmark_message(num_states, repeats=10 if quick else max(10, 2000 // num_states))
+        for result in benchmark_codec(num_states, repeats=10 if quick else max(10, 2000 // num_states)):
+            yield {"benchmark": "codec", **result}
+    for num_events in ((1000,) if quick else (1000, 10000, 100000)):
+        for sensor_radius in (0, 3):
+            yield benchmark_perception(num_events, 100 if quick else 1000, sensor_radius, repeats=5 if quick else 20)
+    for map_dimensions in (((100, 100),) if quick else ((100, 100), (500, 500))):
+        yield benchmark_pathing(map_dimensions, 100 if quick else 1000, num_targets=4)
+    for num_drones in ((8,) if quick else (8, 32, 128)):
+        yield from benchmark_planning(num_drones, latency=0.001 if quick else 0.01)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="run small sizes only")
+    parser.add_argument("--output", help="also write the results to this JSON lines file")
+    args = parser.parse_args(argv)
+    output = open(args.output, "w") if args.output else None
+    try:
+        for result in run_suite(args.quick):
+            line = json.dumps(result)
+            print(line, flush=True)
+            if output is not None:
+                output.write(line + "\n")
+    finally:
+        if output is not None:
+            output.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Event-driven simulation core.
+
+Instead of stepping every drone through every phase each tick, work is scheduled as timed
+events on a priority queue: drone moves, message deliveries and planner completions.
+
+Gossip only starts when a drone learns something new. It sends its digest to the drones in
+radio range, each receiver requests the versions it does not know and the sender replies
+with just those states. Every message goes through a RadioNetwork with latency, jitter,
+per-radio bandwidth and packet loss. A drone that makes a new observation starts a planner
+request whose answer arrives as a later event, while the simulation goes on. A drone with
+nothing new to share or plan only costs its moves.
+"""
+import heapq
+import itertools
+import random
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from robot.codec import MessageCodec
+from robot.planner import Planner
+from robot.planning import fallback_inference_result
+from robot.pathing import BLOCKING_SCENARIOS, PathPlanner
+from robot.spatial import GridIndex
+from scenario import SCENARIO_DICT
+from simulator import make_drones, make_perception
+
+class Scheduler:
+    """Priority queue of timed callbacks. Events at the same time run in the order they were scheduled."""
+    def __init__(self):
+        self._queue = []
+        self._counter = itertools.count()
+        self.now = 0.0
+        self.processed = 0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def schedule_at(self, time: float, callback, *args) -> list:
+        """Schedules callback(*args) at an absolute time. Returns a handle for cancel()."""
+        assert time >= self.now, "Cannot schedule an event in the past."
+        entry = [time, next(self._counter), callback, args]
+        heapq.heappush(self._queue, entry)
+        return entry
+
+    def schedule(self, delay: float, callback, *args) -> list:
+        return self.schedule_at(self.now + delay, callback, *args)
+
+    @staticmethod
+    def cancel(entry: list) -> None:
+        entry[2] = None
+
+    def _discard_cancelled(self) -> None:
+        while self._queue and self._queue[0][2] is None:
+            heapq.heappop(self._queue)
+
+    def step(self) -> bool:
+        """Runs the next event. Returns False when the queue is empty."""
+        self._discard_cancelled()
+        if not self._queue:
+            return False
+        time, _, callback, args = heapq.heappop(self._queue)
+        self.now = time
+        self.processed += 1
+        callback(*args)
+        return True
+
+    def run_until(self, time: float) -> None:
+        """Runs every event up to and including `time`, then advances the clock to it."""
+        self._discard_cancelled()
+        while self._queue and self._queue[0][0] <= time:
+            self.step()
+            self._discard_cancelled()
+        self.now = max(self.now, time)
+
+class RadioNetwork:
+    """
+    Point-to-point radio links.
+
+    A message is lost with probability `loss`. Otherwise it occupies the sender's radio for
+    size / bandwidth seconds after any earlier transmission of that sender, and arrives
+    latency plus up to `jitter` seconds after its transmission ends.
+    """
+    def __init__(self, scheduler: Scheduler, latency: float = 0.01, jitter: float = 0.0, bandwidth: float | None = None, loss: float = 0.0, rng=None):
+        assert latency >= 0 and jitter >= 0 and 0 <= loss <= 1
+        assert bandwidth is None or bandwidth > 0
+        self.scheduler = scheduler
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.loss = loss
+        self._rng = rng if rng is not None else random.Random()
+        self._busy_until = {}
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.bytes = 0
+
+    def send(self, sender, receiver, size: int, callback, *args) -> bool:
+        """Sends a message of `size` bytes; callback(*args) runs when it is delivered. Returns False if it was lost."""
+        self.sent += 1
+        self.bytes += size
+        if self.loss and self._rng.random() < self.loss:
+            self.dropped += 1
+            return False
+        start = max(self.scheduler.now, self._busy_until.get(sender, 0.0))
+        end = start + (size / self.bandwidth if self.bandwidth is not None else 0.0)
+        self._busy_until[sender] = end
+        delay = end + self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+        self.scheduler.schedule_at(delay, self._deliver, callback, args)
+        return True
+
+    def _deliver(self, callback, args) -> None:
+        self.delivered += 1
+        callback(*args)
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "delivered": self.delivered, "dropped": self.dropped, "bytes": self.bytes}
+
+class EventSimulator:
+    """
+    Event-driven counterpart of Simulator. Time is in ticks: a drone moves once every
+    `move_interval` and the perception events advance once per tick.
+
+    planner_latency is the simulated time a planner answer takes, either a number or a
+    callable taking the random stream. Planner calls run on a thread pool of
+    `max_concurrency` threads while the simulation continues, and their answers are applied
+    at the simulated completion time. A call that raises is answered by the region policy
+    of fallback_inference_result, like in ConcurrentPlanner.
+    """
+    def __init__(self, map_dimensions, region_dimensions, num_drones, communication_threshold=4, planner=Planner, seed=None,
+                 latency: float = 0.01, jitter: float = 0.0, bandwidth: float | None = None, loss: float = 0.0,
+                 planner_latency=1.0, max_concurrency: int = 8, move_interval: float = 1.0, gossip_delay: float = 0.0,
+                 perception=None, path_planner=None, map_counts=None):
+        self._rng = random.Random(seed)
+        self.scheduler = Scheduler()
+        self.network = RadioNetwork(self.scheduler, latency, jitter, bandwidth, loss, random.Random(self._rng.random()))
+        self.drones = make_drones(map_dimensions, region_dimensions, num_drones, seed, map_counts)
+        self.perception = perception if perception is not None else make_perception(map_dimensions, seed)
+        self.path_planner = path_planner if path_planner is not None else PathPlanner(map_dimensions, region_dimensions)
+        self.communication_threshold = communication_threshold
+        self.planner = planner
+        self.planner_latency = planner_latency
+        self.move_interval = move_interval
+        self.gossip_delay = gossip_delay
+        self.codec = MessageCodec(SCENARIO_DICT.values())
+        # (time, drone id, prompt, inference result) for every completed planner call.
+        self.planner_calls = []
+        # Planner calls that raised and got the answer of fallback_inference_result instead.
+        self.planner_failures = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._planning = [False] * num_drones
+        self._gossip_pending = [False] * num_drones
+        self._index = GridIndex(communication_threshold)
+        self._index.rebuild((i, drone.position.x, drone.position.y) for i, drone in enumerate(self.drones))
+
+        # Drones move at their own phase within the interval instead of in lock-step.
+        for i in range(num_drones):
+            self.scheduler.schedule(self._rng.random() * move_interval, self._move, i)
+        self.path_planner.set_obstacles(self.perception.cells(BLOCKING_SCENARIOS))
+        self.scheduler.schedule(1.0, self._advance_perception)
+
+    @property
+    def now(self) -> float:
+        return self.scheduler.now
+
+    @property
+    def scenario_map(self) -> dict:
+        return self.perception.scenario_map
+
+    def add_observer(self, observer, interval: float = 1.0) -> None:
+        """Calls observer(simulator) every `interval` of simulated time."""
+        def notify():
+            observer(self)
+            self.scheduler.schedule(interval, notify)
+        self.scheduler.schedule(interval, notify)
+
+    def run(self, duration: float) -> None:
+        """Advances the simulation by `duration` ticks of simulated time."""
+        self.scheduler.run_until(self.scheduler.now + duration)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _advance_perception(self) -> None:
+        self.perception.step()
+        self.path_planner.set_obstacles(self.perception.cells(BLOCKING_SCENARIOS))
+        self.scheduler.schedule(1.0, self._advance_perception)
+
+    def _move(self, i: int) -> None:
+        drone = self.drones[i]
+        # Like Simulator, data is archived once it had a move interval to spread, unless a plan still needs it.
+        if not self._planning[i]:
+            drone.archive_current_data()
+        drone.move(self.path_planner)
+        pos = drone.position
+        self._index.move(i, pos.x, pos.y)
+        detected = self.perception.nearest_event(pos.x, pos.y)
+        if detected >= 0:
+            drone.observe(self.perception.perception_context(detected))
+            self._request_gossip(i)
+            self._request_plan(i)
+        self.scheduler.schedule(self.move_interval, self._move, i)
+
+    def _request_gossip(self, i: int) -> None:
+        if not self._gossip_pending[i]:
+            self._gossip_pending[i] = True
+            self.scheduler.schedule(self.gossip_delay, self._gossip, i)
+
+    def _gossip(self, i: int) -> None:
+        """Offers the digest of the current data to every drone in range."""
+        self._gossip_pending[i] = False
+        data = self.drones[i].current_data
+        if data.empty():
+            return
+        digest = data.digest()
+        size = self.codec.digest_size(len(digest))
+        for j in self._index.neighbors(i):
+            self.network.send(i, j, size, self._on_digest, i, j, digest)
+
+    def _on_digest(self, i: int, j: int, digest: dict) -> None:
+        receiver = self.drones[j]
+        wanted = receiver.missing(digest)
+        if wanted:
+            self.network.send(j, i, self.codec.request_size(len(wanted)), self._on_request, i, j, wanted)
+
+    def _on_request(self, i: int, j: int, wanted: list) -> None:
+        data = self.drones[i].current_data
+        # Data archived since the digest was sent is no longer offered.
+        delta = data.subset([id for id in wanted if id in data.data])
+        if not delta.empty():
+            self.network.send(i, j, self.codec.encoded_size(delta), self._on_delta, j, delta)
+
+    def _on_delta(self, j: int, delta) -> None:
+        receiver = self.drones[j]
+        news = any(receiver.known_seq(id) < state.seq for id, state in delta.data.items())
+        receiver.update_current_data(delta)
+        if news:
+            self._request_gossip(j)
+
+    def _request_plan(self, i: int) -> None:
+        if self._planning[i]:
+            return
+        prompt = self.drones[i].get_planning_prompt()
+        if prompt is None:
+            return
+        self._planning[i] = True
+        if hasattr(self.planner, "execute_for"):
+            # Drone-aware planners read the drone's map, so they answer now rather than on a worker thread.
+            future = Future()
+            try:
+                future.set_result(self.planner.execute_for(self.drones[i], prompt))
+            except Exception as error:
+                future.set_exception(error)
+        else:
+            future = self._executor.submit(self.planner.execute_prompt, prompt)
+        latency = self.planner_latency(self._rng) if callable(self.planner_latency) else self.planner_latency
+        self.scheduler.schedule(latency, self._on_plan, i, prompt, future)
+
+    def _on_plan(self, i: int, prompt: str, future) -> None:
+        drone = self.drones[i]
+        self._planning[i] = False
+        try:
+            inference_result = future.result()
+        except Exception:
+            self.planner_failures += 1
+            inference_result = fallback_inference_result(drone, self._rng)
+        drone.apply_inference_result(inference_result)
+        drone.archive_current_data()
+        self.planner_calls.append((self.now, drone.id, prompt, inference_result))
+        # The answer is a new version of the drone's state that its neighbors have not seen.
+        self._request_gossip(i)
+
+    def positions(self) -> np.ndarray:
+        return np.array([(drone.position.x, drone.position.y) for drone in self.drones], dtype=np.int64).reshape(-1, 2)
@@ -0,0 +1,111 @@
+from events import *
+from perception import PerceptionEngine
+from scenario import SCENARIO_DICT
+from robot.planner import RecordedPlanner
+from robot.planning import REGION_OFFSETS, FakePlanner
+
+def test_scheduler_orders_events():
+    scheduler = Scheduler()
+    log = []
+    scheduler.schedule(2.0, log.append, "late")
+    scheduler.schedule(1.0, log.append, "first")
+    scheduler.schedule(1.0, log.append, "second")
+    cancelled = scheduler.schedule(1.5, log.append, "cancelled")
+    Scheduler.cancel(cancelled)
+    scheduler.run_until(1.5)
+    assert log == ["first", "second"]
+    assert scheduler.now == 1.5
+    scheduler.run_until(10.0)
+    assert log == ["first", "second", "late"]
+    assert scheduler.processed == 3 and len(scheduler) == 0
+
+def test_radio_latency_and_bandwidth():
+    scheduler = Scheduler()
+    network = RadioNetwork(scheduler, latency=0.5, bandwidth=100.0)
+    arrivals = []
+    # Two 100 byte messages from one radio go out one after the other.
+    network.send(0, 1, 100, lambda: arrivals.append(scheduler.now))
+    network.send(0, 2, 100, lambda: arrivals.append(scheduler.now))
+    # Another radio transmits in parallel.
+    network.send(1, 0, 100, lambda: arrivals.append(scheduler.now))
+    scheduler.run_until(10.0)
+    assert arrivals == [1.5, 1.5, 2.5]
+    assert network.stats() == {"sent": 3, "delivered": 3, "dropped": 0, "bytes": 300}
+
+def test_radio_loss():
+    scheduler = Scheduler()
+    network = RadioNetwork(scheduler, loss=1.0)
+    assert not network.send(0, 1, 10, print)
+    assert len(scheduler) == 0 and network.dropped == 1
+    network = RadioNetwork(scheduler, loss=0.3, rng=random.Random(0))
+    delivered = sum(network.send(0, 1, 10, int) for _ in range(1000))
+    assert 600 < delivered < 800
+
+def make_simulator(perception, **kwargs):
+    return EventSimulator((6, 6), (3, 3), 2, communication_threshold=10, planner=FakePlanner(response="up"), seed=0,
+                          perception=perception, **kwargs)
+
+def test_idle_drones_do_not_communicate():
+    with make_simulator(PerceptionEngine((6, 6))) as simulator:
+        simulator.run(50)
+        assert simulator.network.sent == 0
+        assert simulator.planner_calls == []
+        # Only the moves of both drones and the perception ticks were processed.
+        assert simulator.scheduler.processed <= 2 * 50 + 50
+
+def test_observation_spreads_and_plan_arrives_later():
+    # The event is in range of both drones wherever they go.
+    perception = PerceptionEngine((6, 6), sensor_radius=6)
+    perception.add_event("trapped_person", 3, 3)
+    with make_simulator(perception, latency=0.1, planner_latency=2.5) as simulator:
+        first, second = simulator.drones
+        simulator.run(1.0)
+        assert simulator.planner_calls == []
+        assert first.id in first.current_data.data
+        # Digest, request and delta each take one latency.
+        simulator.run(0.35)
+        assert first.id in second.current_data.data or first.id in second.historical_data.data
+        simulator.run(2.5)
+        assert len(simulator.planner_calls) >= 1
+        assert {call[1] for call in simulator.planner_calls} == {first.id, second.id}
+        assert all(2.5 <= call[0] <= 3.5 and call[3] == "up" for call in simulator.planner_calls)
+        assert all(SCENARIO_DICT["trapped_person"].rstrip(". ") in call[2] for call in simulator.planner_calls)
+
+def test_lossy_network_blocks_gossip():
+    perception = PerceptionEngine((6, 6), sensor_radius=6)
+    perception.add_event("trapped_person", 3, 3)
+    with make_simulator(perception, loss=1.0) as simulator:
+        first, second = simulator.drones
+        simulator.run(5)
+        assert simulator.network.sent > 0 and simulator.network.delivered == 0
+        assert first.id not in second.current_data.data and first.id not in second.historical_data.data
+
+class FailingDroneAwarePlanner:
+    def execute_for(self, drone, prompt):
+        raise RuntimeError("Planner failure")
+
+def test_planner_failures_fall_back_to_region_policy():
+    perception = PerceptionEngine((6, 6), sensor_radius=6)
+    perception.add_event("trapped_person", 3, 3)
+    for planner in (RecordedPlanner(), FailingDroneAwarePlanner()):
+        with EventSimulator((6, 6), (3, 3), 2, communication_threshold=10, planner=planner, seed=0, perception=perception) as simulator:
+            simulator.run(10)
+            assert simulator.planner_failures == len(simulator.planner_calls) > 2
+            assert all(call[3] in REGION_OFFSETS for call in simulator.planner_calls)
+
+def test_seeded_runs_are_reproducible():
+    def run():
+        with EventSimulator((20, 20), (3, 3), 30, planner=FakePlanner(response="left"), seed=4, jitter=0.2, loss=0.1, bandwidth=2000.0) as simulator:
+            simulator.run(40)
+            return simulator.positions().tolist(), simulator.network.stats(), [call[:2] for call in simulator.planner_calls]
+    assert run() == run()
+
+if __name__ == "__main__":
+    test_scheduler_orders_events()
+    test_radio_latency_and_bandwidth()
+    test_radio_loss()
+    test_idle_drones_do_not_communicate()
+    test_observation_spreads_and_plan_arrives_later()
+    test_lossy_network_blocks_gossip()
+    test_planner_failures_fall_back_to_region_policy()
+    test_seeded_runs_are_reproducible()
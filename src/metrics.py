@@ -0,0 +1,227 @@
+"""
+Simulator instrumentation: counters, gauges and histograms, exported as JSON lines or in
+the Prometheus text format.
+
+A disabled Metrics hands out one shared no-op phase timer and returns from every
+recording method right away, so the instrumentation costs a method call per phase.
+"""
+import bisect
+import json
+import time
+from robot.cache import CachedPlanner
+
+# Upper bounds in seconds, from 10 microseconds up to 30 seconds for slow planner calls.
+DEFAULT_BUCKETS = (1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0)
+
+def series_name(name: str, labels: tuple = ()) -> str:
+    """Prometheus style name of a labelled series, e.g. phase_seconds{phase="move"}."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # Per-bucket counts, the last one counts the values above every bound.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[int]:
+        total, cumulative = 0, []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.cumulative_counts())),
+        }
+
+class _PhaseTimer:
+    def __init__(self, metrics, labels):
+        self._metrics = metrics
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._start
+        self._metrics._observe("phase_seconds", self._labels, elapsed)
+        return False
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class Metrics:
+    """
+    Registry of the metrics of one run. Series are identified by a name and keyword labels.
+
+    with metrics.phase("move"):
+        ...
+    metrics.increment("llm_calls")
+    metrics.observe("llm_latency_seconds", 0.8)
+    """
+    def __init__(self, enabled: bool = True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.counters: dict[tuple, float] = {}
+        self.gauges: dict[tuple, float] = {}
+        self.histograms: dict[tuple, Histogram] = {}
+
+    def phase(self, name: str):
+        """Context manager adding the wall time of its body to the phase_seconds histogram."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _PhaseTimer(self, (("phase", name),))
+
+    def increment(self, name: str, amount: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        self._observe(name, tuple(sorted(labels.items())), value)
+
+    def _observe(self, name: str, labels: tuple, value: float) -> None:
+        histogram = self.histograms.get((name, labels))
+        if histogram is None:
+            histogram = self.histograms[(name, labels)] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def gauge(self, name: str, **labels) -> float | None:
+        return self.gauges.get((name, tuple(sorted(labels.items()))))
+
+    def histogram(self, name: str, **labels) -> Histogram | None:
+        return self.histograms.get((name, tuple(sorted(labels.items()))))
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        """All series keyed by their series_name."""
+        return {
+            "counters": {series_name(*key): value for key, value in self.counters.items()},
+            "gauges": {series_name(*key): value for key, value in self.gauges.items()},
+            "histograms": {series_name(*key): histogram.as_dict() for key, histogram in self.histograms.items()},
+        }
+
+    def to_json_line(self, **fields) -> str:
+        """One JSON line with the snapshot and extra fields such as the tick."""
+        return json.dumps({**fields, **self.snapshot()})
+
+    def write_json_line(self, file, **fields) -> None:
+        file.write(self.to_json_line(**fields) + "\n")
+
+    def to_prometheus(self, prefix: str = "swarm_") -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+            for name in sorted({name for name, _ in series}):
+                # Prometheus names counters with a _total suffix.
+                exported = prefix + name + ("_total" if kind == "counter" and not name.endswith("_total") else "")
+                lines.append(f"# TYPE {exported} {kind}")
+                for (series_name_, labels), value in sorted(series.items()):
+                    if series_name_ == name:
+                        lines.append(f"{series_name(exported, labels)} {value}")
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# TYPE {prefix}{name} histogram")
+            for (histogram_name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if histogram_name != name:
+                    continue
+                bounds = [*map(str, histogram.buckets), "+Inf"]
+                for bound, count in zip(bounds, histogram.cumulative_counts()):
+                    lines.append(f"{series_name(prefix + name + '_bucket', labels + (('le', bound),))} {count}")
+                lines.append(f"{series_name(prefix + name + '_sum', labels)} {histogram.sum}")
+                lines.append(f"{series_name(prefix + name + '_count', labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+class MeteredPlanner:
+    """Planner wrapper counting calls, failures and latency in a Metrics registry."""
+    def __init__(self, planner, metrics: Metrics):
+        self.planner = planner
+        self.metrics = metrics
+        self.model = getattr(planner, "model", type(planner).__name__)
+        self.max_tokens = getattr(planner, "max_tokens", None)
+        if hasattr(planner, "execute_prompt_async"):
+            self.execute_prompt_async = self._execute_prompt_async
+        if hasattr(planner, "execute_for"):
+            self.execute_for = self._execute_for
+
+    def _record(self, start: float, failed: bool) -> None:
+        self.metrics.increment("llm_calls")
+        if failed:
+            self.metrics.increment("llm_failures")
+        self.metrics.observe("llm_latency_seconds", time.perf_counter() - start)
+
+    def execute_prompt(self, prompt: str) -> str:
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = self.planner.execute_prompt(prompt)
+            failed = False
+            return result
+        finally:
+            self._record(start, failed)
+
+    def _execute_for(self, drone, prompt: str) -> str:
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = self.planner.execute_for(drone, prompt)
+            failed = False
+            return result
+        finally:
+            self._record(start, failed)
+
+    async def _execute_prompt_async(self, prompt: str) -> str:
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await self.planner.execute_prompt_async(prompt)
+            failed = False
+            return result
+        finally:
+            self._record(start, failed)
+
+def instrument_planner(planner, metrics: Metrics):
+    """
+    Wraps a planner so that its calls are metered. A CachedPlanner keeps its cache and only
+    its misses, the calls that reach the model, are metered. A planner metered into this
+    registry already is returned as is, and one metered into another is metered here instead.
+    """
+    if isinstance(planner, CachedPlanner):
+        metered = instrument_planner(planner.planner, metrics)
+        return planner if metered is planner.planner else CachedPlanner(metered, planner.cache)
+    if isinstance(planner, MeteredPlanner):
+        return planner if planner.metrics is metrics else MeteredPlanner(planner.planner, metrics)
+    return MeteredPlanner(planner, metrics)
@@ -0,0 +1,90 @@
+import io
+import json
+from metrics import *
+from robot.cache import CachedPlanner, InferenceCache
+from robot.planning import ConcurrentPlanner, FakePlanner
+from simulator import Simulator
+
+class StubPlanner:
+    @staticmethod
+    def execute_prompt(prompt: str) -> str:
+        return "up"
+
+def test_histogram():
+    histogram = Histogram(buckets=(1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.cumulative_counts() == [2, 3, 4]
+    assert histogram.count == 4 and histogram.sum == 56.5
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    with metrics.phase("move"):
+        pass
+    metrics.increment("llm_calls")
+    metrics.set_gauge("size", 3)
+    metrics.observe("llm_latency_seconds", 0.1)
+    assert metrics.snapshot() == {"counters": {}, "gauges": {}, "histograms": {}}
+    assert metrics.phase("move") is metrics.phase("plan")
+
+def test_exports():
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.increment("llm_calls", 2)
+    metrics.set_gauge("current_data_states", 7, stat="max")
+    metrics.observe("phase_seconds", 0.5, phase="move")
+    line = io.StringIO()
+    metrics.write_json_line(line, tick=3)
+    record = json.loads(line.getvalue())
+    assert record["tick"] == 3
+    assert record["counters"] == {"llm_calls": 2}
+    assert record["gauges"] == {'current_data_states{stat="max"}': 7}
+    assert record["histograms"]['phase_seconds{phase="move"}']["buckets"] == {"0.1": 0, "1": 1, "+Inf": 1}
+    text = metrics.to_prometheus()
+    assert "# TYPE swarm_llm_calls_total counter\nswarm_llm_calls_total 2\n" in text
+    assert 'swarm_current_data_states{stat="max"} 7\n' in text
+    assert 'swarm_phase_seconds_bucket{phase="move",le="1"} 1\n' in text
+    assert 'swarm_phase_seconds_count{phase="move"} 1\n' in text
+
+def test_simulator_metrics():
+    metrics = Metrics()
+    cache = InferenceCache()
+    simulator = Simulator((9,9), (3,3), 20, planner=CachedPlanner(StubPlanner, cache), metrics=metrics, seed=0)
+    simulator.run(30)
+    for phase in ("move", "perceive", "neighbors", "gossip", "plan", "observers"):
+        assert metrics.histogram("phase_seconds", phase=phase).count == 30
+    assert metrics.counter("ticks") == 30
+    assert metrics.counter("gossip_messages") == simulator.gossip_totals.messages
+    assert metrics.counter("gossip_bytes") == simulator.gossip_totals.bytes
+    # Only cache misses reach the planner.
+    assert metrics.counter("llm_calls") == cache.misses == metrics.gauge("cache_misses")
+    assert metrics.counter("planner_calls") == cache.hits + cache.misses
+    assert metrics.gauge("current_data_states", stat="total") >= metrics.gauge("current_data_states", stat="max") >= 0
+    assert metrics.gauge("historical_data_states", stat="max") >= 0
+
+def test_planning_stage_metrics():
+    metrics = Metrics()
+    planner = FakePlanner(latency=0.001)
+    simulator = Simulator((9,9), (3,3), 20, planning_stage=ConcurrentPlanner(planner, max_concurrency=4), metrics=metrics, seed=1)
+    simulator.run(20)
+    assert metrics.counter("llm_calls") == planner.calls == metrics.counter("planner_calls")
+    if planner.calls:
+        assert metrics.histogram("llm_latency_seconds").count == planner.calls
+    assert metrics.gauge("planning_timeouts") == 0
+
+def test_reused_planning_stage_is_metered_once():
+    metrics = Metrics()
+    stage = ConcurrentPlanner(CachedPlanner(FakePlanner()), max_concurrency=4)
+    Simulator((9,9), (3,3), 5, planning_stage=stage, metrics=metrics, seed=2)
+    metered = stage.planner
+    Simulator((9,9), (3,3), 5, planning_stage=stage, metrics=metrics, seed=3)
+    assert stage.planner is metered
+    assert isinstance(metered.planner, MeteredPlanner) and isinstance(metered.planner.planner, FakePlanner)
+
+if __name__ == "__main__":
+    test_histogram()
+    test_disabled_metrics_record_nothing()
+    test_exports()
+    test_simulator_metrics()
+    test_planning_stage_metrics()
+    test_reused_planning_stage_is_metered_once()
@@ -0,0 +1,224 @@
+"""
+Mock perception: scenario events on the map and their batched detection by the drones.
+
+Events are stored as arrays: a kind (a SCENARIO_DICT key), a cell, a velocity in cells per
+tick and the ticks [start, end) during which they are active. Active events are indexed by
+sorting their grid cell keys. Cells are `sensor_radius + 1` wide, so every event a drone
+can sense lies in the 3x3 block of cells around it. Detection looks up the candidates of
+all drones with one np.searchsorted per block offset and filters them by distance.
+A drone senses an event when abs(dx) <= sensor_radius and abs(dy) <= sensor_radius,
+so a radius of 0 senses the drone's own cell only.
+"""
+import random
+import numpy as np
+from scenario import SCENARIO_DICT
+
+KINDS = list(SCENARIO_DICT)
+_KIND_INDEX = {kind: i for i, kind in enumerate(KINDS)}
+# Sentinel end tick of events that never expire.
+FOREVER = np.iinfo(np.int64).max
+
+class PerceptionEngine:
+    def __init__(self, map_dimensions, sensor_radius: int = 0, capacity: int = 16):
+        assert map_dimensions[0] > 0 and map_dimensions[1] > 0
+        assert sensor_radius >= 0
+        self.map_dimensions = map_dimensions
+        self.sensor_radius = sensor_radius
+        self._tick = 0
+        self._size = 0
+        self._kinds = np.zeros(capacity, dtype=np.int16)
+        self._xy = np.zeros((capacity, 2), dtype=np.int64)
+        self._velocity = np.zeros((capacity, 2), dtype=np.int64)
+        self._start = np.zeros(capacity, dtype=np.int64)
+        self._end = np.zeros(capacity, dtype=np.int64)
+        self._cell = sensor_radius + 1
+        self._columns = -(-map_dimensions[0] // self._cell)
+        self._sorted_keys = None
+        self._sorted_ids = None
+        self._buckets = None
+
+    @classmethod
+    def from_scenario_map(cls, map_dimensions, scenario_map, sensor_radius: int = 0):
+        """An engine with one static event per entry of a {(x, y): kind} map."""
+        engine = cls(map_dimensions, sensor_radius, capacity=max(16, len(scenario_map)))
+        for (x, y), kind in scenario_map.items():
+            engine.add_event(kind, x, y)
+        return engine
+
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    def __len__(self):
+        return int(np.count_nonzero(self.active()))
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._kinds)
+        for name in ("_kinds", "_xy", "_velocity", "_start", "_end"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def add_event(self, kind: str, x: int, y: int, start: int | None = None, end: int | None = None, velocity=(0, 0)) -> int:
+        """
+        Adds an event active during ticks [start, end), from now and forever by default.
+        Returns its id.
+        """
+        assert 0 <= x < self.map_dimensions[0] and 0 <= y < self.map_dimensions[1]
+        if self._size == len(self._kinds):
+            self._grow()
+        id = self._size
+        self._kinds[id] = _KIND_INDEX[kind]
+        self._xy[id] = (x, y)
+        self._velocity[id] = velocity
+        self._start[id] = self._tick if start is None else start
+        self._end[id] = FOREVER if end is None else end
+        self._size += 1
+        self._sorted_keys = None
+        return id
+
+    def move_event(self, id: int, x: int, y: int) -> None:
+        assert 0 <= x < self.map_dimensions[0] and 0 <= y < self.map_dimensions[1]
+        self._xy[id] = (x, y)
+        self._sorted_keys = None
+
+    def expire_event(self, id: int) -> None:
+        """Deactivates an event from the current tick on."""
+        self._end[id] = min(self._end[id], self._tick)
+        self._sorted_keys = None
+
+    def event(self, id: int) -> tuple[str, int, int]:
+        """Kind and position of an event."""
+        return KINDS[self._kinds[id]], int(self._xy[id, 0]), int(self._xy[id, 1])
+
+    def perception_context(self, id: int) -> str:
+        return SCENARIO_DICT[KINDS[self._kinds[id]]]
+
+    def cells(self, kinds) -> np.ndarray:
+        """(x, y) cells of the active events of the given kinds."""
+        kind_indices = [_KIND_INDEX[kind] for kind in kinds]
+        mask = self.active() & np.isin(self._kinds[:self._size], kind_indices)
+        return self._xy[:self._size][mask]
+
+    def active(self) -> np.ndarray:
+        """Mask over event ids of the events active at the current tick."""
+        tick = self._tick
+        return (self._start[:self._size] <= tick) & (tick < self._end[:self._size])
+
+    def step(self) -> None:
+        """Advances one tick: moving events take a step, bouncing off the map edges."""
+        self._tick += 1
+        moving = np.flatnonzero(self._velocity[:self._size].any(axis=1))
+        if len(moving):
+            xy = self._xy[moving] + self._velocity[moving]
+            upper = np.array(self.map_dimensions) - 1
+            outside = (xy < 0) | (xy > upper)
+            self._velocity[moving] = np.where(outside, -self._velocity[moving], self._velocity[moving])
+            self._xy[moving] = np.clip(xy, 0, upper)
+        # Moves, appearances and expiries change the set of active cells; static maps keep their index.
+        if len(moving) or (self._start[:self._size] == self._tick).any() or (self._end[:self._size] == self._tick).any():
+            self._sorted_keys = None
+
+    @property
+    def scenario_map(self) -> dict:
+        """{(x, y): kind} of the active events. Of several events in one cell the latest added wins."""
+        active = self.active()
+        return {(int(x), int(y)): KINDS[kind] for (x, y), kind in zip(self._xy[:self._size][active], self._kinds[:self._size][active])}
+
+    def _index(self) -> None:
+        if self._sorted_keys is not None:
+            return
+        ids = np.flatnonzero(self.active())
+        keys = self._keys(self._xy[ids] // self._cell)
+        order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[order]
+        self._sorted_ids = ids[order]
+        self._buckets = None
+
+    def _keys(self, cells: np.ndarray) -> np.ndarray:
+        return cells[:, 1] * self._columns + cells[:, 0]
+
+    def detect(self, positions) -> tuple[np.ndarray, np.ndarray]:
+        """
+        All (drone index, event id) pairs where the drone at positions[index] senses the event,
+        sorted by drone index and event id. positions is a (drones, 2) array of x, y.
+        """
+        self._index()
+        xy = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        cells = xy // self._cell
+        offsets = [(0, 0)] if self.sensor_radius == 0 else [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+        drones, events = [], []
+        for dx, dy in offsets:
+            neighbor_cells = cells + (dx, dy)
+            # Cells off the map to the left or right would alias cells of the neighboring row.
+            valid = (neighbor_cells[:, 0] >= 0) & (neighbor_cells[:, 0] < self._columns)
+            keys = self._keys(neighbor_cells)
+            low = np.searchsorted(self._sorted_keys, keys, side="left")
+            high = np.searchsorted(self._sorted_keys, keys, side="right")
+            counts = np.where(valid, high - low, 0)
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            drone = np.repeat(np.arange(len(xy)), counts)
+            # Index into the sorted events: low of the drone plus the rank within its run.
+            rank = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            event = self._sorted_ids[np.repeat(low, counts) + rank]
+            delta = np.abs(self._xy[event] - xy[drone])
+            keep = (delta <= self.sensor_radius).all(axis=1)
+            drones.append(drone[keep])
+            events.append(event[keep])
+        if not drones:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        drones, events = np.concatenate(drones), np.concatenate(events)
+        order = np.lexsort((events, drones))
+        return drones[order], events[order]
+
+    def nearest(self, positions) -> np.ndarray:
+        """For every drone the id of the closest event it senses, the oldest on ties, or -1."""
+        xy = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        nearest = np.full(len(xy), -1, dtype=np.int64)
+        drones, events = self.detect(xy)
+        if len(drones):
+            distance = np.abs(self._xy[events] - xy[drones]).max(axis=1)
+            order = np.lexsort((events, distance, drones))
+            first = np.flatnonzero(np.diff(drones[order], prepend=-1))
+            nearest[drones[order][first]] = events[order][first]
+        return nearest
+
+    def nearest_event(self, x: int, y: int) -> int:
+        """nearest() for a single drone without the array overhead, for drones that are not stepped in a batch."""
+        self._index()
+        if self._buckets is None:
+            self._buckets = {}
+            for key, id, (event_x, event_y) in zip(self._sorted_keys.tolist(), self._sorted_ids.tolist(), self._xy[self._sorted_ids].tolist()):
+                self._buckets.setdefault(key, []).append((id, event_x, event_y))
+        cell_x, cell_y = x // self._cell, y // self._cell
+        offsets = (0,) if self.sensor_radius == 0 else (-1, 0, 1)
+        best = None
+        for dx in offsets:
+            if not 0 <= cell_x + dx < self._columns:
+                continue
+            for dy in offsets:
+                for id, event_x, event_y in self._buckets.get((cell_y + dy) * self._columns + cell_x + dx, ()):
+                    distance = max(abs(event_x - x), abs(event_y - y))
+                    if distance <= self.sensor_radius and (best is None or (distance, id) < best):
+                        best = (distance, id)
+        return -1 if best is None else best[1]
+
+def random_events(map_dimensions, num_events: int, rng=None, kinds=KINDS, sensor_radius: int = 0, lifetime: int | None = None, moving_fraction: float = 0.0) -> PerceptionEngine:
+    """
+    An engine with num_events events of random kinds in distinct random cells. With a lifetime,
+    events appear at random ticks in [0, lifetime) and last `lifetime` ticks.
+    """
+    rng = rng if rng is not None else random.Random()
+    width, height = map_dimensions
+    assert num_events <= width * height, "More events than cells."
+    engine = PerceptionEngine(map_dimensions, sensor_radius, capacity=max(16, num_events))
+    # Sampling from a range never materializes the list of cells.
+    for cell in rng.sample(range(width * height), num_events):
+        start = 0 if lifetime is None else rng.randrange(lifetime)
+        end = None if lifetime is None else start + lifetime
+        velocity = (rng.choice((-1, 1)), rng.choice((-1, 1))) if rng.random() < moving_fraction else (0, 0)
+        engine.add_event(rng.choice(kinds), cell // height, cell % height, start, end, velocity)
+    return engine
@@ -0,0 +1,79 @@
+import random
+import numpy as np
+from perception import *
+from scenario import SCENARIO_DICT
+
+def brute_force(engine, positions):
+    pairs = []
+    active = engine.active()
+    for i, (x, y) in enumerate(positions):
+        for id in range(len(active)):
+            _, ex, ey = engine.event(id)
+            if active[id] and abs(ex - x) <= engine.sensor_radius and abs(ey - y) <= engine.sensor_radius:
+                pairs.append((i, id))
+    return pairs
+
+def test_exact_cell_detection():
+    engine = PerceptionEngine.from_scenario_map((9, 9), {(1, 2): "trapped_person", (8, 8): "hurricane"})
+    assert engine.scenario_map == {(1, 2): "trapped_person", (8, 8): "hurricane"}
+    nearest = engine.nearest([(1, 2), (1, 3), (8, 8), (0, 0)])
+    assert list(nearest) == [0, -1, 1, -1]
+    assert engine.perception_context(0) == SCENARIO_DICT["trapped_person"]
+
+def test_detect_matches_brute_force():
+    rng = random.Random(3)
+    for radius in (0, 1, 3):
+        engine = random_events((40, 25), 300, rng, sensor_radius=radius)
+        positions = [(rng.randrange(40), rng.randrange(25)) for _ in range(200)]
+        drones, events = engine.detect(positions)
+        assert list(zip(drones.tolist(), events.tolist())) == brute_force(engine, positions)
+
+def test_nearest_prefers_closest_then_oldest():
+    engine = PerceptionEngine((10, 10), sensor_radius=2)
+    far = engine.add_event("hurricane", 7, 5)
+    close = engine.add_event("forest_fire", 6, 5)
+    also_close = engine.add_event("landslide", 4, 5)
+    assert list(engine.nearest([(5, 5)])) == [close]
+    engine.expire_event(close)
+    assert list(engine.nearest([(5, 5)])) == [also_close]
+    engine.expire_event(also_close)
+    assert list(engine.nearest([(5, 5)])) == [far]
+
+def test_nearest_event_matches_nearest():
+    rng = random.Random(5)
+    for radius in (0, 2):
+        engine = random_events((30, 20), 150, rng, sensor_radius=radius, lifetime=5, moving_fraction=0.5)
+        for _ in range(4):
+            positions = [(rng.randrange(30), rng.randrange(20)) for _ in range(100)]
+            assert [engine.nearest_event(x, y) for x, y in positions] == engine.nearest(positions).tolist()
+            engine.step()
+
+def test_events_appear_move_and_expire():
+    engine = PerceptionEngine((5, 5))
+    id = engine.add_event("tornado", 4, 0, start=1, end=4, velocity=(1, 1))
+    assert engine.scenario_map == {}
+    engine.step()
+    # Bounced off the right edge.
+    assert engine.scenario_map == {(4, 1): "tornado"}
+    engine.step()
+    assert engine.event(id) == ("tornado", 3, 2)
+    assert list(engine.nearest([(3, 2)])) == [id]
+    engine.step()
+    engine.step()
+    assert len(engine) == 0
+    assert list(engine.nearest([(2, 4)])) == [-1]
+
+def test_random_events_distinct_cells():
+    engine = random_events((1000, 1000), 5000, random.Random(0))
+    assert len(engine) == 5000
+    assert len(engine.scenario_map) == 5000
+    nearest = engine.nearest(np.array(list(engine.scenario_map)))
+    assert (nearest >= 0).all()
+
+if __name__ == "__main__":
+    test_exact_cell_detection()
+    test_detect_matches_brute_force()
+    test_nearest_prefers_closest_then_oldest()
+    test_nearest_event_matches_nearest()
+    test_events_appear_move_and_expire()
+    test_random_events_distinct_cells()
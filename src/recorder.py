@@ -0,0 +1,180 @@
+"""
+Tick trace recorder and replay.
+
+TraceRecorder is a simulator observer that streams every tick to a directory of
+compressed NumPy chunks, each holding `chunk_size` consecutive ticks in columnar form.
+Variable-length data (neighbor edges, message events, planner calls) is stored as flat
+arrays plus per-tick offsets. The active scenario events of every tick are stored the same
+way, as events come and go and move during a run. TraceReader seeks to any tick by loading only the chunk
+containing it, so long runs can be analyzed and rendered offline without re-running
+the simulation or calling the planner.
+"""
+import dataclasses
+import json
+import os
+import numpy as np
+from scenario import SCENARIO_DICT
+
+FORMAT_VERSION = 2
+# Scenario kinds by the number events store them as.
+EVENT_KINDS = list(SCENARIO_DICT)
+_EVENT_KIND = {kind: number for number, kind in enumerate(EVENT_KINDS)}
+META_FILE = "meta.json"
+
+def _chunk_file(chunk: int) -> str:
+    return f"chunk_{chunk:06d}.npz"
+
+def _offsets(counts) -> np.ndarray:
+    return np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+
+@dataclasses.dataclass
+class TickRecord:
+    tick: int
+    positions: np.ndarray  # (drones, 2) x, y
+    targets: np.ndarray  # (drones, 2) x, y of the planned target, -1 without one
+    edges: np.ndarray  # (edges, 2) sender id, receiver id
+    messages: np.ndarray  # (exchanges, 4) sender id, receiver id, states sent, bytes
+    planner_calls: list[tuple[int, str, str]]  # drone id, prompt, inference result
+    scenario_map: dict  # {(x, y): kind} of the events active at this tick
+
+class TraceRecorder:
+    """Observer that records a simulator run. Call close() at the end of the run."""
+    def __init__(self, path: str, chunk_size: int = 256):
+        assert chunk_size > 0
+        self.path = path
+        self.chunk_size = chunk_size
+        self._meta = None
+        self._num_ticks = 0
+        self._chunks = 0
+        self._buffer: list[TickRecord] = []
+        os.makedirs(path, exist_ok=True)
+
+    def __call__(self, simulator) -> None:
+        if self._meta is None:
+            self._meta = {
+                "version": FORMAT_VERSION,
+                "num_drones": len(simulator.drones),
+                "map_dimensions": list(simulator.drones[0].map.map_dimensions) if simulator.drones else None,
+                "chunk_size": self.chunk_size,
+                "scenario_map": [[x, y, kind] for (x, y), kind in simulator.scenario_map.items()],
+            }
+        self._buffer.append(self.snapshot(simulator))
+        if len(self._buffer) == self.chunk_size:
+            self.flush()
+
+    @staticmethod
+    def snapshot(simulator) -> TickRecord:
+        if simulator.swarm is not None:
+            positions = simulator.swarm.positions.astype(np.int32)
+            targets = np.where(simulator.swarm.has_target[:, None], simulator.swarm.targets, -1).astype(np.int32)
+        else:
+            positions = np.array([(drone.position.x, drone.position.y) for drone in simulator.drones], dtype=np.int32).reshape(-1, 2)
+            targets = np.full_like(positions, -1)
+            for i, drone in enumerate(simulator.drones):
+                planned_moves = drone.planned_moves
+                if planned_moves:
+                    targets[i] = (planned_moves[0].x, planned_moves[0].y)
+        edges = [(drone.id, neighbor.id) for drone in simulator.drones for neighbor in simulator.neighbors[drone.id]]
+        return TickRecord(
+            tick=simulator.tick_count,
+            positions=positions,
+            targets=targets,
+            edges=np.array(edges, dtype=np.int32).reshape(-1, 2),
+            messages=np.array(simulator.gossip_counters.events, dtype=np.int64).reshape(-1, 4),
+            planner_calls=list(simulator.planner_calls),
+            scenario_map=dict(simulator.scenario_map),
+        )
+
+    def flush(self) -> None:
+        """Writes the buffered ticks as one chunk."""
+        if not self._buffer:
+            return
+        records, self._buffer = self._buffer, []
+        calls = [call for record in records for call in record.planner_calls]
+        events = [(x, y, _EVENT_KIND[kind]) for record in records for (x, y), kind in record.scenario_map.items()]
+        np.savez_compressed(
+            os.path.join(self.path, _chunk_file(self._chunks)),
+            ticks=np.array([record.tick for record in records], dtype=np.int64),
+            positions=np.stack([record.positions for record in records]),
+            targets=np.stack([record.targets for record in records]),
+            edge_offsets=_offsets([len(record.edges) for record in records]),
+            edges=np.concatenate([record.edges for record in records]),
+            message_offsets=_offsets([len(record.messages) for record in records]),
+            messages=np.concatenate([record.messages for record in records]),
+            call_offsets=_offsets([len(record.planner_calls) for record in records]),
+            call_drones=np.array([call[0] for call in calls], dtype=np.int32),
+            call_prompts=np.array([call[1] for call in calls], dtype=str),
+            call_results=np.array([call[2] for call in calls], dtype=str),
+            event_offsets=_offsets([len(record.scenario_map) for record in records]),
+            events=np.array(events, dtype=np.int32).reshape(-1, 3),
+        )
+        self._chunks += 1
+        self._num_ticks += len(records)
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        meta = dict(self._meta, num_ticks=self._num_ticks, num_chunks=self._chunks)
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump(meta, f)
+
+    def close(self) -> None:
+        self.flush()
+
+class TraceReader:
+    """Random access to a recorded run, by position in the trace (0 is the first recorded tick)."""
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported trace version {self.meta['version']}.")
+        self.chunk_size = self.meta["chunk_size"]
+        # Scenario map of the first tick; every record has the one of its own tick.
+        self.scenario_map = {(x, y): kind for x, y, kind in self.meta["scenario_map"]}
+        self._chunk_index = None
+        self._chunk = None
+
+    def __len__(self):
+        return self.meta["num_ticks"]
+
+    def _load(self, chunk: int):
+        if chunk != self._chunk_index:
+            with np.load(os.path.join(self.path, _chunk_file(chunk))) as data:
+                self._chunk = {name: data[name] for name in data.files}
+            self._chunk_index = chunk
+        return self._chunk
+
+    def __getitem__(self, index: int) -> TickRecord:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Tick {index} is not in the trace.")
+        chunk = self._load(index // self.chunk_size)
+        i = index % self.chunk_size
+        edge_start, edge_stop = chunk["edge_offsets"][i:i + 2]
+        message_start, message_stop = chunk["message_offsets"][i:i + 2]
+        call_start, call_stop = chunk["call_offsets"][i:i + 2]
+        event_start, event_stop = chunk["event_offsets"][i:i + 2]
+        return TickRecord(
+            tick=int(chunk["ticks"][i]),
+            positions=chunk["positions"][i],
+            targets=chunk["targets"][i],
+            edges=chunk["edges"][edge_start:edge_stop],
+            messages=chunk["messages"][message_start:message_stop],
+            planner_calls=[
+                (int(drone), str(prompt), str(result))
+                for drone, prompt, result in zip(
+                    chunk["call_drones"][call_start:call_stop],
+                    chunk["call_prompts"][call_start:call_stop],
+                    chunk["call_results"][call_start:call_stop],
+                )
+            ],
+            scenario_map={(int(x), int(y)): EVENT_KINDS[kind] for x, y, kind in chunk["events"][event_start:event_stop]},
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def positions(self, index: int) -> np.ndarray:
+        return self[index].positions
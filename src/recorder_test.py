@@ -0,0 +1,67 @@
+import json
+import random
+import numpy as np
+import pytest
+from perception import random_events
+from recorder import *
+from simulator import Simulator
+
+class StubPlanner:
+    @staticmethod
+    def execute_prompt(prompt: str) -> str:
+        return "up"
+
+def test_record_and_replay(tmp_path):
+    simulator = Simulator((9,9), (3,3), 20, planner=StubPlanner, seed=3)
+    recorder = TraceRecorder(str(tmp_path), chunk_size=10)
+    live = []
+    simulator.add_observer(recorder)
+    simulator.add_observer(lambda sim: live.append(TraceRecorder.snapshot(sim)))
+    simulator.run(25)
+    recorder.close()
+
+    reader = TraceReader(str(tmp_path))
+    assert len(reader) == 25
+    assert reader.scenario_map == simulator.scenario_map
+    # Seek backwards and forwards across chunks.
+    for index in (24, 3, 17, 0, 10):
+        expected, actual = live[index], reader[index]
+        assert actual.tick == expected.tick == index + 1
+        assert (actual.positions == expected.positions).all()
+        assert (actual.targets == expected.targets).all()
+        assert (actual.edges == expected.edges).all()
+        assert (actual.messages == expected.messages).all()
+        assert actual.planner_calls == expected.planner_calls
+    assert sum(len(record.planner_calls) for record in reader) == sum(len(record.planner_calls) for record in live)
+    assert (reader.positions(-1) == np.array([(d.position.x, d.position.y) for d in simulator.drones])).all()
+
+def test_events_are_recorded_per_tick(tmp_path):
+    perception = random_events((12, 12), 20, random.Random(1), lifetime=5, moving_fraction=0.5)
+    simulator = Simulator((12,12), (3,3), 5, planner=StubPlanner, seed=1, perception=perception)
+    recorder = TraceRecorder(str(tmp_path), chunk_size=4)
+    live = []
+    simulator.add_observer(recorder)
+    simulator.add_observer(lambda sim: live.append(dict(sim.scenario_map)))
+    simulator.run(12)
+    recorder.close()
+    reader = TraceReader(str(tmp_path))
+    assert [record.scenario_map for record in reader] == live
+    # Events came, went or moved during the run.
+    assert len({tuple(sorted(scenario_map.items())) for scenario_map in live}) > 1
+
+def test_other_versions_are_rejected(tmp_path):
+    simulator = Simulator((9,9), (3,3), 5, planner=StubPlanner, seed=4)
+    recorder = TraceRecorder(str(tmp_path))
+    simulator.add_observer(recorder)
+    simulator.run(2)
+    recorder.close()
+    path = tmp_path / META_FILE
+    path.write_text(json.dumps({**json.loads(path.read_text()), "version": FORMAT_VERSION - 1}))
+    with pytest.raises(ValueError):
+        TraceReader(str(tmp_path))
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_record_and_replay(pathlib.Path(tempfile.mkdtemp()))
+    test_events_are_recorded_per_tick(pathlib.Path(tempfile.mkdtemp()))
+    test_other_versions_are_rejected(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,188 @@
+"""
+Matplotlib renderer that reuses its artists between frames.
+
+Drones are one scatter whose offsets are updated in place, broadcast edges are one
+LineCollection and labels come from a pool of reused text artists. Scenario markers are
+static and only redrawn when the scenario map changes. In interactive use the dynamic
+artists are blitted over a cached background, so a frame only costs the artists that
+move. Above `thin_above` drones the per-drone labels are dropped and edges are subsampled
+to at most `max_edges`.
+"""
+import numpy as np
+from matplotlib import animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from scenario import SCENARIO_DICT
+
+class SwarmRenderer:
+    def __init__(self, ax, map_dimensions, thin_above: int = 50, max_edges: int = 2000, blit: bool = True):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.map_dimensions = map_dimensions
+        self.thin_above = thin_above
+        self.max_edges = max_edges
+        self.blit = blit
+
+        ax.set_xlim(-0.5, map_dimensions[0] - 0.5)
+        ax.set_ylim(-0.5, map_dimensions[1] - 0.5)
+        # Draw grid
+        ax.set_xticks(np.arange(0.5, map_dimensions[0], 1), minor=False)
+        ax.set_yticks(np.arange(0.5, map_dimensions[1], 1), minor=False)
+        ax.grid(which='major', color='gray', linestyle='--', linewidth=0.5)
+
+        self.drones = ax.scatter(np.empty(0), np.empty(0), c=np.empty(0), cmap='tab10', vmin=0, vmax=9, s=100, zorder=4, animated=blit)
+        self.edges = LineCollection([], colors='blue', linewidths=0.8, zorder=3, animated=blit)
+        ax.add_collection(self.edges)
+        self.labels = []
+        self._scenario_artists = []
+        self._scenario_map = None
+        self._positions = None
+        self._segments = None
+        self._background = None
+        if blit:
+            self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    @property
+    def animated_artists(self):
+        return [self.edges, self.drones] + [label for label in self.labels if label.get_visible()]
+
+    def _on_draw(self, event):
+        # A full redraw happened (first show, resize, static change): cache the new background.
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        for artist in self.animated_artists:
+            self.ax.draw_artist(artist)
+
+    def draw_scenario(self, scenario_map) -> None:
+        """Draws the static scenario markers. Only does work when the scenario map changed."""
+        if scenario_map == self._scenario_map:
+            return
+        for artist in self._scenario_artists:
+            artist.remove()
+        self._scenario_artists = []
+        if scenario_map:
+            xy = np.array(list(scenario_map.keys()))
+            self._scenario_artists.append(self.ax.scatter(xy[:, 0], xy[:, 1], c='red', s=100, edgecolor='black', zorder=5))
+            for (x, y), abbr in scenario_map.items():
+                self._scenario_artists.append(self.ax.text(x + 0.1, y + 0.1, abbr, fontsize=8, ha='left', va='bottom', color='red'))
+        self._scenario_map = dict(scenario_map)
+        # The background changed, so the cached one is stale.
+        self._background = None
+
+    def _label(self, i):
+        while len(self.labels) <= i:
+            self.labels.append(self.ax.text(0, 0, '', fontsize=8, ha='left', va='bottom', zorder=6, animated=self.blit))
+        return self.labels[i]
+
+    def update(self, positions, edges, labels=()) -> None:
+        """
+        Draws a frame.
+        positions: (drones, 2) array of x, y.
+        edges: (edges, 2) array of (from, to) indices into positions.
+        labels: (x, y, text) tuples, ignored above `thin_above` drones.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        if self._positions is None or not np.array_equal(positions, self._positions):
+            if self._positions is None or len(positions) != len(self._positions):
+                self.drones.set_array(np.arange(len(positions)) % 10)
+            self.drones.set_offsets(positions)
+            self._positions = positions
+
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        if len(edges) > self.max_edges:
+            edges = edges[::-(-len(edges) // self.max_edges)]
+        segments = positions[edges]
+        if self._segments is None or not np.array_equal(segments, self._segments):
+            self.edges.set_segments(segments)
+            self._segments = segments
+
+        if len(positions) > self.thin_above:
+            labels = ()
+        for i, (x, y, text) in enumerate(labels):
+            label = self._label(i)
+            if label.get_text() != text:
+                label.set_text(text)
+            if label.get_position() != (x, y):
+                label.set_position((x, y))
+            label.set_visible(True)
+        for label in self.labels[len(labels):]:
+            label.set_visible(False)
+
+        if self.blit:
+            self._blit()
+
+    def _blit(self) -> None:
+        if self._background is None:
+            # Triggers _on_draw, which caches the background and draws the dynamic artists.
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        for artist in self.animated_artists:
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.ax.bbox)
+        self.canvas.flush_events()
+
+    def __call__(self, simulator) -> None:
+        """Simulator observer."""
+        self.draw_scenario(simulator.scenario_map)
+        if simulator.swarm is not None:
+            positions = simulator.swarm.positions
+        else:
+            positions = [(drone.position.x, drone.position.y) for drone in simulator.drones]
+        index = {drone.id: i for i, drone in enumerate(simulator.drones)}
+        edges = [(index[drone.id], index[neighbor.id]) for drone in simulator.drones for neighbor in simulator.neighbors[drone.id]]
+        labels = []
+        if len(simulator.drones) <= self.thin_above:
+            for drone in simulator.drones:
+                x, y = drone.position.x, drone.position.y
+                labels.append((x + 0.1, y - 0.3, f'Drone {drone.id}'))
+                labels.append((x + 0.1, y + 0.1, drone.historical_data.get_prompt(drone.id)))
+                labels.append((x + 0.1, y + 0.4, drone.current_data.get_prompt(drone.id)))
+        self.update(positions, edges, labels)
+
+    def render_record(self, record, scenario_map=None) -> None:
+        """Draws a recorded tick from a TraceReader."""
+        if scenario_map is not None:
+            self.draw_scenario(scenario_map)
+        ids = np.arange(len(record.positions))
+        labels = [(x + 0.1, y - 0.3, f'Drone {id}') for id, (x, y) in zip(ids, record.positions)]
+        self.update(record.positions, record.edges, labels)
+
+def _offscreen_axes(figsize):
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure, figure.add_subplot()
+
+def _writer(path: str, fps: int):
+    if not path.endswith(".gif") and animation.FFMpegWriter.isAvailable():
+        return animation.FFMpegWriter(fps=fps)
+    return animation.PillowWriter(fps=fps)
+
+def export_video(simulator, path: str, n_ticks: int, fps: int = 10, dpi: int = 100, figsize=(8, 8), **renderer_options) -> None:
+    """Steps the simulator n_ticks times and writes one frame per tick, without a display."""
+    figure, ax = _offscreen_axes(figsize)
+    map_dimensions = simulator.drones[0].map.map_dimensions
+    renderer = SwarmRenderer(ax, map_dimensions, blit=False, **renderer_options)
+    writer = _writer(path, fps)
+    with writer.saving(figure, path, dpi):
+        for _ in range(n_ticks):
+            simulator.step()
+            renderer(simulator)
+            writer.grab_frame()
+
+def export_trace_video(reader, path: str, fps: int = 10, dpi: int = 100, figsize=(8, 8), start: int = 0, stop: int | None = None, **renderer_options) -> None:
+    """Renders ticks [start, stop) of a recorded trace to a video without re-running the simulation."""
+    figure, ax = _offscreen_axes(figsize)
+    renderer = SwarmRenderer(ax, reader.meta["map_dimensions"], blit=False, **renderer_options)
+    writer = _writer(path, fps)
+    with writer.saving(figure, path, dpi):
+        for index in range(start, len(reader) if stop is None else stop):
+            record = reader[index]
+            renderer.render_record(record, record.scenario_map)
+            writer.grab_frame()
+
+def describe_scenarios(ax, scenario_map) -> None:
+    """Adds the scenario descriptions below the plot."""
+    for i, abbr in enumerate(scenario_map.values()):
+        text = abbr + ": " + SCENARIO_DICT[abbr]
+        ax.annotate(text, (0,0), (0, -20 - i * 10), xycoords='axes fraction', textcoords='offset points', va='top')
@@ -0,0 +1,66 @@
+import os
+from renderer import *
+from recorder import TraceReader, TraceRecorder
+from simulator import Simulator
+
+class StubPlanner:
+    @staticmethod
+    def execute_prompt(prompt: str) -> str:
+        return "up"
+
+def make_renderer(**options):
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    return figure, SwarmRenderer(figure.add_subplot(), (9, 9), **options)
+
+def test_artists_are_reused():
+    simulator = Simulator((9,9), (3,3), 10, planner=StubPlanner, seed=0)
+    figure, renderer = make_renderer(blit=False)
+    simulator.add_observer(renderer)
+    simulator.step()
+    label_pool = list(renderer.labels)
+    artists = len(renderer.ax.get_children())
+    simulator.run(5)
+    assert renderer.labels == label_pool
+    assert len(renderer.ax.get_children()) == artists
+    edges = sum(len(neighbors) for neighbors in simulator.neighbors.values())
+    assert len(renderer.edges.get_segments()) == edges
+    assert len(renderer.drones.get_offsets()) == 10
+
+def test_thinning_large_swarms():
+    simulator = Simulator((9,9), (3,3), 40, planner=StubPlanner, seed=0)
+    figure, renderer = make_renderer(blit=False, thin_above=20, max_edges=10)
+    simulator.step()
+    renderer(simulator)
+    assert not any(label.get_visible() for label in renderer.labels)
+    assert len(renderer.edges.get_segments()) <= 10
+
+def test_blitting():
+    simulator = Simulator((9,9), (3,3), 5, planner=StubPlanner, seed=0)
+    figure, renderer = make_renderer(blit=True)
+    renderer(simulator)
+    figure.canvas.draw()
+    assert renderer._background is not None
+    simulator.add_observer(renderer)
+    simulator.run(3)
+    # Scenario changes invalidate the cached background.
+    renderer.draw_scenario({(0, 0): "hurricane"})
+    assert renderer._background is None
+
+def test_export_videos(tmp_path):
+    simulator = Simulator((9,9), (3,3), 5, planner=StubPlanner, seed=0)
+    recorder = TraceRecorder(str(tmp_path / "trace"))
+    simulator.add_observer(recorder)
+    export_video(simulator, str(tmp_path / "run.gif"), n_ticks=4, fps=5, dpi=30, figsize=(3, 3))
+    recorder.close()
+    assert os.path.getsize(tmp_path / "run.gif") > 0
+
+    export_trace_video(TraceReader(str(tmp_path / "trace")), str(tmp_path / "replay.gif"), fps=5, dpi=30, figsize=(3, 3))
+    assert os.path.getsize(tmp_path / "replay.gif") > 0
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_artists_are_reused()
+    test_thinning_large_swarms()
+    test_blitting()
+    test_export_videos(pathlib.Path(tempfile.mkdtemp()))
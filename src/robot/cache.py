@@ -0,0 +1,139 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class InferenceCache:
+    """
+    Cache of planner answers keyed on the normalized prompt and the model parameters.
+
+    The in-memory tier is an LRU holding at most `max_entries` answers. Entries older than
+    `ttl` seconds are treated as missing in both tiers. Given a `path`, answers are also
+    written to a sqlite database so they survive restarts.
+    """
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None, path: str | None = None, clock=time.time):
+        assert max_entries > 0
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        # Planning stages call the cache from several threads.
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS inferences (key TEXT PRIMARY KEY, created REAL, result TEXT)")
+            self._db.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(prompt: str, **params) -> str:
+        """Key for a prompt, insensitive to whitespace differences."""
+        normalized_prompt = " ".join(prompt.split())
+        payload = json.dumps({"prompt": normalized_prompt, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return self._ttl is not None and self._clock() - created > self._ttl
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT created, result FROM inferences WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[0]):
+                    self._insert(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: str) -> None:
+        with self._lock:
+            created = self._clock()
+            self._insert(key, created, result)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO inferences VALUES (?, ?, ?)", (key, created, result))
+                self._db.commit()
+
+    def _insert(self, key: str, created: float, result: str) -> None:
+        self._entries[key] = (created, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+    def clear(self) -> None:
+        """Drops every entry from both tiers."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM inferences")
+                self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+class CachedPlanner:
+    """Planner wrapper that answers repeated prompts from an InferenceCache."""
+    def __init__(self, planner, cache: InferenceCache | None = None):
+        self.planner = planner
+        self.cache = cache if cache is not None else InferenceCache()
+        # Answers of drone-aware planners depend on the drone's map, not just the prompt.
+        if hasattr(planner, "execute_for"):
+            self.execute_for = planner.execute_for
+        # Sync planners stay sync, so ConcurrentPlanner runs them in its own bounded pool.
+        if hasattr(planner, "execute_prompt_async"):
+            self.execute_prompt_async = self._execute_prompt_async
+
+    def _key(self, prompt: str) -> str:
+        return self.cache.make_key(
+            prompt,
+            model=getattr(self.planner, "model", type(self.planner).__name__),
+            max_tokens=getattr(self.planner, "max_tokens", None),
+        )
+
+    def execute_prompt(self, prompt: str) -> str:
+        key = self._key(prompt)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.planner.execute_prompt(prompt)
+            self.cache.put(key, result)
+        return result
+
+    async def _execute_prompt_async(self, prompt: str) -> str:
+        key = self._key(prompt)
+        result = self.cache.get(key)
+        if result is None:
+            result = await self.planner.execute_prompt_async(prompt)
+            self.cache.put(key, result)
+        return result
@@ -0,0 +1,83 @@
+import asyncio
+from cache import *
+import threading
+from planning import ConcurrentPlanner, FakePlanner
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_eviction_and_stats():
+    cache = InferenceCache(max_entries=2)
+    cache.put("a", "up")
+    cache.put("b", "down")
+    assert cache.get("a") == "up"
+    cache.put("c", "left")
+    assert cache.get("b") is None
+    assert cache.get("a") == "up" and cache.get("c") == "left"
+    assert cache.stats["hits"] == 3 and cache.stats["misses"] == 1 and cache.stats["evictions"] == 1
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = InferenceCache(ttl=10, clock=clock)
+    cache.put("a", "up")
+    clock.now = 5
+    assert cache.get("a") == "up"
+    clock.now = 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "inferences.sqlite")
+    cache = InferenceCache(path=path)
+    cache.put("a", "right")
+    cache.close()
+
+    cache = InferenceCache(path=path)
+    assert cache.get("a") == "right"
+    assert cache.stats["disk_hits"] == 1
+    cache.close()
+
+def test_key_normalizes_prompt():
+    assert InferenceCache.make_key("move  up\n?", model="m") == InferenceCache.make_key(" move up ?", model="m")
+    assert InferenceCache.make_key("move up", model="m") != InferenceCache.make_key("move up", model="n")
+
+def test_cached_planner():
+    planner = FakePlanner(response="left")
+    cached = CachedPlanner(planner)
+    assert [cached.execute_prompt("same prompt") for _ in range(5)] == ["left"] * 5
+    assert asyncio.run(cached.execute_prompt_async("same  prompt")) == "left"
+    assert planner.calls == 1
+    assert cached.cache.stats["hits"] == 5
+
+class BlockingPlanner:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def execute_prompt(self, prompt: str) -> str:
+        self.release.wait()
+        return "left"
+
+def test_cached_sync_planner_stays_bounded():
+    planner = BlockingPlanner()
+    cached = CachedPlanner(planner)
+    assert not hasattr(cached, "execute_prompt_async")
+    stage = ConcurrentPlanner(cached, max_concurrency=1, timeout=0.05, fallback=lambda drone: "up")
+    try:
+        assert stage.plan([(None, "first")]) == ["up"]
+        assert stage.timeouts == 1 and stage.abandoned == 1
+    finally:
+        planner.release.set()
+        stage.close()
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_lru_eviction_and_stats()
+    test_ttl_expiry()
+    test_disk_tier_survives_restart(pathlib.Path(tempfile.mkdtemp()))
+    test_key_normalizes_prompt()
+    test_cached_planner()
+    test_cached_sync_planner_stays_bounded()
@@ -0,0 +1,118 @@
+import struct
+import zlib
+from robot.drone import Message, Position, State
+from robot.state_store import DEFAULT_STATE_STORE
+
+MAGIC = b"SM"
+VERSION = 2
+FLAG_COMPRESSED = 0x01
+
+# magic, version, flags, interned table checksum, number of states
+HEADER = struct.Struct("<2sBBII")
+# id, seq, x, y, interned perception context index
+STATE_HEADER = struct.Struct("<IIiiH")
+LENGTH = struct.Struct("<I")
+# Gossip control messages: a digest lists (id, seq) pairs, a request lists the wanted ids.
+DIGEST_ENTRY = struct.Struct("<II")
+REQUEST_ENTRY = struct.Struct("<I")
+# Interned index marking a perception context that is sent as free text.
+LITERAL = 0xFFFF
+
+class MessageCodec:
+    """
+    Compact, versioned binary wire format for Message.
+
+    Every state is encoded as a fixed-width id, sequence number and coordinates. The perception context
+    is an index into a table of interned strings, for example the SCENARIO_DICT
+    descriptions, or length-prefixed free text when it is not in the table. The
+    inference result is length-prefixed free text. The body can optionally be
+    zlib-compressed. Both ends need the same interned table; decoding checks this.
+    """
+    def __init__(self, interned_strings=(), compress: bool = False, compression_level: int = 6):
+        self._interned = list(dict.fromkeys(interned_strings))
+        assert len(self._interned) < LITERAL, "Too many interned strings."
+        self._index = {string: i for i, string in enumerate(self._interned)}
+        self._checksum = zlib.crc32("\0".join(self._interned).encode("utf-8"))
+        self.compress = compress
+        self.compression_level = compression_level
+
+    def encode(self, message: Message) -> bytes:
+        """Encodes a message into bytes."""
+        body = bytearray()
+        for id, state in message.data.items():
+            index = self._index.get(state.perception_context, LITERAL)
+            body += STATE_HEADER.pack(id, state.seq, state.position.x, state.position.y, index)
+            if index == LITERAL:
+                self._pack_text(body, state.perception_context)
+            self._pack_text(body, state.inference_result)
+        flags = 0
+        if self.compress:
+            body = zlib.compress(body, self.compression_level)
+            flags |= FLAG_COMPRESSED
+        return HEADER.pack(MAGIC, VERSION, flags, self._checksum, len(message.data)) + body
+
+    def decode(self, buffer) -> Message:
+        """
+        Decodes bytes, bytearray or memoryview into a Message of State objects.
+        Uncompressed buffers are read in place without copying the payload.
+        Raises ValueError for malformed input.
+        """
+        view = memoryview(buffer)
+        try:
+            magic, version, flags, checksum, count = HEADER.unpack_from(view, 0)
+            if magic != MAGIC:
+                raise ValueError("Not an encoded message.")
+            if version != VERSION:
+                raise ValueError(f"Unsupported message version {version}.")
+            if checksum != self._checksum:
+                raise ValueError("Message was encoded with a different interned string table.")
+            body = view[HEADER.size:]
+            if flags & FLAG_COMPRESSED:
+                body = memoryview(zlib.decompress(body))
+            message = Message()
+            offset = 0
+            for _ in range(count):
+                id, seq, x, y, index = STATE_HEADER.unpack_from(body, offset)
+                offset += STATE_HEADER.size
+                if index == LITERAL:
+                    perception_context, offset = self._unpack_text(body, offset)
+                else:
+                    perception_context = self._interned[index]
+                inference_result, offset = self._unpack_text(body, offset)
+                message.add_state(id, DEFAULT_STATE_STORE.state(id, Position(x, y), perception_context, inference_result, seq))
+            if offset != len(body):
+                raise ValueError("Trailing bytes after the last state.")
+        except (struct.error, IndexError, UnicodeDecodeError, zlib.error) as e:
+            raise ValueError(f"Malformed message: {e}") from e
+        return message
+
+    def encoded_size(self, message: Message) -> int:
+        """Size of the uncompressed encoding, computed without encoding the message."""
+        size = HEADER.size
+        for state in message.data.values():
+            size += STATE_HEADER.size + LENGTH.size + len(state.inference_result.encode("utf-8"))
+            if state.perception_context not in self._index:
+                size += LENGTH.size + len(state.perception_context.encode("utf-8"))
+        return size
+
+    @staticmethod
+    def digest_size(num_entries: int) -> int:
+        return HEADER.size + num_entries * DIGEST_ENTRY.size
+
+    @staticmethod
+    def request_size(num_entries: int) -> int:
+        return HEADER.size + num_entries * REQUEST_ENTRY.size
+
+    @staticmethod
+    def _pack_text(body: bytearray, text: str) -> None:
+        data = text.encode("utf-8")
+        body += LENGTH.pack(len(data))
+        body += data
+
+    @staticmethod
+    def _unpack_text(body: memoryview, offset: int) -> tuple[str, int]:
+        (length,) = LENGTH.unpack_from(body, offset)
+        offset += LENGTH.size
+        if offset + length > len(body):
+            raise ValueError("Text runs past the end of the message.")
+        return str(body[offset:offset + length], "utf-8"), offset + length
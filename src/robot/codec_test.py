@@ -0,0 +1,50 @@
+import pytest
+from codec import *
+
+SCENARIOS = ["A person has been located.", "A main road has been damaged."]
+
+def make_message():
+    message = Message()
+    message.add_state(1, State(1, Position(1, 2), SCENARIOS[0], "Move up."))
+    message.add_state(7, State(7, Position(-3, 900), "Something not interned, with ünïcode.", ""))
+    return message
+
+def test_round_trip_into_states():
+    message = make_message()
+    for compress in (False, True):
+        codec = MessageCodec(SCENARIOS, compress=compress)
+        encoded = codec.encode(message)
+        for buffer in (encoded, bytearray(encoded), memoryview(encoded)):
+            decoded = codec.decode(buffer)
+            assert decoded.data == message.data
+            assert isinstance(decoded.get_state(7), State)
+            assert isinstance(decoded.get_state(7).position, Position)
+
+def test_encoded_size_and_compactness():
+    message = make_message()
+    codec = MessageCodec(SCENARIOS)
+    assert codec.encoded_size(message) == len(codec.encode(message))
+    assert len(codec.encode(message)) < len(Message.serialize_to_string(message).encode("utf-8"))
+
+def test_malformed_input():
+    codec = MessageCodec(SCENARIOS)
+    encoded = codec.encode(make_message())
+    old_version = encoded[:2] + bytes([VERSION - 1]) + encoded[3:]
+    for buffer in (b"", b"XX" + encoded[2:], old_version, encoded[:-1], encoded + b"\0"):
+        with pytest.raises(ValueError):
+            codec.decode(buffer)
+    with pytest.raises(ValueError):
+        MessageCodec(["other table"]).decode(encoded)
+
+def test_json_round_trip_into_states():
+    message = make_message()
+    decoded = Message.deserialize_from_string(Message.serialize_to_string(message))
+    assert decoded.data == message.data
+    with pytest.raises(ValueError):
+        Message.deserialize_from_string('{"1": {"id": 1}}')
+
+if __name__ == "__main__":
+    test_round_trip_into_states()
+    test_encoded_size_and_compactness()
+    test_malformed_input()
+    test_json_round_trip_into_states()
@@ -0,0 +1,212 @@
+"""
+Coverage map exchange between neighboring drones.
+
+The map is split into square tiles. A drone sends each neighbor only the tiles that changed
+since it last sent to that neighbor, so repeated contacts cost little. A delta is encoded as
+the set of dirty tiles, either as a bitmap or as a list of tile numbers, whichever is
+smaller, followed by the counts of those tiles run-length encoded.
+
+Two merge rules are supported. With "max" a receiver keeps the larger count of every cell.
+Merging is idempotent, so tiles that a merge changed are forwarded to further neighbors.
+With "sum" a drone sends only the visits it made itself since the last contact, and the
+receiver adds them. Those are never forwarded, so no visit is counted twice.
+"""
+from array import array
+import struct
+import numpy as np
+
+MERGE_RULES = ("max", "sum")
+# Tile section, number of dirty tiles and number of runs.
+_HEADER = struct.Struct("<BII")
+_BITMAP, _TILE_LIST = 0, 1
+# Longest run one length entry can hold.
+_MAX_RUN = np.iinfo(np.uint16).max
+
+class CoverageCodec:
+    """Binary encoding of coverage deltas: (tile numbers, flat counts of those tiles in tile order)."""
+    def __init__(self, map_dimensions: tuple[int], tile: int = 8, dtype=np.uint16):
+        assert map_dimensions[0] > 0 and map_dimensions[1] > 0 and tile > 0
+        self.map_dimensions = map_dimensions
+        self.tile = tile
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.tiles_shape = (-(-map_dimensions[1] // tile), -(-map_dimensions[0] // tile))
+        self.num_tiles = self.tiles_shape[0] * self.tiles_shape[1]
+
+    def tile_of(self, x: int, y: int) -> int:
+        return (y // self.tile) * self.tiles_shape[1] + x // self.tile
+
+    def tile_bounds(self, tile: int) -> tuple[slice, slice]:
+        """(y, x) slices of the cells of a tile; tiles on the right and bottom edges may be cut off."""
+        tile_y, tile_x = divmod(int(tile), self.tiles_shape[1])
+        top, left = tile_y * self.tile, tile_x * self.tile
+        return slice(top, min(top + self.tile, self.map_dimensions[1])), slice(left, min(left + self.tile, self.map_dimensions[0]))
+
+    def encode(self, tiles: np.ndarray, values: np.ndarray) -> bytes:
+        tiles = np.asarray(tiles, dtype=np.int64)
+        # Counts above the codec's range are sent as its maximum, which "max" merges tolerate.
+        values = np.minimum(np.asarray(values), np.iinfo(self.dtype).max).astype(self.dtype)
+        if (self.num_tiles + 7) // 8 <= 4 * len(tiles):
+            mask = np.zeros(self.num_tiles, dtype=bool)
+            mask[tiles] = True
+            kind, tile_section = _BITMAP, np.packbits(mask).tobytes()
+        else:
+            kind, tile_section = _TILE_LIST, tiles.astype("<u4").tobytes()
+        lengths, run_values = self._runs(values)
+        return _HEADER.pack(kind, len(tiles), len(lengths)) + tile_section + lengths.astype("<u2").tobytes() + run_values.tobytes()
+
+    @staticmethod
+    def _runs(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Run lengths and values, with runs longer than a length entry split up."""
+        if len(values) == 0:
+            return np.empty(0, dtype=np.int64), values
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(values)) + 1])
+        lengths = np.diff(np.append(starts, len(values)))
+        pieces = (lengths - 1) // _MAX_RUN + 1
+        split = np.full(int(pieces.sum()), _MAX_RUN, dtype=np.int64)
+        # The last piece of every run holds the remainder.
+        split[np.cumsum(pieces) - 1] = lengths - (pieces - 1) * _MAX_RUN
+        return split, np.repeat(values[starts], pieces)
+
+    def decode(self, buffer: bytes) -> tuple[np.ndarray, np.ndarray]:
+        kind, num_tiles, num_runs = _HEADER.unpack_from(buffer)
+        offset = _HEADER.size
+        if kind == _BITMAP:
+            size = (self.num_tiles + 7) // 8
+            mask = np.unpackbits(np.frombuffer(buffer, dtype=np.uint8, count=size, offset=offset), count=self.num_tiles).astype(bool)
+            tiles = np.flatnonzero(mask)
+        else:
+            size = 4 * num_tiles
+            tiles = np.frombuffer(buffer, dtype="<u4", count=num_tiles, offset=offset).astype(np.int64)
+        offset += size
+        lengths = np.frombuffer(buffer, dtype="<u2", count=num_runs, offset=offset)
+        offset += 2 * num_runs
+        run_values = np.frombuffer(buffer, dtype=self.dtype, count=num_runs, offset=offset)
+        assert len(tiles) == num_tiles, "Malformed coverage delta."
+        return tiles, np.repeat(run_values, lengths)
+
+class CoverageExchange:
+    """
+    Exchanges coverage deltas between the neighbors of every tick and keeps per-tick
+    statistics of the bytes sent against the coverage gained, in `history`.
+    Drones are identified by their id.
+    """
+    def __init__(self, map_dimensions: tuple[int], rule: str = "max", tile: int = 8, dtype=np.uint16):
+        assert rule in MERGE_RULES, f"Merge rule must be one of {MERGE_RULES}."
+        self.codec = CoverageCodec(map_dimensions, tile, dtype)
+        self.rule = rule
+        # "max": per drone the version of the last change of every tile, and its version counter.
+        self._versions: dict[int, np.ndarray] = {}
+        self._clock: dict[int, int] = {}
+        # "sum": per drone the cells of its own visits, in order.
+        self._visits: dict[int, array] = {}
+        # (sender id, receiver id) -> version or number of own visits at the last send.
+        self._last_sent: dict[tuple[int, int], int] = {}
+        # Cells any drone has visited.
+        self._covered = np.zeros((map_dimensions[1], map_dimensions[0]), dtype=bool)
+        self.covered_cells = 0
+        self.bytes = 0
+        self.messages = 0
+        self.history: list[dict] = []
+
+    def _mark(self, id: int, tile: int) -> None:
+        versions = self._versions.get(id)
+        if versions is None:
+            versions = self._versions[id] = np.zeros(self.codec.num_tiles, dtype=np.uint32)
+        self._clock[id] = self._clock.get(id, 0) + 1
+        versions[tile] = self._clock[id]
+
+    def record_visits(self, drones) -> int:
+        """Records the cell every drone is on as visited this tick. Returns the number of newly covered cells."""
+        gained = 0
+        for drone in drones:
+            x, y = drone.position.x, drone.position.y
+            if not self._covered[y, x]:
+                self._covered[y, x] = True
+                gained += 1
+            if self.rule == "max":
+                self._mark(drone.id, self.codec.tile_of(x, y))
+            else:
+                self._visits.setdefault(drone.id, array("q")).append(y * self.codec.map_dimensions[0] + x)
+        self.covered_cells += gained
+        return gained
+
+    def delta(self, sender, receiver_id: int) -> tuple[np.ndarray, np.ndarray] | None:
+        """The tiles the sender has not sent to the receiver yet and their counts, or None if there are none."""
+        key = (sender.id, receiver_id)
+        since = self._last_sent.get(key, 0)
+        if self.rule == "max":
+            versions = self._versions.get(sender.id)
+            if versions is None or self._clock[sender.id] == since:
+                return None
+            tiles = np.flatnonzero(versions > since)
+            self._last_sent[key] = self._clock[sender.id]
+            values = np.concatenate([sender.map.get_counts(*self.codec.tile_bounds(tile)).ravel() for tile in tiles])
+            return tiles, values
+
+        visits = self._visits.get(sender.id)
+        if visits is None or len(visits) == since:
+            return None
+        self._last_sent[key] = len(visits)
+        width = self.codec.map_dimensions[0]
+        cells, counts = np.unique(np.frombuffer(visits, dtype=np.int64)[since:], return_counts=True)
+        ys, xs = np.divmod(cells, width)
+        cell_tiles = (ys // self.codec.tile) * self.codec.tiles_shape[1] + xs // self.codec.tile
+        tiles = np.unique(cell_tiles)
+        blocks = []
+        for tile in tiles:
+            rows, columns = self.codec.tile_bounds(tile)
+            block = np.zeros((rows.stop - rows.start, columns.stop - columns.start), dtype=np.int64)
+            mine = cell_tiles == tile
+            block[ys[mine] - rows.start, xs[mine] - columns.start] = counts[mine]
+            blocks.append(block.ravel())
+        return tiles, np.concatenate(blocks)
+
+    def merge(self, receiver, tiles: np.ndarray, values: np.ndarray) -> int:
+        """Merges a decoded delta into the receiver's map. Returns the number of tiles that changed."""
+        changed = 0
+        offset = 0
+        for tile in tiles:
+            rows, columns = self.codec.tile_bounds(tile)
+            shape = (rows.stop - rows.start, columns.stop - columns.start)
+            block = values[offset:offset + shape[0] * shape[1]].reshape(shape)
+            offset += shape[0] * shape[1]
+            if receiver.map.merge_counts(rows, columns, block, self.rule):
+                changed += 1
+                if self.rule == "max":
+                    self._mark(receiver.id, int(tile))
+        return changed
+
+    def step(self, drones, neighbors: dict) -> dict:
+        """
+        Records this tick's visits, then lets every drone send its delta to each of its
+        neighbors (a {drone id: [drones]} dict, as Simulator.neighbors). Returns the statistics
+        of the tick, which are also appended to `history`.
+        """
+        known_before = sum(drone.map.visited_cells for drone in drones)
+        gained = self.record_visits(drones)
+        sent_bytes = messages = 0
+        for sender in drones:
+            for receiver in neighbors.get(sender.id, ()):
+                delta = self.delta(sender, receiver.id)
+                if delta is None:
+                    continue
+                payload = self.codec.encode(*delta)
+                sent_bytes += len(payload)
+                messages += 1
+                self.merge(receiver, *self.codec.decode(payload))
+        self.bytes += sent_bytes
+        self.messages += messages
+        num_cells = self._covered.size
+        known = sum(drone.map.visited_cells for drone in drones)
+        stats = {
+            "bytes": sent_bytes,
+            "messages": messages,
+            "coverage": self.covered_cells / num_cells,
+            "coverage_gained": gained / num_cells,
+            # Mean fraction of the map each drone knows to be visited, and what the exchange added to it.
+            "known_coverage": known / (num_cells * max(len(drones), 1)),
+            "known_coverage_gained": (known - known_before) / (num_cells * max(len(drones), 1)),
+        }
+        stats["bytes_per_known_cell"] = sent_bytes / (known - known_before) if known > known_before else None
+        self.history.append(stats)
+        return stats
@@ -0,0 +1,80 @@
+import random
+import numpy as np
+from coverage import *
+from drone import Drone, GridMap, Position
+
+def test_codec_round_trip():
+    rng = np.random.default_rng(0)
+    codec = CoverageCodec((50, 30), tile=8)
+    for num_tiles in (1, 3, 20):
+        tiles = np.sort(rng.choice(codec.num_tiles, num_tiles, replace=False))
+        size = sum((rows.stop - rows.start) * (columns.stop - columns.start) for rows, columns in map(codec.tile_bounds, tiles))
+        values = rng.integers(0, 3, size) * (rng.random(size) < 0.2)
+        decoded_tiles, decoded_values = codec.decode(codec.encode(tiles, values))
+        assert decoded_tiles.tolist() == tiles.tolist()
+        assert decoded_values.tolist() == values.tolist()
+
+def test_codec_compresses_long_runs():
+    codec = CoverageCodec((300, 300), tile=300)
+    values = np.zeros(300 * 300, dtype=np.int64)
+    values[-1] = 70000
+    payload = codec.encode([0], values)
+    assert len(payload) < 30
+    tiles, decoded = codec.decode(payload)
+    assert tiles.tolist() == [0] and len(decoded) == 300 * 300
+    # Counts beyond the codec's range are sent as its maximum.
+    assert decoded[-1] == np.iinfo(np.uint16).max and not decoded[:-1].any()
+
+def make_drones(count):
+    drones = [Drone(i, (20, 12), (3, 3), rng=random.Random(i)) for i in range(count)]
+    return drones
+
+def check_region_sums(map: GridMap):
+    counts = map.get_counts(slice(0, 12), slice(0, 20))
+    for region_y in range(5):
+        for region_x in range(8):
+            bounds = map.get_region_bounds((region_y, region_x))
+            assert map.region_exploration_score(region_x, region_y) == counts[bounds].sum()
+    assert map.visited_cells == np.count_nonzero(counts)
+
+def test_max_merge_forwards_coverage():
+    first, second, third = make_drones(3)
+    exchange = CoverageExchange((20, 12), rule="max", tile=4)
+    chain = {first.id: [second], second.id: [third], third.id: []}
+    for _ in range(30):
+        for drone in (first, second, third):
+            drone.move()
+        exchange.step([first, second, third], chain)
+    expected = np.maximum(first.map.get_counts(slice(0, 12), slice(0, 20)), second.map.get_counts(slice(0, 12), slice(0, 20)))
+    # The third drone learns the first drone's coverage through the second.
+    assert (third.map.get_counts(slice(0, 12), slice(0, 20)) >= expected).all()
+    for drone in (first, second, third):
+        check_region_sums(drone.map)
+    # Without new visits nothing is sent again.
+    messages = exchange.messages
+    exchange.step([], chain)
+    assert exchange.messages == messages
+
+def test_sum_merge_counts_every_visit_once():
+    first, second, third = make_drones(3)
+    exchange = CoverageExchange((20, 12), rule="sum", tile=4)
+    everyone = {drone.id: [other for other in (first, second, third) if other is not drone] for drone in (first, second, third)}
+    own = {drone.id: np.zeros((12, 20), dtype=np.int64) for drone in (first, second, third)}
+    for _ in range(25):
+        for drone in (first, second, third):
+            drone.move()
+            own[drone.id][drone.position.y, drone.position.x] += 1
+        exchange.step([first, second, third], everyone)
+    total = sum(own.values())
+    for drone in (first, second, third):
+        assert (drone.map.get_counts(slice(0, 12), slice(0, 20)) == total).all()
+        check_region_sums(drone.map)
+    stats = exchange.history[-1]
+    assert stats["messages"] == 6 and stats["bytes"] > 0
+    assert 0 < stats["coverage"] <= stats["known_coverage"] + 1e-9
+
+if __name__ == "__main__":
+    test_codec_round_trip()
+    test_codec_compresses_long_runs()
+    test_max_merge_forwards_coverage()
+    test_sum_merge_counts_every_visit_once()
@@ -3,24 +3,11 @@ import numpy as np
 import random
 import dataclasses
 import json
-# from planner import Planner
+from collections import deque
 from typing import List
-import replicate
-
-class Planner:
-    @staticmethod
-    def execute_prompt(prompt: str) -> str:
-        input = {
-            "prompt": prompt,
-            "max_tokens": 1024
-        }
-        result = ""
-        for event in replicate.stream(
-            "meta/meta-llama-3.1-405b-instruct",
-            input=input
-        ):
-            result += str(event)
-        return result
+from robot.planner import Planner
+from robot.prompt import DEFAULT_PROMPT_BUILDER, PromptBuilder
+from robot.state_store import DEFAULT_STATE_STORE, Position, State
 
 type DroneID = int
 type PerceptionContext = str
@@ -32,21 +19,6 @@ class EnhancedJSONEncoder(json.JSONEncoder):
             return dataclasses.asdict(o)
         return super().default(o)
 
-@dataclasses.dataclass
-class Position:
-    x: int
-    y: int
-
-    def __str__(self):
-        return f"({self.x}, {self.y})"
-
-@dataclasses.dataclass
-class State:
-    id: DroneID
-    position: Position
-    perception_context: PerceptionContext
-    inference_result: InferenceResult
-
 class Message:
     def __init__(self):
         self._data : dict[DroneID, State] = {}
@@ -70,9 +42,25 @@ class Message:
         self.data = other.data.copy()
 
     def update(self, other):
-        """Update the data with other data"""
+        """Update the data with other data, unless we already hold a newer version"""
         for id, state in other.data.items():
-            self.data[id] = state
+            current = self.data.get(id)
+            if current is None or current.seq <= state.seq:
+                self.data[id] = state
+
+    def digest(self) -> dict[DroneID, int]:
+        """The version we hold for each drone"""
+        return {id: state.seq for id, state in self.data.items()}
+
+    def missing(self, digest: dict[DroneID, int]) -> list[DroneID]:
+        """Ids in a digest for which we do not hold that version or a newer one"""
+        return [id for id, seq in digest.items() if id not in self.data or self.data[id].seq < seq]
+
+    def subset(self, ids):
+        """A new message with only the given ids"""
+        message = Message()
+        message.data = {id: self.data[id] for id in ids}
+        return message
 
     def add_state(self, id: DroneID, state: State):
         assert id == state.id
@@ -82,16 +70,18 @@ class Message:
         return self.data[id]
 
     def get_prompt(self, id: DroneID):
-        prompt = ""
-        if id in self.data.keys():
-             prompt += f"Our drone has observed that {self.data[id].perception_context}"
-        if self.data:
-            prompt = "Our drone knows some information from its peers. "
-            for id, state in self.data.items():
-                prompt += f"peer {id} has observed that {state.perception_context}."
+        """Describes the states in this message, from the point of view of drone `id`. Unbounded, see PromptBuilder."""
+        parts = []
+        if id in self.data:
+            parts.append(f"Our drone has observed that {self.data[id].perception_context} ")
+        peers = [(peer, state) for peer, state in self.data.items() if peer != id]
+        if peers:
+            parts.append("Our drone knows some information from its peers. ")
+            for peer, state in peers:
+                parts.append(f"peer {peer} has observed that {state.perception_context} ")
                 if state.inference_result:
-                    prompt += f"peer {id} has planned the following response: {state.inference_result}"
-        return prompt
+                    parts.append(f"peer {peer} has planned the following response: {state.inference_result} ")
+        return "".join(parts)
         
     @classmethod
     def serialize_to_string(cls, message) -> str:
@@ -100,48 +90,145 @@ class Message:
 
     @classmethod
     def deserialize_from_string(cls, serialized_message: str):
-        """Load a serialized message into a Message instance"""
+        """Load a serialized message into a Message instance. Raises ValueError for malformed input."""
         message = cls()
-        # TODO: make this exception-safe
-        message.data = json.loads(serialized_message)
+        try:
+            for id, state in json.loads(serialized_message).items():
+                position = Position(**state.pop("position"))
+                message.add_state(int(id), DEFAULT_STATE_STORE.state(position=position, **state))
+        except (AttributeError, KeyError, TypeError, AssertionError) as e:
+            # json.JSONDecodeError is already a ValueError.
+            raise ValueError(f"Malformed message: {e}") from e
         return message
 
+class StateHistory(Message):
+    """
+    Bounded history of the states a drone has heard of, holding at most `capacity` records.
+    `data` holds the newest version per drone, so a history reads like any Message.
+
+    With eviction "origin", a newer version of a drone replaces its older one and the drone
+    heard from least recently is evicted first. The history then remembers up to `capacity`
+    drones. With eviction "oldest", the history is a ring buffer in which every version
+    takes a slot and the oldest slot is overwritten.
+    """
+    EVICTIONS = ("origin", "oldest")
+
+    def __init__(self, capacity: int = 64, eviction: str = "origin"):
+        assert capacity > 0, "Capacity must be positive."
+        assert eviction in self.EVICTIONS, f"Eviction must be one of {self.EVICTIONS}."
+        super().__init__()
+        self.capacity = capacity
+        self.eviction = eviction
+        self._ring: deque[State] = deque(maxlen=capacity)
+
+    @Message.data.setter
+    def data(self, data):
+        self.clear()
+        for id, state in data.items():
+            self.add_state(id, state)
+
+    def clear(self):
+        super().clear()
+        self._ring.clear()
+
+    def copy(self, other):
+        """Replace the history with other data"""
+        self.data = other.data
+
+    def update(self, other):
+        """Add the states of other data that are newer than the versions we hold"""
+        for id, state in other.data.items():
+            self.add_state(id, state)
+
+    def add_state(self, id: DroneID, state: State):
+        assert id == state.id
+        latest = self._data.get(id)
+        if latest is not None and (latest is state or latest.seq > state.seq):
+            return
+        if self.eviction == "origin":
+            # Reinserting moves the drone to the end of the dict, which is ordered by last contact.
+            self._data.pop(id, None)
+            self._data[id] = state
+            if len(self._data) > self.capacity:
+                del self._data[next(iter(self._data))]
+            return
+        evicted = self._ring[0] if len(self._ring) == self.capacity else None
+        self._ring.append(state)
+        self._data[id] = state
+        if evicted is not None and self._data.get(evicted.id) is evicted:
+            # Fall back to the newest version of that drone still in the ring.
+            older = [other for other in self._ring if other.id == evicted.id]
+            if older:
+                self._data[evicted.id] = max(older, key=lambda other: other.seq)
+            else:
+                del self._data[evicted.id]
+
+    def versions(self, id: DroneID) -> list[State]:
+        """Every version of a drone the history holds, oldest first."""
+        if self.eviction == "origin":
+            return [self._data[id]] if id in self._data else []
+        return [state for state in self._ring if state.id == id]
+
 
 class GridMap:
-    def __init__(self, map_dimensions: tuple[int], region_dimensions: tuple[int]):
+    def __init__(self, map_dimensions: tuple[int], region_dimensions: tuple[int], counts=None):
+        """
+        counts optionally holds the visit counters, e.g. a compact uint8 array, a TiledCounts
+        or a slice of a MapPool. Counters saturate at the largest value of their dtype.
+        """
         assert len(map_dimensions) == 2, "Need to specify 2 dimensions."
         assert region_dimensions[0] < map_dimensions[0] and region_dimensions[1] < map_dimensions[1]
         self._map_dimensions = map_dimensions
         self._region_dimensions = region_dimensions
-        self._map = np.zeros((9,9),dtype=int)
-    
+        # Visit counts per cell, indexed [y][x].
+        if counts is None:
+            counts = np.zeros((map_dimensions[1], map_dimensions[0]), dtype=int)
+        assert counts.shape == (map_dimensions[1], map_dimensions[0]), "Counters must be indexed [y][x]."
+        self._map = counts
+        self._max_count = np.iinfo(counts.dtype).max
+        self._visited_cells = int(np.count_nonzero(np.asarray(counts)))
+        # Visit counts per region, indexed like get_region. Kept in sync by visit_cell.
+        # Regions hold the sum of their cells, so compact counters get at least 32 bits here.
+        last_region = self.get_region(Position(map_dimensions[0] - 1, map_dimensions[1] - 1))
+        self._region_map = np.zeros((last_region[0] + 1, last_region[1] + 1), dtype=np.promote_types(counts.dtype, np.uint32))
+
+    def detach_counts(self):
+        """
+        Drops the visit counters and returns them, e.g. before sending a map whose counters live
+        in a shared MapPool to another process, which then rebinds them with attach_counts.
+        """
+        counts, self._map = self._map, None
+        return counts
+
+    def attach_counts(self, counts) -> None:
+        """Binds counters holding this map's visits, e.g. its slice of a shared MapPool."""
+        assert counts.shape == (self._map_dimensions[1], self._map_dimensions[0]), "Counters must be indexed [y][x]."
+        self._map = counts
+
     def print(self):
         """
-        Prints 9x9 numpy array input board in an easier to read format.
+        Prints the map in an easier to read format, with separators between blocks of region size.
         """
         
-        # Some basic checks
-        assert self._map.shape == (9, 9)
-        assert type(self._map) == np.ndarray
-        
-        # Convert array elements to strings
-        board_str = self._map.astype(str)
-        
-        # Our row separator
-        row_sep = '-'*25
+        # Convert array elements to strings of equal width
+        board_str = np.asarray(self._map).astype(str)
+        width = max(len(cell) for cell in board_str.flat)
+        block_height, block_width = self._region_dimensions
 
-        # Loop through 9 rows
-        for i in range(9):
-            
-            # At each multiple of 3, print row separator
-            if i % 3 == 0:
-                print(row_sep)
+        rows = []
+        for row in board_str:
+            cells = [cell.rjust(width) for cell in row]
+            blocks = [' '.join(cells[i:i + block_width]) for i in range(0, len(cells), block_width)]
+            rows.append('| ' + ' | '.join(blocks) + ' |')
 
-            # Get row data
-            row = board_str[i]
+        # Our row separator
+        row_sep = '-' * len(rows[0])
 
-            # Format row of data with pipe separators at each end, and between each sub grid
-            print('| '+' '.join(row[0:3])+' | '+' '.join(row[3:6])+' | '+' '.join(row[6:])+' |')
+        for i, row in enumerate(rows):
+            # At each multiple of the region height, print row separator
+            if i % block_height == 0:
+                print(row_sep)
+            print(row)
 
         # Print final row separator at bottom after loops finish
         print(row_sep)
@@ -154,66 +241,164 @@ class GridMap:
     def region_dimensions(self):
         return self._region_dimensions
 
+    @property
+    def visited_cells(self) -> int:
+        """ Number of cells with at least one visit. """
+        return self._visited_cells
+
     def get_region(self, position: Position) -> tuple[int]:
         """ Gets the region index of a position. """
         return (math.ceil(position.y / self._region_dimensions[0]), math.ceil(position.x / self._region_dimensions[1]))
 
+    def get_region_bounds(self, region: tuple[int]) -> tuple[slice] | None:
+        """ Gets the (y, x) slices of the cells in a region, or None if the region is off the map. """
+        bounds = []
+        for index, size, count, extent in zip(region, self._region_dimensions, self._region_map.shape, self._map.shape):
+            if not 0 <= index < count:
+                return None
+            # Region k covers the cells ((k - 1) * size, k * size], region 0 only covers cell 0.
+            start = 0 if index == 0 else (index - 1) * size + 1
+            bounds.append(slice(start, min(index * size + 1, extent)))
+        return tuple(bounds)
+
     def visit_cell(self, position: Position):
-        """ Increment the counter for the cell. """
-        self._map[position.y][position.x] += 1
+        """ Increment the counter for the cell, unless it is saturated. """
+        count = self._map[position.y, position.x]
+        if count < self._max_count:
+            self._map[position.y, position.x] = count + 1
+            self._region_map[self.get_region(position)] += 1
+            self._visited_cells += count == 0
+
+    def get_counts(self, rows: slice, columns: slice) -> np.ndarray:
+        """ Visit counts of a block of cells. """
+        return np.asarray(self._map[rows, columns])
+
+    def merge_counts(self, rows: slice, columns: slice, counts: np.ndarray, rule: str = "max") -> bool:
+        """
+        Merges another map's visit counts into a block of cells, keeping the larger count ("max")
+        or adding the counts ("sum"). Returns whether any cell changed.
+        """
+        old = np.array(self._map[rows, columns])
+        counts = np.asarray(counts, dtype=np.int64)
+        if rule == "max":
+            new = np.maximum(old, np.minimum(counts, self._max_count)).astype(old.dtype)
+        elif rule == "sum":
+            new = np.minimum(old.astype(np.int64) + counts, self._max_count).astype(old.dtype)
+        else:
+            raise ValueError(f"Unknown merge rule {rule!r}.")
+        changed = new != old
+        if not changed.any():
+            return False
+        self._map[rows, columns] = new
+        self._visited_cells += int(np.count_nonzero(old[changed] == 0))
+        ys, xs = np.nonzero(changed)
+        regions = (-(-(ys + rows.start) // self._region_dimensions[0]), -(-(xs + columns.start) // self._region_dimensions[1]))
+        np.add.at(self._region_map, regions, (new[changed].astype(np.int64) - old[changed]).astype(self._region_map.dtype))
+        return True
 
     def region_exploration_score(self, region_j, region_i):
         """ How many times we have visited cells in a region """
-        # Probably more efficient to represent a 2d array of regions, and a region is a datastructure containing a 2d array of cells.
-        score = 0
-        for y, x in np.ndindex(self._map.shape):
-            if self.get_region(Position(x,y)) == (region_i, region_j):
-                score += self._map[y][x]
-        return score
+        if not (0 <= region_i < self._region_map.shape[0] and 0 <= region_j < self._region_map.shape[1]):
+            return 0
+        return self._region_map[region_i, region_j]
 
     def get_position_of_least_visited_cell_in_region(self, region: tuple[int]) -> Position:
-        position = None
-        least_visitation = 1000
-        for y, x in np.ndindex(self._map.shape):
-            if self.get_region(Position(x,y)) == region and self._map[y][x] < least_visitation:
-                position = Position(x,y)
-        return position
+        bounds = self.get_region_bounds(region)
+        if bounds is None:
+            return None
+        rows, columns = bounds
+        block = self._map[rows, columns]
+        y, x = np.unravel_index(np.argmin(block), block.shape)
+        return Position(columns.start + int(x), rows.start + int(y))
 
 class Drone():
-    def __init__(self, id: DroneID, map_dimensions: tuple[int], region_dimensions: tuple[int]):
+    def __init__(self, id: DroneID, map_dimensions: tuple[int], region_dimensions: tuple[int], rng: random.Random | None = None, prompt_builder: PromptBuilder | None = None, map_counts=None, history_capacity: int = 64, history_eviction: str = "origin"):
         # Sanitization
         assert map_dimensions[0] > 0 and map_dimensions[1] > 0
         assert region_dimensions[0] > 0 and region_dimensions[1] > 0
         # Initialize
         self._id = id
-        self._position = Position(random.randint(0, map_dimensions[0] - 1), random.randint(0, region_dimensions[1] - 1))
+        # Per-drone random stream for reproducible runs; defaults to the global random module.
+        self._rng = rng if rng is not None else random
+        self._position = Position(self._rng.randint(0, map_dimensions[0] - 1), self._rng.randint(0, region_dimensions[1] - 1))
         self._map_dimensions = map_dimensions
         self._region_dimensions = region_dimensions
-        self._map = GridMap(map_dimensions, region_dimensions)
+        self._map = GridMap(map_dimensions, region_dimensions, map_counts)
         self._planned_moves: List[Position] = [] # A list of destinations
-        self._dwell_time = 0
-        self._historical_data: Message = Message()
+        self._dwell_time = 0 # Ticks spent in the current region
+        self._historical_data: StateHistory = StateHistory(history_capacity, history_eviction)
         self._current_data: Message = Message()
+        self._seq = 0 # Sequence number of the latest version of this drone's state
+        self._unshared_answer: State | None = None # Answered state not offered to the neighbors yet
+        self.prompt_builder = prompt_builder if prompt_builder is not None else DEFAULT_PROMPT_BUILDER
+        # Optional swarm-wide struct-of-arrays state this drone is a view over.
+        self._swarm = None
+        self._swarm_index = None
         print(f"Initializing drone {self._id} at position {self._position.x, self._position.y}")
 
+    def bind_to_swarm(self, swarm, index: int) -> None:
+        """Moves position, planned target and dwell time into row `index` of a SwarmState."""
+        assert len(self._planned_moves) <= 1, "A swarm only holds a single planned target per drone."
+        swarm.set_xy(index, self._position.x, self._position.y)
+        swarm.set_target(index, (self._planned_moves[0].x, self._planned_moves[0].y) if self._planned_moves else None)
+        swarm.dwell[index] = self._dwell_time
+        self._swarm = swarm
+        self._swarm_index = index
+
     @property
     def id(self) -> int:
         """Get the unique identifier for this drone."""
         return self._id
+
+    @property
+    def rng(self):
+        """The random stream of this drone, seeded for reproducible runs."""
+        return self._rng
     
     @property
     def position(self) -> Position:
         """Position for this drone."""
+        if self._swarm is not None:
+            return Position(*self._swarm.get_xy(self._swarm_index))
         return self._position
 
+    def _set_position(self, x: int, y: int) -> None:
+        if self._swarm is not None:
+            self._swarm.set_xy(self._swarm_index, x, y)
+        else:
+            self._position = Position(x, y)
+
+    @property
+    def planned_moves(self) -> List[Position]:
+        """Destinations this drone is heading to, in order."""
+        if self._swarm is not None:
+            target = self._swarm.get_target(self._swarm_index)
+            return [] if target is None else [Position(*target)]
+        return self._planned_moves
+
+    @planned_moves.setter
+    def planned_moves(self, planned_moves: List[Position]) -> None:
+        if self._swarm is not None:
+            assert len(planned_moves) <= 1, "A swarm only holds a single planned target per drone."
+            self._swarm.set_target(self._swarm_index, (planned_moves[0].x, planned_moves[0].y) if planned_moves else None)
+        else:
+            self._planned_moves = list(planned_moves)
+
+    @property
+    def dwell_time(self) -> int:
+        """Number of ticks this drone has spent in its current region."""
+        if self._swarm is not None:
+            return int(self._swarm.dwell[self._swarm_index])
+        return self._dwell_time
+
     @property
     def map(self) -> Position:
         """Map for this drone."""
         return self._map
 
     @property
-    def historical_data(self) -> Message:
-        """Historical data for this drone."""
+    def historical_data(self) -> StateHistory:
+        """Bounded history of the states this drone has heard of."""
         return self._historical_data
 
     @property
@@ -221,54 +406,128 @@ class Drone():
         """Current data for this drone."""
         return self._current_data
 
-    def move(self) -> None:
-        """Move to the next position"""
+    def move(self, path_planner=None) -> None:
+        """
+        Move to the next position
+        With a path planner (see robot.pathing), planned moves follow shortest paths around obstacles.
+        """
+        previous_region = self.map.get_region(self.position)
+
         # Use planned moves if they exist.
-        planned_moves_count = len(self._planned_moves)
-        if planned_moves_count > 0:
-            next_target_position = self._planned_moves[0]
-            self.move_toward_target(next_target_position)
-            if self.position == next_target_position:
-                del self._planned_moves[0]
-                assert len(self._planned_moves) < planned_moves_count
-
-        # Otherwise, move randomly.
-        self.move_randomly()
+        planned_moves = self.planned_moves
+        if len(planned_moves) > 0:
+            next_target_position = planned_moves[0]
+            step = (self.position.x, self.position.y)
+            if path_planner is None:
+                self.move_toward_target(next_target_position)
+            else:
+                step = path_planner.next_step(step, (next_target_position.x, next_target_position.y))
+                if step is None:
+                    # The target cannot be reached, give up on it and move randomly instead.
+                    self.move_randomly()
+                else:
+                    self._set_position(*step)
+            if step is None or self.position == next_target_position:
+                self.planned_moves = planned_moves[1:]
+        else:
+            # Otherwise, move randomly.
+            self.move_randomly()
         self._map.visit_cell(self.position)
 
-    def update(self) -> None:
+        dwell_time = self.dwell_time + 1 if self.map.get_region(self.position) == previous_region else 0
+        if self._swarm is not None:
+            self._swarm.dwell[self._swarm_index] = dwell_time
+        else:
+            self._dwell_time = dwell_time
+
+    def update(self, planner=Planner) -> tuple[str, InferenceResult] | None:
         """
         Plans the next moves
         If current_data, call LLM, delete current_data
         Set historical_data
+        Returns the prompt and the inference result if the planner was called.
+        """
+        call = None
+        prompt = self.get_planning_prompt()
+        if prompt is not None:
+            execute_for = getattr(planner, "execute_for", None)
+            inference_result = planner.execute_prompt(prompt) if execute_for is None else execute_for(self, prompt)
+            self.apply_inference_result(inference_result)
+            call = (prompt, inference_result)
+        self.archive_current_data()
+        return call
+
+    def get_planning_prompt(self) -> str | None:
+        """Builds the planner prompt, or returns None if this drone has no new, unanswered observation of its own."""
+        own = self.current_data.data.get(self.id)
+        if own is None or own.inference_result:
+            return None
+        return self.prompt_builder.build(self)
+
+    def apply_inference_result(self, inference_result: InferenceResult) -> None:
         """
+        Stores the planner's answer on this drone's own state and plans the move it asks for.
+        States are immutable, so the answer is the next version of the observation. It stays
+        in the current data past archiving until it has been offered to the neighbors once,
+        so gossip carries the plan to peers that already hold the unanswered observation.
+        """
+        own = self.current_data.data[self.id]
+        self._seq += 1
+        state = DEFAULT_STATE_STORE.state(own.id, own.position, own.perception_context, inference_result, self._seq)
+        self.current_data.data[self.id] = state
+        self._unshared_answer = state
+        target_position = self.get_target_position_from_interfence_result(state.inference_result)
+        if target_position is not None:
+            # TODO: Currently, we only support a single target position in the planned moves.
+            self.planned_moves = [target_position]
+
+    def archive_current_data(self) -> None:
+        """Moves current data into the bounded history."""
         if not self.current_data.empty():
-            if self.id in self.current_data.data.keys():
-                state = self.current_data.data[self.id]
-                prompt = f"Our drone is on a {self._map_dimensions} by {self._map_dimensions} grid of cells. The map is also divided into a {self._region_dimensions} by {self._region_dimensions} grid of regions. Each cell is contained in a region."
-                prompt += "If all else is equal, we prefer to move toward the region with the least exploration. "
-                prompt += "Historically, old information is that "
-                prompt += self.historical_data.get_prompt(self.id)
-                prompt += "Currently, more recent information is available."
-                prompt += self.current_data.get_prompt(self.id)
-                prompt += " Given this information, should the drone move to the region up, down, left, or right?"
-                state.inference_result = Planner.execute_prompt(prompt)
-                target_position = self.get_target_position_from_interfence_result(state.inference_result)
-                if target_position is not None:
-                    # TODO: Currently, we only support a single target position in the planned moves.
-                    self._planned_moves = [target_position]
-            self.historical_data.copy(self.current_data)
+            self.historical_data.update(self.current_data)
             self.current_data.clear()
             assert not self.historical_data.empty()
+        if self._unshared_answer is not None:
+            # A fresh answer is news for the neighbors until the next exchange.
+            self.current_data.add_state(self.id, self._unshared_answer)
+            self._unshared_answer = None
 
     def can_communicate(self, other, threshold=3) -> bool:
         return (abs(self.position.x - other.position.x) < threshold) and (abs(self.position.y - other.position.y) < threshold)
     
-    def set_neighbors(self, others) -> None:
-        """Broadcasts this Drone's state to all the neighboring drones so that we synchronize state."""
-        if self.current_data:
-            for other in others:
-                other.update_current_data(self.current_data)
+    def observe(self, perception_context: PerceptionContext) -> State:
+        """Records a new observation at the current position as the next version of this drone's state."""
+        self._seq += 1
+        state = DEFAULT_STATE_STORE.state(self.id, self.position, perception_context, "", self._seq)
+        message = Message()
+        message.add_state(self.id, state)
+        self.update_current_data(message)
+        return state
+
+    def set_neighbors(self, others, counters=None) -> None:
+        """
+        Synchronizes this Drone's state with all the neighboring drones.
+        Each neighbor is offered a digest of the versions we hold and only receives the entries it has not seen.
+        """
+        if self.current_data.empty():
+            return
+        digest = self.current_data.digest()
+        for other in others:
+            wanted = other.missing(digest)
+            delta = self.current_data.subset(wanted)
+            if wanted:
+                other.update_current_data(delta)
+            if counters is not None:
+                counters.record(self, other, wanted, delta)
+
+    def known_seq(self, id: DroneID) -> int:
+        """Newest version of a drone's state that we hold in current or historical data, -1 if none."""
+        seqs = [message.data[id].seq for message in (self.current_data, self.historical_data) if id in message.data]
+        return max(seqs, default=-1)
+
+    def missing(self, digest: dict[DroneID, int]) -> list[DroneID]:
+        """Ids in a digest for which we hold that version or a newer one neither in current nor in historical data."""
+        return [id for id, seq in digest.items() if self.known_seq(id) < seq]
 
     def update_current_data(self, message: Message):
         """Update this drone's current data with data from other drones."""
@@ -276,7 +535,7 @@ class Drone():
 
     def move_randomly(self):
         # Get current position
-        x, y = self._position.x, self._position.y
+        x, y = self.position.x, self.position.y
         max_x, max_y = self._map_dimensions
 
         # Determine possible directions based on current position
@@ -291,26 +550,27 @@ class Drone():
             possible_directions.append('right')
 
         # Choose a direction randomly from possible directions
-        direction = random.choice(possible_directions)
+        direction = self._rng.choice(possible_directions)
 
         # Move the drone in the chosen direction
         if direction == 'up':
-            self._position.y += 1
+            self._set_position(x, y + 1)
         elif direction == 'down':
-            self._position.y -= 1
+            self._set_position(x, y - 1)
         elif direction == 'left':
-            self._position.x -= 1
+            self._set_position(x - 1, y)
         elif direction == 'right':
-            self._position.x += 1
+            self._set_position(x + 1, y)
 
     def move_toward_target(self, target: Position):
         # Newton's method, simple shortest path.
-        grad_x = target.x - self._position.x
-        grad_y = target.y - self._position.y
-        if grad_x > grad_y:
-            self._position.x += int(grad_x/abs(grad_x))
+        x, y = self.position.x, self.position.y
+        grad_x = target.x - x
+        grad_y = target.y - y
+        if abs(grad_x) > abs(grad_y):
+            self._set_position(x + int(np.sign(grad_x)), y)
         else:
-            self._position.y += int(grad_y/abs(grad_y))
+            self._set_position(x, y + int(np.sign(grad_y)))
 
     def get_target_position_from_interfence_result(self, inference_result: InferenceResult) -> Position | None:
         target_position = None
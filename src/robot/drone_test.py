@@ -1,4 +1,5 @@
 from drone import *
+from robot.gossip import GossipCounters
 
 def test_grid_map():
     map = GridMap((9,9), (3,3))
@@ -13,6 +14,29 @@ def test_grid_map():
     assert (map.region_exploration_score(*region) == 1)
     map.print()
 
+def test_grid_map_region_statistics():
+    map = GridMap((10,7), (2,3))
+    rng = random.Random(0)
+    for _ in range(200):
+        map.visit_cell(Position(rng.randint(0, 9), rng.randint(0, 6)))
+    for region_y in range(-1, 6):
+        for region_x in range(-1, 5):
+            cells = [(x, y) for y in range(7) for x in range(10) if map.get_region(Position(x, y)) == (region_y, region_x)]
+            assert map.region_exploration_score(region_x, region_y) == sum(map._map[y][x] for x, y in cells)
+            least_visited = map.get_position_of_least_visited_cell_in_region((region_y, region_x))
+            if not cells:
+                assert least_visited is None
+            else:
+                assert map.get_region(least_visited) == (region_y, region_x)
+                assert map._map[least_visited.y][least_visited.x] == min(map._map[y][x] for x, y in cells)
+    map.print()
+
+def test_grid_map_large():
+    map = GridMap((1000,1000), (10,10))
+    map.visit_cell(Position(999, 999))
+    assert map.region_exploration_score(100, 100) == 1
+    assert map.get_position_of_least_visited_cell_in_region((100, 100)) == Position(991, 991)
+
 def test_drone_visit_cells():
     Drone(1, (9,9), (3,3))
 
@@ -26,12 +50,76 @@ def test_message():
     serialized_deserialized_serialized_message = Message.serialize_to_string(Message.deserialize_from_string(Message.serialize_to_string(message)))
     assert serialized_message == serialized_deserialized_serialized_message
 
+def test_message_versions():
+    old = State(1, Position(1,1), "Old", "", seq=1)
+    new = State(1, Position(2,2), "New", "", seq=2)
+    message = Message()
+    message.add_state(1, new)
+    other = Message()
+    other.add_state(1, old)
+    message.update(other)
+    assert message.get_state(1) is new
+    assert other.missing(message.digest()) == [1]
+    assert message.missing(other.digest()) == []
+
+def test_delta_gossip():
+    drone1, drone2 = Drone(1, (9,9), (3,3)), Drone(2, (9,9), (3,3))
+    state = drone1.observe("Perception Context")
+    assert state.seq == 1
+    drone1.set_neighbors([drone2])
+    assert drone2.current_data.get_state(1) is state
+    # The second exchange finds nothing new to send.
+    sent = []
+    class Counters:
+        def record(self, sender, receiver, wanted, delta):
+            sent.append(wanted)
+    drone1.set_neighbors([drone2], Counters())
+    assert sent == [[]]
+
+def test_gossip_skips_archived_versions():
+    drone1, drone2 = Drone(1, (9,9), (3,3)), Drone(2, (9,9), (3,3))
+    drone1.observe("Perception Context")
+    drone1.set_neighbors([drone2])
+    drone2.archive_current_data()
+    assert drone2.known_seq(1) == 1 and drone2.known_seq(3) == -1
+    # The version drone2 already archived is not requested again.
+    counters = GossipCounters()
+    drone1.set_neighbors([drone2], counters)
+    assert counters.states == 0 and drone2.current_data.empty()
+    drone1.observe("Newer Context")
+    assert drone2.missing(drone1.current_data.digest()) == [1]
+
+def test_plans_reach_peers():
+    class UpPlanner:
+        @staticmethod
+        def execute_prompt(prompt):
+            return "up"
+    drone1, drone2 = Drone(1, (9,9), (3,3)), Drone(2, (9,9), (3,3))
+    observation = drone1.observe("Fire at the gate")
+    drone1.set_neighbors([drone2])
+    drone1.update(UpPlanner)
+    drone2.update(UpPlanner)
+    # The answer is a newer version of the observation, offered at the next exchange.
+    answer = drone1.current_data.get_state(1)
+    assert answer.seq > observation.seq and answer.inference_result == "up"
+    drone1.set_neighbors([drone2])
+    assert drone1.update(UpPlanner) is None
+    drone2.observe("Smoke")
+    prompt, _ = drone2.update(UpPlanner)
+    assert "peer 1 has observed that Fire at the gate and planned the following response: up" in prompt
+
 def test_planner():
     event = Planner.execute_prompt("How many days are in a year?")
     print(str(event))
 
 if __name__ == "__main__":
     test_grid_map()
+    test_grid_map_region_statistics()
+    test_grid_map_large()
     test_drone_visit_cells()
     test_message()
+    test_message_versions()
+    test_delta_gossip()
+    test_gossip_skips_archived_versions()
+    test_plans_reach_peers()
     test_planner()
\ No newline at end of file
@@ -0,0 +1,43 @@
+import dataclasses
+from robot.codec import MessageCodec
+
+@dataclasses.dataclass
+class GossipCounters:
+    """
+    Traffic of the digest/request/delta exchange in Drone.set_neighbors.
+
+    A sender offers a digest of its versions, the receiver requests the ids it is missing
+    and the sender replies with just those states. `full_bytes` is what rebroadcasting
+    the sender's full current data to every neighbor would have cost instead. `events`
+    lists (sender id, receiver id, states sent, bytes) for every exchange.
+    """
+    codec: MessageCodec = dataclasses.field(default_factory=MessageCodec, repr=False)
+    messages: int = 0
+    bytes: int = 0
+    states: int = 0
+    full_bytes: int = 0
+    events: list = dataclasses.field(default_factory=list, repr=False)
+
+    def record(self, sender, receiver, wanted, delta) -> None:
+        """Accounts for one exchange between a sender and a receiver."""
+        offered = sender.current_data
+        exchanged = self.codec.digest_size(len(offered.data))
+        messages = 1
+        self.full_bytes += self.codec.encoded_size(offered)
+        if wanted:
+            messages += 2
+            exchanged += self.codec.request_size(len(wanted)) + self.codec.encoded_size(delta)
+            self.states += len(wanted)
+        self.messages += messages
+        self.bytes += exchanged
+        self.events.append((sender.id, receiver.id, len(wanted), exchanged))
+
+    def add(self, other) -> None:
+        """Adds the counts of other to these. Events stay on the per-tick counters."""
+        self.messages += other.messages
+        self.bytes += other.bytes
+        self.states += other.states
+        self.full_bytes += other.full_bytes
+
+    def as_dict(self) -> dict:
+        return {"messages": self.messages, "bytes": self.bytes, "states": self.states, "full_bytes": self.full_bytes}
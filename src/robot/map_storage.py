@@ -0,0 +1,165 @@
+"""
+Compact storage for the visit counters of GridMap.
+
+GridMap counts visits in any (height, width) array-like of an integer dtype and saturates
+at the largest value of that dtype, so uint8 or uint16 counters cost 1 or 2 bytes per cell
+instead of 8. TiledCounts only allocates the tiles that have been visited. MapPool keeps
+the counters of many maps as slices of one (maps, height, width) array in memory, in a
+memory-mapped .npy file or in a named shared memory block, so other processes and the
+recorder can read every map of a run without copying.
+"""
+from multiprocessing import shared_memory
+import numpy as np
+
+class TiledCounts:
+    """
+    Sparse (height, width) counters made of `tile` x `tile` blocks that are allocated on the
+    first write. Unvisited tiles read as zero. Supports the indexing GridMap needs: reads of
+    cells, rows and rectangular slices, and writes of cells and rectangular slices.
+    """
+    def __init__(self, shape: tuple[int, int], dtype=np.uint16, tile: int = 64):
+        assert shape[0] > 0 and shape[1] > 0 and tile > 0
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.tile = tile
+        self._tiles: dict[tuple[int, int], np.ndarray] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(tile.nbytes for tile in self._tiles.values())
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _slices(self, key) -> tuple[slice, slice, tuple[int, ...]] | None:
+        """The key as (rows, columns) slices and the axes to squeeze, or None for keys other than ints and step 1 slices."""
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        if len(key) != 2:
+            return None
+        slices, squeeze = [], []
+        for axis, (index, extent) in enumerate(zip(key, self.shape)):
+            if isinstance(index, (int, np.integer)):
+                index = int(index) + extent if index < 0 else int(index)
+                if not 0 <= index < extent:
+                    raise IndexError(f"index {index} is out of bounds for axis {axis} with size {extent}")
+                slices.append(slice(index, index + 1))
+                squeeze.append(axis)
+            elif isinstance(index, slice):
+                start, stop, step = index.indices(extent)
+                if step != 1:
+                    return None
+                slices.append(slice(start, max(start, stop)))
+            else:
+                return None
+        return slices[0], slices[1], tuple(squeeze)
+
+    def __getitem__(self, key):
+        parsed = self._slices(key)
+        if parsed is None:
+            return np.asarray(self)[key]
+        rows, columns, squeeze = parsed
+        block = np.zeros((rows.stop - rows.start, columns.stop - columns.start), dtype=self.dtype)
+        for tile_y in range(rows.start // self.tile, -(-rows.stop // self.tile)):
+            for tile_x in range(columns.start // self.tile, -(-columns.stop // self.tile)):
+                tile = self._tiles.get((tile_y, tile_x))
+                if tile is None:
+                    continue
+                top, left = tile_y * self.tile, tile_x * self.tile
+                y0, y1 = max(rows.start, top), min(rows.stop, top + self.tile)
+                x0, x1 = max(columns.start, left), min(columns.stop, left + self.tile)
+                block[y0 - rows.start:y1 - rows.start, x0 - columns.start:x1 - columns.start] = tile[y0 - top:y1 - top, x0 - left:x1 - left]
+        block = block.squeeze(axis=squeeze) if squeeze else block
+        return block[()] if block.ndim == 0 else block
+
+    def _tile(self, tile_y: int, tile_x: int) -> np.ndarray:
+        tile = self._tiles.get((tile_y, tile_x))
+        if tile is None:
+            tile = self._tiles[(tile_y, tile_x)] = np.zeros((self.tile, self.tile), dtype=self.dtype)
+        return tile
+
+    def __setitem__(self, key, value) -> None:
+        """Writes a cell, or a rectangular block given as (rows, columns) slices."""
+        y, x = key
+        if not isinstance(y, slice):
+            self._tile(int(y) // self.tile, int(x) // self.tile)[int(y) % self.tile, int(x) % self.tile] = value
+            return
+        rows, columns, _ = self._slices(key)
+        value = np.broadcast_to(value, (rows.stop - rows.start, columns.stop - columns.start))
+        for tile_y in range(rows.start // self.tile, -(-rows.stop // self.tile)):
+            for tile_x in range(columns.start // self.tile, -(-columns.stop // self.tile)):
+                top, left = tile_y * self.tile, tile_x * self.tile
+                y0, y1 = max(rows.start, top), min(rows.stop, top + self.tile)
+                x0, x1 = max(columns.start, left), min(columns.stop, left + self.tile)
+                block = value[y0 - rows.start:y1 - rows.start, x0 - columns.start:x1 - columns.start]
+                # Blocks of zeros do not allocate tiles that do not exist yet.
+                if (tile_y, tile_x) in self._tiles or block.any():
+                    self._tile(tile_y, tile_x)[y0 - top:y1 - top, x0 - left:x1 - left] = block
+
+    def __array__(self, dtype=None, copy=None):
+        array = self[:, :]
+        return array if dtype is None else array.astype(dtype)
+
+class MapPool:
+    """
+    Visit counters of `num_maps` maps as slices of one (maps, height, width) array. Index
+    the pool with a map number to get that map's counters, e.g. for GridMap or make_drones.
+
+    With a path the array is a memory-mapped .npy file that any process can open with
+    np.load(path, mmap_mode="r"). With shared=True it lives in a shared memory block that
+    other processes open with MapPool.attach(pool.name, ...), e.g. the workers of a
+    ShardedSimulator given the pool. Close the pool only after the maps using its slices are gone.
+    """
+    def __init__(self, num_maps: int, map_dimensions: tuple[int], dtype=np.uint16, path: str | None = None, shared: bool = False, name: str | None = None):
+        assert num_maps > 0 and map_dimensions[0] > 0 and map_dimensions[1] > 0
+        assert path is None or not (shared or name), "A pool is either a file or shared memory."
+        shape = (num_maps, map_dimensions[1], map_dimensions[0])
+        self._shm = None
+        self._owner = name is None
+        self.path = path
+        if path is not None:
+            self.counts = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        elif shared or name is not None:
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            self._shm = shared_memory.SharedMemory(name=name, create=name is None, size=size if name is None else 0)
+            self.counts = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+            if name is None:
+                self.counts[:] = 0
+        else:
+            self.counts = np.zeros(shape, dtype=dtype)
+
+    @classmethod
+    def attach(cls, name: str, num_maps: int, map_dimensions: tuple[int], dtype=np.uint16):
+        """Opens the shared memory pool another process created."""
+        return cls(num_maps, map_dimensions, dtype, name=name)
+
+    @property
+    def name(self) -> str | None:
+        """Name of the shared memory block, None unless the pool is shared."""
+        return None if self._shm is None else self._shm.name
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.counts[index]
+
+    def flush(self) -> None:
+        if isinstance(self.counts, np.memmap):
+            self.counts.flush()
+
+    def close(self) -> None:
+        """Releases the array. The creator of a shared pool also frees the shared memory."""
+        self.flush()
+        self.counts = None
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
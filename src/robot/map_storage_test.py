@@ -0,0 +1,79 @@
+import multiprocessing
+import random
+import numpy as np
+from map_storage import *
+from drone import GridMap, Position
+
+def test_counters_saturate():
+    map = GridMap((6, 6), (3, 3), np.zeros((6, 6), dtype=np.uint8))
+    for _ in range(300):
+        map.visit_cell(Position(2, 4))
+    map.visit_cell(Position(1, 4))
+    assert map._map[4][2] == 255
+    region = map.get_region(Position(2, 4))
+    assert map.region_exploration_score(*reversed(region)) == 256
+    assert map.get_position_of_least_visited_cell_in_region(region) == Position(3, 4)
+
+def test_tiled_counts_match_dense():
+    rng = random.Random(1)
+    dense = GridMap((50, 37), (4, 3))
+    tiled = GridMap((50, 37), (4, 3), TiledCounts((37, 50), tile=8))
+    for _ in range(500):
+        position = Position(rng.randrange(50), rng.randrange(37))
+        dense.visit_cell(position)
+        tiled.visit_cell(position)
+    assert (np.asarray(tiled._map) == dense._map).all()
+    assert tiled._map[3][7] == dense._map[3][7]
+    assert (tiled._map[5:20, 9:31] == dense._map[5:20, 9:31]).all()
+    assert (tiled._map[:, 4] == dense._map[:, 4]).all()
+    for region_y in range(14):
+        for region_x in range(18):
+            assert tiled.region_exploration_score(region_x, region_y) == dense.region_exploration_score(region_x, region_y)
+            assert tiled.get_position_of_least_visited_cell_in_region((region_y, region_x)) == dense.get_position_of_least_visited_cell_in_region((region_y, region_x))
+
+def test_tiled_counts_are_sparse():
+    counts = TiledCounts((1000, 1000), dtype=np.uint8, tile=32)
+    map = GridMap((1000, 1000), (10, 10), counts)
+    for x in range(100):
+        map.visit_cell(Position(x, 500))
+    assert counts.nbytes == 4 * 32 * 32
+    assert map.get_position_of_least_visited_cell_in_region((50, 1)) == Position(1, 491)
+
+def test_pool_slices_are_views():
+    with MapPool(3, (8, 6), dtype=np.uint16) as pool:
+        maps = [GridMap((8, 6), (2, 2), pool[i]) for i in range(3)]
+        maps[1].visit_cell(Position(7, 5))
+        assert pool.counts[1, 5, 7] == 1 and pool.counts.sum() == 1
+        assert pool.counts.nbytes == 3 * 8 * 6 * 2
+
+def test_memmap_pool(tmp_path):
+    path = str(tmp_path / "maps.npy")
+    pool = MapPool(2, (5, 4), dtype=np.uint8, path=path)
+    GridMap((5, 4), (2, 2), pool[0]).visit_cell(Position(4, 3))
+    pool.flush()
+    counts = np.load(path, mmap_mode="r")
+    assert counts.shape == (2, 4, 5) and counts[0, 3, 4] == 1
+    pool.close()
+
+def visit_in_child(name):
+    pool = MapPool.attach(name, 2, (5, 4), np.uint16)
+    pool[1][2, 3] += 7
+    pool.close()
+
+def test_shared_pool_across_processes():
+    pool = MapPool(2, (5, 4), dtype=np.uint16, shared=True)
+    process = multiprocessing.get_context("spawn").Process(target=visit_in_child, args=(pool.name,))
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    assert pool.counts[1, 2, 3] == 7 and pool.counts.sum() == 7
+    pool.close()
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_counters_saturate()
+    test_tiled_counts_match_dense()
+    test_tiled_counts_are_sparse()
+    test_pool_slices_are_views()
+    test_memmap_pool(pathlib.Path(tempfile.mkdtemp()))
+    test_shared_pool_across_processes()
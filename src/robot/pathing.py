@@ -0,0 +1,173 @@
+from collections import OrderedDict
+import numpy as np
+
+# Scenarios that block passage through their cell.
+BLOCKING_SCENARIOS = ("damaged_road_bridge", "debris_blocking_roads")
+# Steps for the directions up, down, left, right, in that order.
+STEPS = np.array([(0, 1), (0, -1), (-1, 0), (1, 0)], dtype=np.int64)
+UNREACHABLE = -1
+
+def distance_field(blocked: np.ndarray, sources) -> np.ndarray:
+    """
+    Breadth-first distances over 4-connected free cells from a set of (x, y) source cells.
+    blocked is indexed [y][x] like GridMap. Sources are distance 0 even when blocked; cells
+    that cannot be reached are UNREACHABLE. Every BFS level is expanded as one array operation.
+    """
+    height, width = blocked.shape
+    free = ~blocked.ravel()
+    distance = np.full(height * width, UNREACHABLE, dtype=np.int32)
+    sources = np.asarray(sources, dtype=np.int64).reshape(-1, 2)
+    frontier = np.unique(sources[:, 1] * width + sources[:, 0])
+    distance[frontier] = 0
+    level = 0
+    while len(frontier):
+        level += 1
+        x, y = frontier % width, frontier // width
+        candidates = np.concatenate([frontier[y < height - 1] + width, frontier[y > 0] - width, frontier[x > 0] - 1, frontier[x < width - 1] + 1])
+        candidates = np.unique(candidates[(distance[candidates] == UNREACHABLE) & free[candidates]])
+        distance[candidates] = level
+        frontier = candidates
+    return distance.reshape(height, width)
+
+class PathPlanner:
+    """
+    Shortest paths on the map grid around blocked cells, shared by all drones.
+
+    A drone outside its target region follows the distance field of the target region,
+    so every drone heading to the same region shares one field. Inside the region it follows
+    the field of its target cell, computed on the region's cells only, or on the whole map
+    when the target cannot be reached without leaving the region. Entering the region at its
+    nearest cell can make a path up to about a region's span longer than a shortest path.
+    Fields are kept in an LRU and dropped whenever the obstacles change.
+    """
+    def __init__(self, map_dimensions: tuple[int], region_dimensions: tuple[int], max_fields: int = 256):
+        assert map_dimensions[0] > 0 and map_dimensions[1] > 0
+        assert region_dimensions[0] > 0 and region_dimensions[1] > 0
+        assert max_fields > 0
+        self._map_dimensions = map_dimensions
+        self._region_dimensions = region_dimensions
+        self._max_fields = max_fields
+        self._blocked = np.zeros((map_dimensions[1], map_dimensions[0]), dtype=bool)
+        self._fields: OrderedDict[tuple, tuple[np.ndarray, int, int]] = OrderedDict()
+        self.field_hits = 0
+        self.field_misses = 0
+
+    @property
+    def blocked(self) -> np.ndarray:
+        return self._blocked
+
+    def set_obstacles(self, cells) -> None:
+        """Replaces the blocked cells with the given (x, y) cells. Cached fields survive if nothing changed."""
+        blocked = np.zeros_like(self._blocked)
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        blocked[cells[:, 1], cells[:, 0]] = True
+        if not np.array_equal(blocked, self._blocked):
+            self._blocked = blocked
+            self._fields.clear()
+
+    def region(self, x: int, y: int) -> tuple[int, int]:
+        """Region index (row, column) of a cell, matching GridMap.get_region."""
+        return (-(-y // self._region_dimensions[0]), -(-x // self._region_dimensions[1]))
+
+    def region_bounds(self, region: tuple[int, int]) -> tuple[slice, slice]:
+        """(y, x) slices of the cells of a region, matching GridMap.get_region_bounds."""
+        bounds = []
+        for index, size, extent in zip(region, self._region_dimensions, self._blocked.shape):
+            start = 0 if index == 0 else (index - 1) * size + 1
+            bounds.append(slice(start, min(index * size + 1, extent)))
+        return tuple(bounds)
+
+    def _field(self, key, compute) -> tuple[np.ndarray, int, int]:
+        field = self._fields.get(key)
+        if field is not None:
+            self._fields.move_to_end(key)
+            self.field_hits += 1
+            return field
+        self.field_misses += 1
+        field = self._fields[key] = compute()
+        while len(self._fields) > self._max_fields:
+            self._fields.popitem(last=False)
+        return field
+
+    def region_field(self, target: tuple[int, int]) -> tuple[np.ndarray, int, int]:
+        """
+        Distances to the nearest cell of the target's region from which the target can be
+        reached inside the region, over the whole map. Targets in the same connected part
+        of a region share the field.
+        """
+        local, origin_x, origin_y = self.cell_field(target, local=True)
+        ys, xs = np.nonzero(local != UNREACHABLE)
+        region = self.region(*target)
+        # The first reachable cell identifies the connected part, usually the whole region.
+        key = ("region", region, int(xs[0]) + origin_x, int(ys[0]) + origin_y)
+        return self._field(key, lambda: (distance_field(self._blocked, np.stack([xs + origin_x, ys + origin_y], axis=1)), 0, 0))
+
+    def cell_field(self, target: tuple[int, int], local: bool) -> tuple[np.ndarray, int, int]:
+        """Distances to a cell, over its region only or over the whole map, with the (x, y) origin of the field."""
+        def compute():
+            if not local:
+                return distance_field(self._blocked, [target]), 0, 0
+            rows, columns = self.region_bounds(self.region(*target))
+            return distance_field(self._blocked[rows, columns], [(target[0] - columns.start, target[1] - rows.start)]), columns.start, rows.start
+        return self._field(("local" if local else "cell", target), compute)
+
+    @staticmethod
+    def _descend(field: np.ndarray, origin_x: int, origin_y: int, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """One step down a distance field for every position. Returns the next positions and whether a step was found."""
+        height, width = field.shape
+        local = positions - (origin_x, origin_y)
+        inside = (local[:, 0] >= 0) & (local[:, 0] < width) & (local[:, 1] >= 0) & (local[:, 1] < height)
+        current = np.full(len(positions), UNREACHABLE, dtype=np.int64)
+        current[inside] = field[local[inside, 1], local[inside, 0]]
+        neighbors = local[:, None, :] + STEPS[None, :, :]
+        valid = (neighbors[..., 0] >= 0) & (neighbors[..., 0] < width) & (neighbors[..., 1] >= 0) & (neighbors[..., 1] < height)
+        distance = np.full(valid.shape, np.iinfo(np.int64).max)
+        distance[valid] = field[neighbors[valid][:, 1], neighbors[valid][:, 0]]
+        distance[distance == UNREACHABLE] = np.iinfo(np.int64).max
+        # Ties go to the first direction in STEPS order.
+        best = distance.argmin(axis=1)
+        best_distance = distance[np.arange(len(positions)), best]
+        # Leaving an unreachable cell, e.g. a blocked one, is allowed; otherwise every step must get closer.
+        found = (best_distance != np.iinfo(np.int64).max) & ((current == UNREACHABLE) | (best_distance < current))
+        return positions + STEPS[best] * found[:, None], found
+
+    def next_steps(self, positions, targets) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Next cell on a shortest path from every (x, y) position to its (x, y) target.
+        Returns the next positions and a mask of the drones that have a path. Drones at
+        their target or without a path keep their position.
+        """
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        targets = np.asarray(targets, dtype=np.int64).reshape(-1, 2)
+        next_positions = positions.copy()
+        found = np.zeros(len(positions), dtype=bool)
+        arrived = (positions == targets).all(axis=1)
+        found[arrived] = True
+
+        target_regions = np.stack([-(-targets[:, 1] // self._region_dimensions[0]), -(-targets[:, 0] // self._region_dimensions[1])], axis=1)
+        regions = np.stack([-(-positions[:, 1] // self._region_dimensions[0]), -(-positions[:, 0] // self._region_dimensions[1])], axis=1)
+        in_region = (regions == target_regions).all(axis=1)
+
+        # Outside the target region: fields shared by all targets in the same part of a region.
+        outside = np.flatnonzero(~in_region & ~arrived)
+        for target in np.unique(targets[outside], axis=0):
+            group = outside[(targets[outside] == target).all(axis=1)]
+            next_positions[group], found[group] = self._descend(*self.region_field((int(target[0]), int(target[1]))), positions[group])
+
+        # Inside the target region: a field per target cell, on the region first.
+        inside = np.flatnonzero(in_region & ~arrived)
+        for target in np.unique(targets[inside], axis=0):
+            target = (int(target[0]), int(target[1]))
+            group = inside[(targets[inside] == target).all(axis=1)]
+            next_positions[group], found[group] = self._descend(*self.cell_field(target, local=True), positions[group])
+            lost = group[~found[group]]
+            if len(lost):
+                next_positions[lost], found[lost] = self._descend(*self.cell_field(target, local=False), positions[lost])
+        return next_positions, found
+
+    def next_step(self, position: tuple[int, int], target: tuple[int, int]) -> tuple[int, int] | None:
+        """Next cell on a shortest path from position to target, or None if there is no path."""
+        next_positions, found = self.next_steps([position], [target])
+        if not found[0]:
+            return None
+        return int(next_positions[0, 0]), int(next_positions[0, 1])
@@ -0,0 +1,120 @@
+import random
+from collections import deque
+import numpy as np
+from drone import Drone, Position
+from pathing import *
+from swarm import SwarmState
+
+def bfs(blocked, source):
+    height, width = blocked.shape
+    distance = np.full((height, width), UNREACHABLE)
+    distance[source[1], source[0]] = 0
+    queue = deque([source])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in ((0, 1), (0, -1), (-1, 0), (1, 0)):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and not blocked[ny, nx] and distance[ny, nx] == UNREACHABLE:
+                distance[ny, nx] = distance[y, x] + 1
+                queue.append((nx, ny))
+    return distance
+
+def walk(planner, start, target, limit=1000):
+    position, steps = start, 0
+    while position != target and steps < limit:
+        position = planner.next_step(position, target)
+        assert position is not None
+        assert not planner.blocked[position[1], position[0]] or position == target
+        steps += 1
+    return steps
+
+def test_distance_field_matches_bfs():
+    rng = np.random.default_rng(0)
+    blocked = rng.random((17, 23)) < 0.3
+    blocked[4, 5] = False
+    assert (distance_field(blocked, [(5, 4)]) == bfs(blocked, (5, 4))).all()
+
+def test_paths_go_around_obstacles():
+    planner = PathPlanner((12, 9), (3, 3))
+    # A wall at x = 6 with a gap at y = 0.
+    planner.set_obstacles([(6, y) for y in range(1, 9)])
+    distance = bfs(planner.blocked, (10, 6))
+    assert walk(planner, (1, 6), (10, 6)) == distance[6, 1]
+    # Drones may leave a blocked cell.
+    assert walk(planner, (6, 4), (10, 6)) > 0
+
+def test_paths_match_bfs_on_random_maps():
+    rng = random.Random(1)
+    for _ in range(20):
+        planner = PathPlanner((15, 11), (3, 4))
+        planner.set_obstacles([(rng.randrange(15), rng.randrange(11)) for _ in range(40)])
+        start, target = (rng.randrange(15), rng.randrange(11)), (rng.randrange(15), rng.randrange(11))
+        blocked = planner.blocked.copy()
+        blocked[start[1], start[0]] = False
+        expected = bfs(blocked, start)[target[1], target[0]]
+        if expected == UNREACHABLE or planner.blocked[target[1], target[0]]:
+            continue
+        # Paths lead to the target region first, so they can be up to a region's span longer than a shortest path.
+        assert expected <= walk(planner, start, target) <= expected + 3 + 4
+
+def test_unreachable_target():
+    planner = PathPlanner((9, 9), (3, 3))
+    planner.set_obstacles([(7, 8), (7, 7), (8, 7)])
+    assert planner.next_step((0, 0), (8, 8)) is None
+
+def test_fields_are_shared_per_region():
+    planner = PathPlanner((60, 60), (3, 3))
+    rng = np.random.default_rng(2)
+    positions = rng.integers(0, 60, size=(1000, 2))
+    targets = np.tile((30, 30), (1000, 1))
+    targets[500:] = (31, 31)
+    planner.next_steps(positions, targets)
+    # One local field per target cell and one field for the region they share.
+    assert planner.field_misses <= 5
+    planner.set_obstacles([(0, 0)])
+    planner.next_steps(positions, targets)
+    assert planner.field_misses <= 10
+
+def test_drone_follows_plan_without_random_moves():
+    drone = Drone(0, (12, 12), (3, 3))
+    drone._set_position(0, 0)
+    drone.planned_moves = [Position(9, 4)]
+    planner = PathPlanner((12, 12), (3, 3))
+    for _ in range(13):
+        drone.move(planner)
+    assert drone.position == Position(9, 4)
+    assert drone.planned_moves == []
+
+def test_greedy_step_without_planner():
+    drone = Drone(0, (12, 12), (3, 3))
+    drone._set_position(9, 0)
+    drone.planned_moves = [Position(0, 2)]
+    for _ in range(11):
+        drone.move()
+    assert drone.position == Position(0, 2)
+
+def test_swarm_follows_paths():
+    drones = [Drone(i, (12, 9), (3, 3)) for i in range(20)]
+    swarm = SwarmState.from_drones(drones, (12, 9), (3, 3), np.random.default_rng(3))
+    planner = PathPlanner((12, 9), (3, 3))
+    planner.set_obstacles([(6, y) for y in range(1, 9)])
+    for i in range(20):
+        swarm.set_xy(i, i % 6, 8)
+        swarm.set_target(i, (10, 6))
+    arrived = np.zeros(20, dtype=bool)
+    for _ in range(40):
+        swarm.move(planner)
+        # Drones random walk once they arrived, only planned steps avoid obstacles.
+        assert not planner.blocked[swarm.positions[~arrived, 1], swarm.positions[~arrived, 0]].any()
+        arrived |= ~swarm.has_target & (swarm.positions == (10, 6)).all(axis=1)
+    assert arrived.all()
+
+if __name__ == "__main__":
+    test_distance_field_matches_bfs()
+    test_paths_go_around_obstacles()
+    test_paths_match_bfs_on_random_maps()
+    test_unreachable_target()
+    test_fields_are_shared_per_region()
+    test_drone_follows_plan_without_random_moves()
+    test_greedy_step_without_planner()
+    test_swarm_follows_paths()
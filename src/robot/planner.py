@@ -1,16 +1,166 @@
-import replicate
+"""
+Planner backends and their registry.
+
+Backends are registered by name as "module:attribute" paths and only imported when a
+planner is made, so a process that never calls the remote model never imports its SDK.
+
+    replicate  the LLM on Replicate (needs the replicate package and an API token)
+    rules      deterministic local policy heading for the least explored neighboring region
+    recorded   replays the answers of an earlier run, by prompt
+    fake       robot.planning.FakePlanner
+
+A backend answers prompts with `execute_prompt(prompt)`. Backends that plan from the drone
+itself rather than from the prompt also have `execute_for(drone, prompt)`, which the drones
+and planning stages call instead.
+"""
+import importlib
+import json
+
+# Region offsets (row, column) for each direction the planner can answer with.
+REGION_OFFSETS = {
+    "up": (1, 0),
+    "down": (-1, 0),
+    "left": (0, -1),
+    "right": (0, 1),
+}
+
+def neighbor_region_scores(drone) -> dict[str, int]:
+    """Exploration score of each neighboring region on the drone's map, by direction."""
+    region_y, region_x = drone.map.get_region(drone.position)
+    scores = {}
+    for direction, (offset_y, offset_x) in REGION_OFFSETS.items():
+        target_y, target_x = region_y + offset_y, region_x + offset_x
+        if drone.map.get_region_bounds((target_y, target_x)) is not None:
+            scores[direction] = drone.map.region_exploration_score(target_x, target_y)
+    return scores
 
 class Planner:
-    @staticmethod
-    def execute_prompt(prompt: str) -> str:
+    """The Replicate backend."""
+    model = "meta/meta-llama-3.1-405b-instruct"
+    max_tokens = 1024
+
+    @classmethod
+    def execute_prompt(cls, prompt: str) -> str:
+        import replicate
         input = {
             "prompt": prompt,
-            "max_tokens": 1024
+            "max_tokens": cls.max_tokens
         }
         result = ""
         for event in replicate.stream(
-            "meta/meta-llama-3.1-405b-instruct",
+            cls.model,
             input=input
         ):
-            result += event
+            result += str(event)
+        return result
+
+def replicate_planner(model: str | None = None, max_tokens: int | None = None):
+    """The Replicate backend, with another model or token limit if given."""
+    if model is None and max_tokens is None:
+        return Planner
+    return type("Planner", (Planner,), {"model": model or Planner.model, "max_tokens": max_tokens or Planner.max_tokens})
+
+class RuleBasedPlanner:
+    """
+    Local backend that heads for the least explored neighboring region on the drone's map.
+    Ties are broken by the drone id, so drones in the same place spread out and every run
+    with the same maps gets the same answers.
+    """
+    model = "rules"
+
+    def __init__(self):
+        self.calls = 0
+
+    def execute_for(self, drone, prompt: str) -> str:
+        self.calls += 1
+        scores = neighbor_region_scores(drone)
+        if not scores:
+            return list(REGION_OFFSETS)[drone.id % len(REGION_OFFSETS)]
+        least_explored = min(scores.values())
+        ties = [direction for direction, score in scores.items() if score == least_explored]
+        return ties[drone.id % len(ties)]
+
+    def execute_prompt(self, prompt: str) -> str:
+        raise TypeError("The rule based planner plans from the drone's map, call execute_for(drone, prompt).")
+
+class RecordedPlanner:
+    """
+    Backend that answers every prompt with the answer it got in a recorded run.
+
+    `responses` is a {prompt: inference result} dict or (drone id, prompt, inference result)
+    planner calls, e.g. of Simulator.planner_calls. `trace` is a recorder.TraceRecorder
+    directory and `path` a JSON lines file of {"prompt", "inference_result"} objects to load
+    them from. Prompts that were not recorded get `default`, or raise KeyError without one.
+    """
+    model = "recorded"
+
+    def __init__(self, responses=None, trace: str | None = None, path: str | None = None, default: str | None = None):
+        self.responses = {}
+        self.default = default
+        self.calls = 0
+        self.misses = 0
+        if isinstance(responses, dict):
+            self.responses.update(responses)
+        elif responses is not None:
+            self.add_calls(responses)
+        if trace is not None:
+            from recorder import TraceReader
+            self.add_calls(call for record in TraceReader(trace) for call in record.planner_calls)
+        if path is not None:
+            with open(path) as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.responses[entry["prompt"]] = entry["inference_result"]
+
+    def add_calls(self, calls) -> None:
+        """Records (drone id, prompt, inference result) planner calls. Later calls win."""
+        for _, prompt, inference_result in calls:
+            self.responses[prompt] = inference_result
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            for prompt, inference_result in self.responses.items():
+                file.write(json.dumps({"prompt": prompt, "inference_result": inference_result}) + "\n")
+
+    def execute_prompt(self, prompt: str) -> str:
+        self.calls += 1
+        result = self.responses.get(prompt)
+        if result is None:
+            self.misses += 1
+            if self.default is None:
+                raise KeyError(f"No recorded answer for prompt of length {len(prompt)}")
+            result = self.default
         return result
+
+# Backend name -> "module:attribute" of a class or factory taking the backend's options.
+PLANNER_BACKENDS = {
+    "replicate": "robot.planner:replicate_planner",
+    "rules": "robot.planner:RuleBasedPlanner",
+    "recorded": "robot.planner:RecordedPlanner",
+    "fake": "robot.planning:FakePlanner",
+}
+
+def register_backend(name: str, target: str) -> None:
+    """Registers a backend by the "module:attribute" path of its class or factory."""
+    assert ":" in target, "Backends are registered as module:attribute."
+    PLANNER_BACKENDS[name] = target
+
+def make_planner(config="replicate", **options):
+    """
+    Makes a planner from a backend name, or from a config dict with the name under "backend"
+    and the backend's options, e.g. {"backend": "recorded", "trace": "run.trace"}. Only the
+    chosen backend's module is imported.
+    """
+    if isinstance(config, dict):
+        options = {**config, **options}
+        config = options.pop("backend")
+    if config not in PLANNER_BACKENDS:
+        raise ValueError(f"Unknown planner backend {config!r}, expected one of {sorted(PLANNER_BACKENDS)}.")
+    module, attribute = PLANNER_BACKENDS[config].split(":")
+    return getattr(importlib.import_module(module), attribute)(**options)
+
+def parse_planner_config(text: str):
+    """A backend name or a JSON config object, e.g. from the command line."""
+    text = text.strip()
+    return json.loads(text) if text.startswith("{") else text
@@ -0,0 +1,69 @@
+import random
+import pytest
+from planner import *
+from drone import Drone, Message, Position, State
+from planning import ConcurrentPlanner
+
+def observe(drone):
+    message = Message()
+    message.add_state(drone.id, State(drone.id, drone.position, "Perception Context", ""))
+    drone.update_current_data(message)
+
+def test_rule_based_planner_heads_for_least_explored_region():
+    drone = Drone(0, (9,9), (3,3), rng=random.Random(0))
+    region_y, region_x = drone.map.get_region(drone.position)
+    for y in range(9):
+        for x in range(9):
+            if drone.map.get_region(Position(x, y)) != (region_y + 1, region_x):
+                drone.map.visit_cell(Position(x, y))
+    assert min(neighbor_region_scores(drone), key=neighbor_region_scores(drone).get) == "up"
+    planner = RuleBasedPlanner()
+    assert planner.execute_for(drone, "prompt") == "up"
+    observe(drone)
+    prompt, inference_result = drone.update(planner)
+    assert inference_result == "up" and planner.calls == 2
+    with pytest.raises(TypeError):
+        planner.execute_prompt(prompt)
+
+def test_rule_based_planner_is_deterministic():
+    answers = lambda: [RuleBasedPlanner().execute_for(Drone(i, (9,9), (3,3), rng=random.Random(i)), "") for i in range(6)]
+    first = answers()
+    assert first == answers()
+    # Drones facing the same unexplored regions break ties by id.
+    assert len(set(first)) > 1
+    drones = [Drone(i, (9,9), (3,3), rng=random.Random(i)) for i in range(6)]
+    for drone in drones:
+        observe(drone)
+    calls = ConcurrentPlanner(RuleBasedPlanner()).update(drones)
+    assert [call[2] for call in calls] == first
+
+def test_recorded_planner(tmp_path):
+    planner = RecordedPlanner([(0, "first", "up"), (1, "second", "left")])
+    assert planner.execute_prompt("second") == "left"
+    with pytest.raises(KeyError):
+        planner.execute_prompt("third")
+    path = str(tmp_path / "answers.jsonl")
+    planner.save(path)
+    loaded = RecordedPlanner(path=path, default="down")
+    assert loaded.responses == planner.responses
+    assert loaded.execute_prompt("first") == "up"
+    assert loaded.execute_prompt("third") == "down" and loaded.misses == 1
+
+def test_make_planner():
+    assert make_planner("rules").model == "rules"
+    assert make_planner({"backend": "recorded", "responses": {"a": "right"}}).execute_prompt("a") == "right"
+    assert make_planner("fake", response="left").execute_prompt("") == "left"
+    assert make_planner("replicate").model == Planner.model
+    planner = make_planner("replicate", model="other/model")
+    assert planner.model == "other/model" and planner.max_tokens == Planner.max_tokens
+    assert parse_planner_config('{"backend": "rules"}') == {"backend": "rules"}
+    assert parse_planner_config("rules") == "rules"
+    with pytest.raises(ValueError):
+        make_planner("unknown")
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_rule_based_planner_heads_for_least_explored_region()
+    test_rule_based_planner_is_deterministic()
+    test_recorded_planner(pathlib.Path(tempfile.mkdtemp()))
+    test_make_planner()
@@ -0,0 +1,146 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from robot.planner import REGION_OFFSETS, neighbor_region_scores
+
+def fallback_inference_result(drone, rng=None) -> str:
+    """
+    Region policy used when the planner fails or times out: head for the least explored
+    neighboring region on the drone's map, breaking ties randomly. Without a random stream
+    the drone's own is used, so seeded runs stay reproducible.
+    """
+    rng = rng if rng is not None else drone.rng
+    scores = neighbor_region_scores(drone)
+    if not scores:
+        return rng.choice(list(REGION_OFFSETS))
+    least_explored = min(scores.values())
+    return rng.choice([direction for direction, score in scores.items() if score == least_explored])
+
+class FakePlanner:
+    """
+    Local planner backend with configurable latency, for tests and benchmarks.
+
+    `response` is either a fixed answer or a callable that maps the prompt to an answer.
+    """
+    def __init__(self, latency: float = 0.0, response="up", failure_rate: float = 0.0, rng=None):
+        self.latency = latency
+        self.response = response
+        self.failure_rate = failure_rate
+        self._rng = rng if rng is not None else random.Random()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _respond(self, prompt: str) -> str:
+        if self._rng.random() < self.failure_rate:
+            raise RuntimeError("Fake planner failure")
+        return self.response(prompt) if callable(self.response) else self.response
+
+    def execute_prompt(self, prompt: str) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._respond(prompt)
+
+    async def execute_prompt_async(self, prompt: str) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            return self._respond(prompt)
+        finally:
+            self.in_flight -= 1
+
+class ConcurrentPlanner:
+    """
+    Planning stage that runs the inference requests of all drones in a tick concurrently.
+
+    Drone-aware planners (with `execute_for`) and sync ones run on a thread pool, planners
+    with an `execute_prompt_async` coroutine are awaited directly. At most
+    `max_concurrency` requests are in flight at once. A request that raises or takes longer
+    than `timeout` seconds gets the answer of `fallback` instead.
+
+    A thread cannot be interrupted, so a timed-out call keeps its pool thread until the
+    planner returns. Those calls are counted in `abandoned`. While every pool thread is held
+    by one, requests get the fallback answer right away instead of queueing behind them.
+    """
+    def __init__(self, planner, max_concurrency: int = 8, timeout: float | None = 30.0, fallback=fallback_inference_result):
+        assert max_concurrency > 0
+        self.planner = planner
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.fallback = fallback
+        self.timeouts = 0
+        self.failures = 0
+        # Thread pool calls whose request timed out but that still hold a thread.
+        self._abandoned = set()
+        self._executor = None
+
+    @property
+    def abandoned(self) -> int:
+        return len(self._abandoned)
+
+    async def _execute(self, drone, prompt: str) -> str:
+        if hasattr(self.planner, "execute_for"):
+            return await self._in_thread(self.planner.execute_for, drone, prompt)
+        if hasattr(self.planner, "execute_prompt_async"):
+            return await self.planner.execute_prompt_async(prompt)
+        return await self._in_thread(self.planner.execute_prompt, prompt)
+
+    async def _in_thread(self, function, *args) -> str:
+        if len(self._abandoned) >= self.max_concurrency:
+            raise RuntimeError("Every planner thread is held by a timed out call.")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        future = self._executor.submit(function, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                self._abandoned.add(future)
+                future.add_done_callback(self._abandoned.discard)
+            raise
+
+    async def _plan_one(self, semaphore: asyncio.Semaphore, drone, prompt: str) -> str:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(self._execute(drone, prompt), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+            except Exception:
+                self.failures += 1
+        return self.fallback(drone)
+
+    async def plan_async(self, requests) -> list[str]:
+        """Runs (drone, prompt) requests concurrently and returns the answers in request order."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(*(self._plan_one(semaphore, drone, prompt) for drone, prompt in requests))
+
+    def plan(self, requests) -> list[str]:
+        requests = list(requests)
+        if not requests:
+            return []
+        return asyncio.run(self.plan_async(requests))
+
+    def update(self, drones) -> list[tuple]:
+        """
+        Concurrent equivalent of calling Drone.update on every drone.
+        Returns (drone id, prompt, inference result) for every planner call.
+        """
+        requests = []
+        for drone in drones:
+            prompt = drone.get_planning_prompt()
+            if prompt is not None:
+                requests.append((drone, prompt))
+        results = self.plan(requests)
+        for (drone, _), inference_result in zip(requests, results):
+            drone.apply_inference_result(inference_result)
+        for drone in drones:
+            drone.archive_current_data()
+        return [(drone.id, prompt, inference_result) for (drone, prompt), inference_result in zip(requests, results)]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,111 @@
+import random
+import time
+from drone import Drone, Message, Position, State
+from planning import *
+
+class StaticPlanner:
+    @staticmethod
+    def execute_prompt(prompt: str) -> str:
+        return "down"
+
+def make_drones_with_observations(count):
+    drones = [Drone(i, (9,9), (3,3)) for i in range(count)]
+    for drone in drones:
+        message = Message()
+        message.add_state(drone.id, State(drone.id, drone.position, "Perception Context", ""))
+        drone.update_current_data(message)
+    return drones
+
+def test_requests_run_concurrently():
+    planner = FakePlanner(latency=0.1)
+    stage = ConcurrentPlanner(planner, max_concurrency=20)
+    start = time.perf_counter()
+    results = stage.plan((None, f"prompt {i}") for i in range(20))
+    assert time.perf_counter() - start < 1.0
+    assert results == ["up"] * 20
+    assert planner.max_in_flight == 20
+
+def test_concurrency_limit():
+    planner = FakePlanner(latency=0.01)
+    stage = ConcurrentPlanner(planner, max_concurrency=3)
+    stage.plan((None, f"prompt {i}") for i in range(12))
+    assert planner.calls == 12
+    assert planner.max_in_flight == 3
+
+def test_timeout_and_failure_fall_back_to_region_policy():
+    drones = make_drones_with_observations(4)
+    stage = ConcurrentPlanner(FakePlanner(latency=1.0), timeout=0.05)
+    results = stage.plan((drone, "prompt") for drone in drones)
+    assert stage.timeouts == 4
+    assert all(result in REGION_OFFSETS for result in results)
+
+    stage = ConcurrentPlanner(FakePlanner(failure_rate=1.0))
+    stage.plan((drone, "prompt") for drone in drones)
+    assert stage.failures == 4
+
+def test_seeded_fallbacks_are_reproducible():
+    def run():
+        drones = [Drone(i, (9,9), (3,3), rng=random.Random(i)) for i in range(6)]
+        return ConcurrentPlanner(FakePlanner(failure_rate=1.0)).plan((drone, "prompt") for drone in drones)
+    assert run() == run()
+
+class SlowPlanner:
+    @staticmethod
+    def execute_prompt(prompt: str) -> str:
+        time.sleep(0.5)
+        return "down"
+
+def test_timed_out_threads_are_bounded():
+    drones = make_drones_with_observations(2)
+    stage = ConcurrentPlanner(SlowPlanner(), max_concurrency=2, timeout=0.05)
+    stage.plan((drone, "prompt") for drone in drones)
+    assert stage.timeouts == 2 and stage.abandoned == 2
+    # With every thread held, requests fall back at once instead of queueing.
+    start = time.perf_counter()
+    stage.plan((drone, "prompt") for drone in drones)
+    assert time.perf_counter() - start < 0.2
+    assert stage.failures == 2 and stage.timeouts == 2
+    time.sleep(0.6)
+    assert stage.abandoned == 0
+    stage.close()
+
+def test_sync_planner_runs_on_threads():
+    stage = ConcurrentPlanner(StaticPlanner(), max_concurrency=4)
+    assert stage.plan((None, "prompt") for _ in range(8)) == ["down"] * 8
+    stage.close()
+
+class SlowDroneAwarePlanner:
+    @staticmethod
+    def execute_for(drone, prompt: str) -> str:
+        time.sleep(0.5)
+        return "down"
+
+def test_drone_aware_planner_runs_on_threads():
+    drones = make_drones_with_observations(2)
+    stage = ConcurrentPlanner(SlowDroneAwarePlanner(), max_concurrency=2, timeout=0.05)
+    start = time.perf_counter()
+    stage.plan((drone, "prompt") for drone in drones)
+    # A slow answer times out instead of blocking the event loop.
+    assert time.perf_counter() - start < 0.4
+    assert stage.timeouts == 2 and stage.abandoned == 2
+    time.sleep(0.6)
+    assert stage.abandoned == 0
+    stage.close()
+
+def test_update_plans_and_archives():
+    drones = make_drones_with_observations(5)
+    ConcurrentPlanner(FakePlanner(latency=0.01, response="right")).update(drones)
+    for drone in drones:
+        # Only the answer, which is offered to the neighbors before it is archived, stays current.
+        assert list(drone.current_data.data) == [drone.id]
+        assert drone.historical_data.get_state(drone.id).inference_result == "right"
+
+if __name__ == "__main__":
+    test_requests_run_concurrently()
+    test_concurrency_limit()
+    test_timeout_and_failure_fall_back_to_region_policy()
+    test_seeded_fallbacks_are_reproducible()
+    test_timed_out_threads_are_bounded()
+    test_sync_planner_runs_on_threads()
+    test_drone_aware_planner_runs_on_threads()
+    test_update_plans_and_archives()
@@ -0,0 +1,118 @@
+from collections import OrderedDict
+
+OMITTED = " Reports from {} more peers were left out."
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text, about four characters per token."""
+    return len(text) // 4 + 1
+
+def _peers(ids) -> str:
+    if len(ids) == 1:
+        return f"peer {ids[0]}"
+    return "peers " + ", ".join(map(str, ids[:-1])) + f" and {ids[-1]}"
+
+class PromptBuilder:
+    """
+    Builds planner prompts that fit a token budget.
+
+    Peer states are grouped by identical observations, so a report that spread through the
+    swarm is sent once. Current data comes before historical data. Within each, groups are
+    ranked by the distance from the drone to where they were observed, then by peer id;
+    versions are per-drone counters and say nothing about recency across drones.
+    They are added in rank order until the budget is used up. The text of every distinct
+    observation is cached, so a rebuild only renders observations it has not seen before.
+    """
+    def __init__(self, token_budget: int = 1024, max_fragments: int = 4096, tokens=estimate_tokens):
+        assert token_budget > 0 and max_fragments > 0
+        self.token_budget = token_budget
+        self._max_fragments = max_fragments
+        self._tokens = tokens
+        self._fragments: OrderedDict[tuple, tuple[str, int]] = OrderedDict()
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+
+    def fragment(self, perception_context: str, inference_result: str) -> tuple[str, int]:
+        """Text and token count of an observation, without the subject."""
+        key = (perception_context, inference_result)
+        fragment = self._fragments.get(key)
+        if fragment is not None:
+            self._fragments.move_to_end(key)
+            self.fragment_hits += 1
+            return fragment
+        self.fragment_misses += 1
+        text = f" observed that {perception_context.rstrip('. ')}"
+        if inference_result:
+            text += f" and planned the following response: {inference_result.rstrip('. ')}"
+        text += "."
+        fragment = self._fragments[key] = (text, self._tokens(text))
+        while len(self._fragments) > self._max_fragments:
+            self._fragments.popitem(last=False)
+        return fragment
+
+    def _groups(self, states, position, seen) -> list:
+        """Peer states grouped by observation, in rank order. Skips observations already in `seen`."""
+        groups = {}
+        for state in states:
+            key = (state.perception_context, state.inference_result)
+            if key in seen:
+                continue
+            rank = max(abs(state.position.x - position.x), abs(state.position.y - position.y))
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [rank, [state.id]]
+            else:
+                group[0] = min(group[0], rank)
+                group[1].append(state.id)
+        seen.update(groups)
+        return sorted(([rank, key, sorted(ids)] for key, (rank, ids) in groups.items()), key=lambda group: (group[0], group[2][0]))
+
+    def build(self, drone) -> str:
+        """The planner prompt of a drone that has a new observation of its own."""
+        own = drone.current_data.data[drone.id]
+        map_dimensions, region_dimensions = drone.map.map_dimensions, drone.map.region_dimensions
+        head = [
+            f"Our drone is on a {map_dimensions[0]} by {map_dimensions[1]} grid of cells. ",
+            f"The map is also divided into regions of {region_dimensions[1]} by {region_dimensions[0]} cells. Each cell is contained in a region. ",
+            "If all else is equal, we prefer to move toward the region with the least exploration. ",
+            f"Our drone has{self.fragment(own.perception_context, '')[0]}",
+        ]
+        tail = " Given this information, should the drone move to the region up, down, left, or right?"
+        # Room for the note on left out reports is reserved up front.
+        budget = self.token_budget - sum(map(self._tokens, head)) - self._tokens(tail) - self._tokens(OMITTED.format(len(drone.current_data.data) + len(drone.historical_data.data)))
+
+        # The newest version of every peer; the historical version only if there is no current one.
+        current = [state for id, state in drone.current_data.data.items() if id != drone.id]
+        historical = [state for id, state in drone.historical_data.data.items() if id != drone.id and id not in drone.current_data.data]
+        position = drone.position
+        seen = {(own.perception_context, own.inference_result)}
+        sections = [
+            (" Currently, more recent information is available from our peers.", self._groups(current, position, seen)),
+            (" Historically, older information is that", self._groups(historical, position, seen)),
+        ]
+
+        parts, omitted = head, 0
+        for heading, groups in sections:
+            if not groups:
+                continue
+            heading_tokens = self._tokens(heading)
+            added = False
+            for _, (perception_context, inference_result), ids in groups:
+                text, tokens = self.fragment(perception_context, inference_result)
+                subject = " " + _peers(ids) + (" have" if len(ids) > 1 else " has")
+                cost = tokens + self._tokens(subject) + (0 if added else heading_tokens)
+                if cost > budget:
+                    omitted += len(ids)
+                    continue
+                if not added:
+                    parts.append(heading)
+                    added = True
+                parts.append(subject)
+                parts.append(text)
+                budget -= cost
+        if omitted:
+            parts.append(OMITTED.format(omitted))
+        parts.append(tail)
+        return "".join(parts)
+
+# Builder shared by the drones that are not given their own.
+DEFAULT_PROMPT_BUILDER = PromptBuilder()
@@ -0,0 +1,64 @@
+from prompt import *
+from drone import Drone, Message, Position, State
+
+def make_drone():
+    drone = Drone(0, (30, 30), (3, 3))
+    drone._set_position(10, 10)
+    drone.observe("there is a trapped person.")
+    return drone
+
+def add_peer(message, id, x, y, perception_context, inference_result="", seq=1):
+    message.add_state(id, State(id, Position(x, y), perception_context, inference_result, seq))
+
+def test_message_prompt_keeps_own_observation():
+    message = Message()
+    add_peer(message, 0, 0, 0, "there is a fire.")
+    add_peer(message, 1, 0, 0, "the road is blocked.", "up")
+    prompt = message.get_prompt(0)
+    assert prompt.startswith("Our drone has observed that there is a fire.")
+    assert "peer 1 has observed that the road is blocked." in prompt
+    assert "peer 0" not in prompt
+
+def test_prompt_groups_identical_observations():
+    drone = make_drone()
+    for id in (3, 1, 2):
+        add_peer(drone.current_data, id, 11, 10, "the road is blocked.")
+    add_peer(drone.historical_data, 4, 11, 10, "the road is blocked.")
+    add_peer(drone.historical_data, 5, 11, 10, "there is a fire.", "left")
+    prompt = PromptBuilder().build(drone)
+    assert prompt.startswith("Our drone is on a 30 by 30 grid of cells.")
+    assert "Our drone has observed that there is a trapped person." in prompt
+    assert prompt.count("the road is blocked.") == 1
+    assert "peers 1, 2 and 3 have observed that the road is blocked." in prompt
+    assert prompt.index("Currently") < prompt.index("Historically") < prompt.index("peer 5")
+    assert prompt.endswith("up, down, left, or right?")
+
+def test_prompt_respects_budget_and_ranking():
+    drone = make_drone()
+    for id in range(1, 500):
+        add_peer(drone.current_data, id, 10 + id % 20, 10, f"observation number {id}.", seq=id)
+    builder = PromptBuilder(token_budget=300)
+    prompt = builder.build(drone)
+    assert estimate_tokens(prompt) <= 300
+    assert "more peers were left out." in prompt
+    # The closest observations make it in, lowest peer id first, the farthest do not.
+    assert "observation number 20." in prompt and "observation number 40." in prompt
+    assert "observation number 19." not in prompt
+
+def test_fragments_are_cached():
+    drone = make_drone()
+    for id in range(1, 50):
+        add_peer(drone.current_data, id, 10, 10, f"observation number {id}.")
+    builder = PromptBuilder()
+    first = builder.build(drone)
+    misses = builder.fragment_misses
+    add_peer(drone.current_data, 50, 10, 10, "observation number 50.")
+    second = builder.build(drone)
+    assert builder.fragment_misses == misses + 1
+    assert first != second
+
+if __name__ == "__main__":
+    test_message_prompt_keeps_own_observation()
+    test_prompt_groups_identical_observations()
+    test_prompt_respects_budget_and_ranking()
+    test_fragments_are_cached()
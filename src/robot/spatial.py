@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+type Cell = tuple[int, int]
+
+class GridIndex:
+    """
+    Uniform grid (cell hash) over integer positions for neighbor discovery.
+
+    Cells are `threshold` wide, so every point satisfying the communication rule
+    abs(dx) < threshold and abs(dy) < threshold lies in the 3x3 block of cells around
+    the query point. Building the index and answering all queries is near-linear in
+    the number of points instead of quadratic.
+    """
+    def __init__(self, threshold: int):
+        assert threshold > 0, "Threshold must be positive."
+        self._threshold = threshold
+        self._cells: dict[Cell, dict] = defaultdict(dict)
+        self._points: dict = {}
+
+    @property
+    def threshold(self) -> int:
+        return self._threshold
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def cell(self, x: int, y: int) -> Cell:
+        """ Gets the cell containing a position. """
+        return (x // self._threshold, y // self._threshold)
+
+    def insert(self, key, x: int, y: int) -> None:
+        assert key not in self._points, f"{key} is already indexed."
+        self._points[key] = (x, y)
+        self._cells[self.cell(x, y)][key] = (x, y)
+
+    def remove(self, key) -> None:
+        x, y = self._points.pop(key)
+        cell = self.cell(x, y)
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+
+    def move(self, key, x: int, y: int) -> None:
+        """ Updates the position of an indexed point, touching only the affected cells. """
+        old_x, old_y = self._points[key]
+        old_cell, new_cell = self.cell(old_x, old_y), self.cell(x, y)
+        self._points[key] = (x, y)
+        if old_cell == new_cell:
+            self._cells[new_cell][key] = (x, y)
+            return
+        bucket = self._cells[old_cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[old_cell]
+        self._cells[new_cell][key] = (x, y)
+
+    def rebuild(self, points) -> None:
+        """ Replaces the contents of the index with an iterable of (key, x, y). """
+        self._cells.clear()
+        self._points.clear()
+        for key, x, y in points:
+            self.insert(key, x, y)
+
+    def query(self, x: int, y: int, exclude=None) -> list:
+        """ Keys of all points that can communicate with (x, y), excluding `exclude`. """
+        threshold = self._threshold
+        cell_x, cell_y = self.cell(x, y)
+        result = []
+        for i in (cell_x - 1, cell_x, cell_x + 1):
+            for j in (cell_y - 1, cell_y, cell_y + 1):
+                bucket = self._cells.get((i, j))
+                if not bucket:
+                    continue
+                for key, (other_x, other_y) in bucket.items():
+                    if key != exclude and abs(other_x - x) < threshold and abs(other_y - y) < threshold:
+                        result.append(key)
+        return result
+
+    def neighbors(self, key) -> list:
+        """ Keys of all points that can communicate with an indexed point. """
+        x, y = self._points[key]
+        return self.query(x, y, exclude=key)
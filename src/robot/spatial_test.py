@@ -0,0 +1,36 @@
+import random
+from spatial import *
+
+def brute_force_neighbors(points, threshold):
+    return {
+        key: sorted(other for other, (ox, oy) in points.items() if other != key and abs(ox - x) < threshold and abs(oy - y) < threshold)
+        for key, (x, y) in points.items()
+    }
+
+def test_grid_index_matches_pairwise_scan():
+    rng = random.Random(0)
+    for threshold in (1, 3, 4, 7):
+        points = {i: (rng.randint(0, 40), rng.randint(0, 40)) for i in range(300)}
+        index = GridIndex(threshold)
+        index.rebuild((key, x, y) for key, (x, y) in points.items())
+        expected = brute_force_neighbors(points, threshold)
+        assert {key: sorted(index.neighbors(key)) for key in points} == expected
+
+def test_grid_index_incremental_moves():
+    rng = random.Random(1)
+    points = {i: (rng.randint(0, 20), rng.randint(0, 20)) for i in range(100)}
+    index = GridIndex(4)
+    index.rebuild((key, x, y) for key, (x, y) in points.items())
+    for _ in range(20):
+        for key in points:
+            x, y = points[key]
+            points[key] = (x + rng.choice((-1, 0, 1)), y + rng.choice((-1, 0, 1)))
+            index.move(key, *points[key])
+    assert {key: sorted(index.neighbors(key)) for key in points} == brute_force_neighbors(points, 4)
+
+    index.remove(0)
+    assert 0 not in index and len(index) == 99
+
+if __name__ == "__main__":
+    test_grid_index_matches_pairwise_scan()
+    test_grid_index_incremental_moves()
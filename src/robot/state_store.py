@@ -0,0 +1,75 @@
+"""
+Immutable drone state records and their swarm-wide interning.
+
+Position and State are frozen, slotted records, so every drone, message and history can
+hold references to the same record instead of its own copy. A StateStore hands out one
+canonical record per distinct value. The store only keeps weak references, so a record
+disappears from it once no drone holds it any longer. Records that are decoded or
+unpickled, e.g. in another worker process, are interned again on arrival.
+"""
+import dataclasses
+import sys
+import weakref
+
+@dataclasses.dataclass(frozen=True, slots=True, weakref_slot=True)
+class Position:
+    x: int
+    y: int
+
+    def __str__(self):
+        return f"({self.x}, {self.y})"
+
+    def __reduce__(self):
+        return _intern_position, (self.x, self.y)
+
+@dataclasses.dataclass(frozen=True, slots=True, weakref_slot=True)
+class State:
+    id: int
+    position: Position
+    perception_context: str
+    inference_result: str
+    seq: int = 0 # Per-origin sequence number, higher is newer
+
+    def __reduce__(self):
+        return _intern_state, (self.id, self.position, self.perception_context, self.inference_result, self.seq)
+
+class StateStore:
+    """Canonical Position and State records by value, with their text interned."""
+    def __init__(self):
+        self._positions = weakref.WeakValueDictionary()
+        self._states = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._states)
+
+    def position(self, x: int, y: int) -> Position:
+        key = (int(x), int(y))
+        position = self._positions.get(key)
+        if position is None:
+            position = self._positions[key] = Position(*key)
+        return position
+
+    def state(self, id: int, position: Position, perception_context: str, inference_result: str = "", seq: int = 0) -> State:
+        position = self.position(position.x, position.y)
+        key = (id, position.x, position.y, perception_context, inference_result, seq)
+        state = self._states.get(key)
+        if state is not None:
+            self.hits += 1
+            return state
+        self.misses += 1
+        state = self._states[key] = State(id, position, sys.intern(perception_context), sys.intern(inference_result), seq)
+        return state
+
+    def intern(self, state: State) -> State:
+        return self.state(state.id, state.position, state.perception_context, state.inference_result, state.seq)
+
+# Store shared by all drones of a process.
+DEFAULT_STATE_STORE = StateStore()
+
+def _intern_position(x: int, y: int) -> Position:
+    return DEFAULT_STATE_STORE.position(x, y)
+
+def _intern_state(id: int, position: Position, perception_context: str, inference_result: str, seq: int) -> State:
+    return DEFAULT_STATE_STORE.state(id, position, perception_context, inference_result, seq)
@@ -0,0 +1,81 @@
+import dataclasses
+import gc
+import pickle
+from state_store import *
+from drone import Drone, StateHistory
+
+def test_states_are_interned():
+    store = StateStore()
+    first = store.state(1, Position(2, 3), "A fire.", "", 4)
+    assert store.state(1, Position(2, 3), "A fire.", "", 4) is first
+    assert first.position is store.position(2, 3)
+    assert store.state(1, Position(2, 3), "A fire.", "up", 4) is not first
+    assert store.hits == 1 and store.misses == 2
+    try:
+        first.inference_result = "up"
+        assert False, "States are immutable."
+    except dataclasses.FrozenInstanceError:
+        pass
+    # Records nobody holds leave the store.
+    del first
+    gc.collect()
+    assert len(store) == 0
+
+def test_unpickled_states_are_interned():
+    state = DEFAULT_STATE_STORE.state(3, Position(1, 1), "A flood.", "left", 2)
+    assert pickle.loads(pickle.dumps(state)) is state
+    assert pickle.loads(pickle.dumps(Position(1, 1))) is state.position
+
+def test_history_evicts_least_recent_origin():
+    history = StateHistory(capacity=3)
+    states = [DEFAULT_STATE_STORE.state(id, Position(id, id), f"Observation {id}.", "", 1) for id in range(4)]
+    for state in states[:3]:
+        history.add_state(state.id, state)
+    newer = DEFAULT_STATE_STORE.state(0, Position(0, 0), "Observation 0 again.", "", 2)
+    history.add_state(0, newer)
+    history.add_state(3, states[3])
+    assert list(history.data) == [2, 0, 3]
+    assert history.get_state(0) is newer
+    # An older version never replaces a newer one.
+    history.add_state(0, states[0])
+    assert history.get_state(0) is newer
+
+def test_history_ring_keeps_versions():
+    history = StateHistory(capacity=3, eviction="oldest")
+    versions = [DEFAULT_STATE_STORE.state(1, Position(0, seq), "Moving.", "", seq) for seq in range(1, 5)]
+    other = DEFAULT_STATE_STORE.state(2, Position(5, 5), "Still.", "", 1)
+    history.add_state(2, other)
+    for state in versions[:2]:
+        history.add_state(1, state)
+    assert history.versions(1) == versions[:2]
+    history.add_state(1, versions[2])
+    assert 2 not in history.data
+    history.add_state(1, versions[3])
+    assert history.versions(1) == versions[1:]
+    assert history.get_state(1) is versions[3]
+
+def test_drone_history_stays_bounded():
+    drone = Drone(0, (9, 9), (3, 3), history_capacity=5)
+    for id in range(1, 20):
+        peer = Drone(id, (9, 9), (3, 3))
+        peer.observe(f"Report {id}.")
+        peer.set_neighbors([drone])
+        drone.archive_current_data()
+    assert len(drone.historical_data.data) == 5
+    assert sorted(drone.historical_data.data) == [15, 16, 17, 18, 19]
+
+def test_planned_state_replaces_observation():
+    drone = Drone(0, (9, 9), (3, 3))
+    observed = drone.observe("A trapped person.")
+    drone.apply_inference_result("up")
+    planned = drone.current_data.get_state(0)
+    assert planned is not observed and observed.inference_result == ""
+    assert planned.inference_result == "up" and planned.seq > observed.seq
+
+if __name__ == "__main__":
+    test_states_are_interned()
+    test_unpickled_states_are_interned()
+    test_history_evicts_least_recent_origin()
+    test_history_ring_keeps_versions()
+    test_drone_history_stays_bounded()
+    test_planned_state_replaces_observation()
@@ -0,0 +1,110 @@
+import numpy as np
+
+# Steps for the directions up, down, left, right, in that order.
+DIRECTION_STEPS = np.array([(0, 1), (0, -1), (-1, 0), (1, 0)], dtype=np.int64)
+
+class SwarmState:
+    """
+    Struct-of-arrays state for a whole swarm.
+
+    Row i of every array belongs to the drone bound at index i. Drones bound to a
+    SwarmState read and write their position, planned target and dwell time here, so
+    per-drone code keeps working while `move` advances every drone in one batched
+    operation.
+    """
+    def __init__(self, num_drones: int, map_dimensions: tuple[int], region_dimensions: tuple[int], rng: np.random.Generator | None = None):
+        assert num_drones >= 0
+        assert map_dimensions[0] > 0 and map_dimensions[1] > 0
+        assert region_dimensions[0] > 0 and region_dimensions[1] > 0
+        self._map_dimensions = map_dimensions
+        self._region_dimensions = region_dimensions
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self.positions = np.zeros((num_drones, 2), dtype=np.int64)  # (x, y)
+        self.targets = np.zeros((num_drones, 2), dtype=np.int64)  # (x, y), valid where has_target
+        self.has_target = np.zeros(num_drones, dtype=bool)
+        self.dwell = np.zeros(num_drones, dtype=np.int64)  # Ticks spent in the current region
+
+    @classmethod
+    def from_drones(cls, drones, map_dimensions, region_dimensions, rng=None):
+        """Allocates a SwarmState for the drones and binds each drone to its row."""
+        swarm = cls(len(drones), map_dimensions, region_dimensions, rng)
+        for i, drone in enumerate(drones):
+            drone.bind_to_swarm(swarm, i)
+        return swarm
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def map_dimensions(self):
+        return self._map_dimensions
+
+    def get_xy(self, i: int) -> tuple[int, int]:
+        return int(self.positions[i, 0]), int(self.positions[i, 1])
+
+    def set_xy(self, i: int, x: int, y: int) -> None:
+        self.positions[i] = (x, y)
+
+    def get_target(self, i: int) -> tuple[int, int] | None:
+        if not self.has_target[i]:
+            return None
+        return int(self.targets[i, 0]), int(self.targets[i, 1])
+
+    def set_target(self, i: int, target: tuple[int, int] | None) -> None:
+        if target is None:
+            self.has_target[i] = False
+        else:
+            self.targets[i] = target
+            self.has_target[i] = True
+
+    def regions(self) -> np.ndarray:
+        """Region index (row, column) of every drone, matching GridMap.get_region."""
+        x, y = self.positions[:, 0], self.positions[:, 1]
+        # Ceiling division, as math.ceil(coordinate / region size) in GridMap.
+        return np.stack([-(-y // self._region_dimensions[0]), -(-x // self._region_dimensions[1])], axis=1)
+
+    def move_toward_targets(self, path_planner=None) -> np.ndarray:
+        """
+        Takes one step toward the planned target for every drone that has one, along a
+        shortest path when given a path planner. Targets that are reached or cannot be
+        reached are dropped. Returns the mask of drones that took a planned step.
+        """
+        moved = np.zeros(len(self), dtype=bool)
+        moving = np.flatnonzero(self.has_target)
+        if len(moving) == 0:
+            return moved
+        if path_planner is None:
+            grad = self.targets[moving] - self.positions[moving]
+            step_x = np.abs(grad[:, 0]) > np.abs(grad[:, 1])
+            self.positions[moving, 0] += np.where(step_x, np.sign(grad[:, 0]), 0)
+            self.positions[moving, 1] += np.where(step_x, 0, np.sign(grad[:, 1]))
+            moved[moving] = True
+        else:
+            next_positions, found = path_planner.next_steps(self.positions[moving], self.targets[moving])
+            self.positions[moving] = next_positions
+            moved[moving[found]] = True
+            self.has_target[moving[~found]] = False
+        reached = (self.positions[moving] == self.targets[moving]).all(axis=1)
+        self.has_target[moving[reached]] = False
+        return moved
+
+    def move_randomly(self, mask: np.ndarray | None = None) -> None:
+        """Moves every drone, or the drones in mask, one cell in a random direction that stays on the map."""
+        x, y = self.positions[:, 0], self.positions[:, 1]
+        max_x, max_y = self._map_dimensions
+        allowed = np.stack([y < max_y - 1, y > 0, x > 0, x < max_x - 1], axis=1)
+        # Uniform choice among the allowed directions: largest random score wins.
+        scores = np.where(allowed, self._rng.random(allowed.shape), -1.0)
+        direction = scores.argmax(axis=1)
+        can_move = allowed[np.arange(len(direction)), direction]
+        if mask is not None:
+            can_move &= mask
+        self.positions += DIRECTION_STEPS[direction] * can_move[:, None]
+
+    def move(self, path_planner=None) -> None:
+        """Batched equivalent of Drone.move for the whole swarm, except for visiting cells."""
+        previous_regions = self.regions()
+        moved = self.move_toward_targets(path_planner)
+        self.move_randomly(~moved)
+        same_region = (self.regions() == previous_regions).all(axis=1)
+        self.dwell = np.where(same_region, self.dwell + 1, 0)
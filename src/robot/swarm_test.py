@@ -0,0 +1,41 @@
+import numpy as np
+from drone import Drone, Position
+from swarm import *
+
+def test_swarm_random_moves_stay_on_map():
+    drones = [Drone(i, (5,7), (2,2)) for i in range(50)]
+    swarm = SwarmState.from_drones(drones, (5,7), (2,2), np.random.default_rng(0))
+    for _ in range(200):
+        before = swarm.positions.copy()
+        swarm.move()
+        assert (np.abs(swarm.positions - before).sum(axis=1) == 1).all()
+        assert (swarm.positions >= 0).all()
+        assert (swarm.positions[:, 0] < 5).all() and (swarm.positions[:, 1] < 7).all()
+
+def test_drones_are_views_over_swarm():
+    drones = [Drone(i, (9,9), (3,3)) for i in range(3)]
+    swarm = SwarmState.from_drones(drones, (9,9), (3,3), np.random.default_rng(1))
+    swarm.set_xy(0, 4, 5)
+    assert drones[0].position == Position(4, 5)
+
+    drones[1].planned_moves = [Position(8, 8)]
+    assert swarm.get_target(1) == (8, 8)
+
+    # Per-drone code keeps working on bound drones.
+    drones[2].move()
+    assert drones[2].map.region_exploration_score(*reversed(drones[2].map.get_region(drones[2].position))) == 1
+    assert drones[2].position == Position(*swarm.get_xy(2))
+
+def test_swarm_reaches_target():
+    drones = [Drone(0, (9,9), (3,3))]
+    swarm = SwarmState.from_drones(drones, (9,9), (3,3), np.random.default_rng(2))
+    swarm.set_xy(0, 0, 0)
+    swarm.set_target(0, (1, 0))
+    swarm.move_toward_targets()
+    assert swarm.get_xy(0) == (1, 0)
+    assert drones[0].planned_moves == []
+
+if __name__ == "__main__":
+    test_swarm_random_moves_stay_on_map()
+    test_drones_are_views_over_swarm()
+    test_swarm_reaches_target()
@@ -0,0 +1,304 @@
+"""
+Multi-process simulation sharded by map region.
+
+The region columns of the map are split into contiguous groups, one per worker process.
+A worker owns the drones whose position lies in its columns and runs movement,
+perception, gossip and planning for them. At every tick barrier the coordinator hands
+drones that crossed a shard boundary to their new worker and sends each worker the
+halo: the foreign drones close enough to its columns to communicate with its drones.
+
+Gossip in Simulator.step is sequential: drone i sends its current data, including what
+lower ids sent it this tick, to its neighbors. Its data at that point is
+
+    P_i = own_i merged with P_k for every neighbor k < i
+
+and after the phase a drone holds P_i merged with P_k for every neighbor k > i. The
+workers compute the same fixed point by exchanging the P of their boundary drones in
+rounds until nothing changes. With a seed, a sharded run therefore matches a
+single-process Simulator run with the same seed.
+
+With a shared MapPool the visit counters of the drones stay in its shared memory block.
+Drones travel between processes without their counters, and every worker attaches to the
+pool and rebinds the counters of the drones it adopts, so maps are never copied.
+"""
+import multiprocessing
+import numpy as np
+from robot.drone import Message
+from robot.map_storage import MapPool
+from robot.planner import Planner
+from robot.pathing import BLOCKING_SCENARIOS, PathPlanner
+from robot.spatial import GridIndex
+from simulator import make_drones, make_perception
+
+def region_column_shards(map_dimensions, region_dimensions, num_workers) -> np.ndarray:
+    """Worker owning each x coordinate, splitting the region columns into contiguous groups."""
+    region_columns = -(-np.arange(map_dimensions[0]) // region_dimensions[1])
+    num_columns = region_columns[-1] + 1
+    return np.minimum(region_columns * num_workers // num_columns, num_workers - 1)
+
+class ShardWorker:
+    """State of one worker process: its drones and their neighborhoods for the current tick."""
+    def __init__(self, shard: int, shard_of_x: np.ndarray, perception, path_planner, communication_threshold, planner, map_pool=None):
+        self.shard = shard
+        # (name, num_maps, map_dimensions, dtype) of a shared MapPool holding the visit counters.
+        self.map_pool = MapPool.attach(*map_pool) if map_pool is not None else None
+        self.shard_of_x = shard_of_x
+        # Every worker steps its own copy of the perception events, which evolve deterministically.
+        self.perception = perception
+        self.path_planner = path_planner
+        self.communication_threshold = communication_threshold
+        self.planner = planner
+        self.drones = {}
+        self.neighbors = {}
+        self.boundary = set()
+        self._gossip_data = {}
+        self._published = {}
+
+    def adopt(self, drones) -> None:
+        for drone in drones:
+            if self.map_pool is not None:
+                drone.map.attach_counts(self.map_pool[drone.id])
+            self.drones[drone.id] = drone
+
+    def _send(self, drones) -> list:
+        """The drones ready to pickle: without their counters if those are in the shared pool."""
+        if self.map_pool is not None:
+            for drone in drones:
+                drone.map.detach_counts()
+        return drones
+
+    def snapshot(self, connection) -> None:
+        """Sends copies of the drones; counters in the shared pool are rebound after sending."""
+        drones = self._send(list(self.drones.values()))
+        connection.send(drones)
+        if self.map_pool is not None:
+            self.adopt(drones)
+
+    def close(self) -> None:
+        # The drones' counters are views of the pool, which must not outlive it.
+        self.drones = {}
+        if self.map_pool is not None:
+            self.map_pool.close()
+
+    def move(self):
+        """Moves and perceives; returns the positions of all drones and the drones that left the shard."""
+        positions, emigrants = [], []
+        ids = sorted(self.drones)
+        self.path_planner.set_obstacles(self.perception.cells(BLOCKING_SCENARIOS))
+        for id in ids:
+            self.drones[id].move(self.path_planner)
+        self.perception.step()
+        detected = self.perception.nearest([(self.drones[id].position.x, self.drones[id].position.y) for id in ids])
+        for id, event in zip(ids, detected):
+            drone = self.drones[id]
+            if event >= 0:
+                drone.observe(self.perception.perception_context(event))
+            pos = drone.position
+            positions.append((id, pos.x, pos.y))
+            if self.shard_of_x[pos.x] != self.shard:
+                emigrants.append(self.drones.pop(id))
+        return positions, self._send(emigrants)
+
+    def find_neighbors(self, halo) -> None:
+        """Neighbor lists of the owned drones, given the (id, x, y) of the foreign drones in the halo."""
+        index = GridIndex(self.communication_threshold)
+        index.rebuild([(id, drone.position.x, drone.position.y) for id, drone in self.drones.items()] + list(halo))
+        self.neighbors = {id: sorted(index.neighbors(id)) for id in self.drones}
+        self.boundary = {id for id, neighbors in self.neighbors.items() if any(k not in self.drones for k in neighbors)}
+        self._gossip_data = {}
+        self._published = {}
+
+    def _data(self, id, halo_data):
+        return self._gossip_data.get(id) if id in self.drones else halo_data.get(id)
+
+    def _news(self, id, received) -> Message:
+        """The part of received data that drone `id` would request in Drone.set_neighbors."""
+        return received.subset(self.drones[id].missing(received.digest()))
+
+    def gossip_round(self, halo_data):
+        """
+        Recomputes P for the owned drones in id order from the latest halo data.
+        Returns P of the boundary drones whose value changed since the last round.
+        """
+        for id in sorted(self.drones):
+            data = Message()
+            data.update(self.drones[id].current_data)
+            for k in self.neighbors[id]:
+                if k < id:
+                    received = self._data(k, halo_data)
+                    if received is not None:
+                        data.update(self._news(id, received))
+            self._gossip_data[id] = data
+        changed = {}
+        for id in self.boundary:
+            digest = self._gossip_data[id].digest()
+            if digest != self._published.get(id, {}):
+                self._published[id] = digest
+                changed[id] = self._gossip_data[id]
+        return changed
+
+    def finish(self, halo_data) -> None:
+        """Applies the result of the gossip phase and plans."""
+        final_data = {}
+        for id in sorted(self.drones):
+            data = Message()
+            data.update(self._gossip_data[id])
+            for k in self.neighbors[id]:
+                if k > id:
+                    received = self._data(k, halo_data)
+                    if received is not None:
+                        data.update(self._news(id, received))
+            final_data[id] = data
+        for id in sorted(self.drones):
+            self.drones[id].current_data.data = final_data[id].data
+            self.drones[id].update(self.planner)
+
+def _worker_main(connection, *args):
+    worker = ShardWorker(*args)
+    while True:
+        command, payload = connection.recv()
+        if command == "stop":
+            worker.close()
+            break
+        elif command == "adopt":
+            connection.send(worker.adopt(payload))
+        elif command == "move":
+            connection.send(worker.move())
+        elif command == "neighbors":
+            connection.send(worker.find_neighbors(payload))
+        elif command == "gossip":
+            connection.send(worker.gossip_round(payload))
+        elif command == "finish":
+            connection.send(worker.finish(payload))
+        elif command == "drones":
+            worker.snapshot(connection)
+    connection.close()
+
+class ShardedSimulator:
+    """
+    Runs a seeded simulation over `num_workers` processes. Use as a context manager or call close().
+    Drones carry their random stream to the workers, so without a seed one is drawn; it is kept
+    in `seed` to reproduce the run.
+
+    map_pool optionally is a shared MapPool of at least num_drones maps that holds the visit
+    counters of drone i in map i. The workers update it in place, so the coordinator and
+    other processes read every map of the run without copying.
+    """
+    def __init__(self, map_dimensions, region_dimensions, num_drones, num_workers=2, communication_threshold=4, planner=Planner, seed=0, perception=None, map_pool=None):
+        assert num_workers > 0
+        assert map_pool is None or (map_pool.name is not None and len(map_pool) >= num_drones), "Needs a shared MapPool with a map per drone."
+        self.map_pool = map_pool
+        pool_spec = None if map_pool is None else (map_pool.name, len(map_pool), map_dimensions, map_pool.counts.dtype.str)
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy)
+        self.seed = seed
+        self.map_dimensions = map_dimensions
+        self.communication_threshold = communication_threshold
+        self.perception = perception if perception is not None else make_perception(map_dimensions, seed)
+        self.tick_count = 0
+        self._shard_of_x = region_column_shards(map_dimensions, region_dimensions, num_workers)
+        self._connections = []
+        self._processes = []
+        for shard in range(num_workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker_main,
+                args=(child, shard, self._shard_of_x, self.perception, PathPlanner(map_dimensions, region_dimensions), communication_threshold, planner, pool_spec),
+                daemon=True,
+            )
+            process.start()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+        drones = make_drones(map_dimensions, region_dimensions, num_drones, seed, map_pool)
+        if map_pool is not None:
+            for drone in drones:
+                drone.map.detach_counts()
+        self._owner = {}
+        adopted = [[] for _ in range(num_workers)]
+        for drone in drones:
+            shard = int(self._shard_of_x[drone.position.x])
+            self._owner[drone.id] = shard
+            adopted[shard].append(drone)
+        self._call_all([("adopt", drones) for drones in adopted])
+
+    @property
+    def scenario_map(self) -> dict:
+        return self.perception.scenario_map
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _call_all(self, commands):
+        """Sends one command to every worker and waits for all replies."""
+        for connection, command in zip(self._connections, commands):
+            connection.send(command)
+        return [connection.recv() for connection in self._connections]
+
+    def _halos(self, positions):
+        """The (id, x, y) of foreign drones within communication range of each shard's columns."""
+        ids = np.array([id for id, _, _ in positions], dtype=np.int64)
+        xy = np.array([(x, y) for _, x, y in positions], dtype=np.int64).reshape(-1, 2)
+        owners = np.array([self._owner[id] for id in ids], dtype=np.int64)
+        reach = self.communication_threshold - 1
+        halos = []
+        for shard in range(len(self._connections)):
+            columns = np.flatnonzero(self._shard_of_x == shard)
+            if len(columns) == 0:
+                halos.append([])
+                continue
+            near = (owners != shard) & (xy[:, 0] >= columns[0] - reach) & (xy[:, 0] <= columns[-1] + reach)
+            halos.append([(int(ids[i]), int(xy[i, 0]), int(xy[i, 1])) for i in np.flatnonzero(near)])
+        return halos
+
+    def step(self) -> None:
+        positions, adopted = [], [[] for _ in self._connections]
+        for moved, emigrants in self._call_all([("move", None)] * len(self._connections)):
+            positions.extend(moved)
+            for drone in emigrants:
+                shard = int(self._shard_of_x[drone.position.x])
+                self._owner[drone.id] = shard
+                adopted[shard].append(drone)
+        self._call_all([("adopt", drones) for drones in adopted])
+        # Keep the coordinator's copy in step with the workers' for scenario_map.
+        self.perception.step()
+
+        halos = self._halos(positions)
+        self._call_all([("neighbors", halo) for halo in halos])
+
+        # Exchange boundary data until every worker reaches the fixed point.
+        halo_ids = [[id for id, _, _ in halo] for halo in halos]
+        published = {}
+        while True:
+            requests = [("gossip", {id: published[id] for id in ids if id in published}) for ids in halo_ids]
+            changed = {}
+            for update in self._call_all(requests):
+                changed.update(update)
+            if not changed:
+                break
+            published.update(changed)
+        self._call_all([("finish", {id: published[id] for id in ids if id in published}) for ids in halo_ids])
+        self.tick_count += 1
+
+    def run(self, n_ticks: int) -> None:
+        for _ in range(n_ticks):
+            self.step()
+
+    def get_drones(self) -> list:
+        """Copies of all drones, ordered by id. With a map pool their maps are views of it."""
+        drones = [drone for shard in self._call_all([("drones", None)] * len(self._connections)) for drone in shard]
+        if self.map_pool is not None:
+            for drone in drones:
+                drone.map.attach_counts(self.map_pool[drone.id])
+        return sorted(drones, key=lambda drone: drone.id)
+
+    def close(self) -> None:
+        for connection in self._connections:
+            connection.send(("stop", None))
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections, self._processes = [], []
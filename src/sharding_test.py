@@ -0,0 +1,85 @@
+from sharding import *
+import random
+from perception import random_events
+from simulator import Simulator
+from robot.map_storage import MapPool
+
+class RightPlanner:
+    @staticmethod
+    def execute_prompt(prompt: str) -> str:
+        return "right"
+
+def test_region_column_shards():
+    shards = region_column_shards((10, 10), (3, 3), 2)
+    assert len(shards) == 10
+    assert list(shards) == sorted(shards)
+    assert set(shards) == {0, 1}
+
+def test_sharded_run_matches_single_process():
+    arguments = dict(map_dimensions=(18, 12), region_dimensions=(3, 3), num_drones=60, planner=RightPlanner, seed=7)
+    simulator = Simulator(**arguments)
+    simulator.run(40)
+    with ShardedSimulator(num_workers=3, **arguments) as sharded:
+        sharded.run(40)
+        drones = sharded.get_drones()
+        assert sharded.scenario_map == simulator.scenario_map
+
+    assert len(drones) == len(simulator.drones)
+    observed = 0
+    for expected, actual in zip(simulator.drones, drones):
+        assert actual.id == expected.id
+        assert actual.position == expected.position
+        assert actual.planned_moves == expected.planned_moves
+        assert actual.historical_data.digest() == expected.historical_data.digest()
+        assert (actual.map._map == expected.map._map).all()
+        observed += not expected.historical_data.empty()
+    # Make sure the run exercised gossip at all.
+    assert observed > 0
+
+def test_sharded_run_with_dynamic_events():
+    arguments = dict(map_dimensions=(18, 12), region_dimensions=(3, 3), num_drones=40, planner=RightPlanner, seed=2)
+    make_events = lambda: random_events((18, 12), 30, random.Random(5), sensor_radius=1, lifetime=10, moving_fraction=0.5)
+    simulator = Simulator(perception=make_events(), **arguments)
+    simulator.run(20)
+    with ShardedSimulator(num_workers=2, perception=make_events(), **arguments) as sharded:
+        sharded.run(20)
+        drones = sharded.get_drones()
+        assert sharded.scenario_map == simulator.scenario_map
+    for expected, actual in zip(simulator.drones, drones):
+        assert actual.position == expected.position
+        assert actual.historical_data.digest() == expected.historical_data.digest()
+
+def test_sharded_run_with_shared_map_pool():
+    arguments = dict(map_dimensions=(18, 12), region_dimensions=(3, 3), num_drones=30, planner=RightPlanner, seed=5)
+    simulator = Simulator(**arguments)
+    simulator.run(15)
+    with MapPool(30, (18, 12), shared=True) as pool:
+        with ShardedSimulator(num_workers=2, map_pool=pool, **arguments) as sharded:
+            sharded.run(15)
+            # The workers count visits in the pool itself.
+            for i, drone in enumerate(simulator.drones):
+                assert (pool[i] == drone.map._map).all()
+            drones = sharded.get_drones()
+            assert all(drone.map._map.base is not None for drone in drones)
+            for expected, actual in zip(simulator.drones, drones):
+                assert actual.position == expected.position
+                assert actual.map.visited_cells == expected.map.visited_cells
+            del drones
+
+def test_unseeded_run():
+    with ShardedSimulator((12, 9), (3, 3), 6, num_workers=2, planner=RightPlanner, seed=None) as sharded:
+        sharded.run(5)
+        assert len(sharded.get_drones()) == 6
+    # The drawn seed reproduces the run.
+    with ShardedSimulator((12, 9), (3, 3), 6, num_workers=2, planner=RightPlanner, seed=sharded.seed) as first, \
+         ShardedSimulator((12, 9), (3, 3), 6, num_workers=2, planner=RightPlanner, seed=sharded.seed) as second:
+        first.run(5)
+        second.run(5)
+        assert [drone.position for drone in first.get_drones()] == [drone.position for drone in second.get_drones()]
+
+if __name__ == "__main__":
+    test_region_column_shards()
+    test_sharded_run_matches_single_process()
+    test_sharded_run_with_dynamic_events()
+    test_sharded_run_with_shared_map_pool()
+    test_unseeded_run()
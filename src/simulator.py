@@ -1,145 +1,239 @@
-import matplotlib.pyplot as plt
-from matplotlib import text
+import argparse
 import numpy as np
 import random
+import time
 from robot.drone import Drone
-from robot.drone import Message
-from robot.drone import State
+from robot.planner import Planner, make_planner, parse_planner_config
+from robot.codec import MessageCodec
+from robot.gossip import GossipCounters
+from robot.pathing import BLOCKING_SCENARIOS, PathPlanner
+from robot.spatial import GridIndex
+from robot.swarm import SwarmState
+from metrics import Metrics, instrument_planner
+from perception import PerceptionEngine
 from scenario import SCENARIO_DICT
 
-class Simulator:
-    def __init__(self, map_dimensions, region_dimensions, num_drones):
-        self.drones = [Drone(id=i, map_dimensions=map_dimensions, region_dimensions=region_dimensions) for i in range(num_drones)]
-        self.scenario_map = {}
+def make_drones(map_dimensions, region_dimensions, num_drones, seed=None, map_counts=None):
+    """
+    Creates the drones of a run. With a seed, every drone gets its own independent random stream.
+    map_counts[i], e.g. of a MapPool, optionally holds the visit counters of drone i.
+    """
+    counts = lambda i: None if map_counts is None else map_counts[i]
+    if seed is None:
+        return [Drone(id=i, map_dimensions=map_dimensions, region_dimensions=region_dimensions, map_counts=counts(i)) for i in range(num_drones)]
+    seeds = np.random.SeedSequence(seed).generate_state(num_drones, dtype=np.uint64)
+    return [Drone(id=i, map_dimensions=map_dimensions, region_dimensions=region_dimensions, rng=random.Random(int(seeds[i])), map_counts=counts(i)) for i in range(num_drones)]
+
+def make_scenario_map(map_dimensions, seed=None):
+    """Places the scenarios on the map. Without a seed the global random module is used."""
+    rng = random if seed is None else random.Random(seed)
+    scenario_map = {}
+    # Sampling cell numbers from a range picks the same cells as sampling the list of all cells, without building it.
+    height = map_dimensions[1]
+    (x1, y1), (x2, y2) = [divmod(cell, height) for cell in rng.sample(range(map_dimensions[0] * height), 2)]
+    scenario_map[(x1, y1)] = "damaged_road_bridge"
+    scenario_map[(x2, y2)] = "trapped_person"
+    return scenario_map
+
+def make_perception(map_dimensions, seed=None, sensor_radius=0):
+    """The default perception: the two static events of make_scenario_map."""
+    return PerceptionEngine.from_scenario_map(map_dimensions, make_scenario_map(map_dimensions, seed), sensor_radius)
 
-        positions = random.sample([(x, y) for x in range(map_dimensions[0]) for y in range(map_dimensions[1])], 2)
-        (x1, y1), (x2, y2) = positions
-        self.scenario_map[(x1, y1)] = "damaged_road_bridge"
-        self.scenario_map[(x2, y2)] = "trapped_person"
+class Simulator:
+    def __init__(self, map_dimensions, region_dimensions, num_drones, communication_threshold=4, planner=Planner, observers=None, vectorized=False, planning_stage=None, seed=None, metrics=None, perception=None, path_planner=None, map_counts=None, coverage=None):
+        self.drones = make_drones(map_dimensions, region_dimensions, num_drones, seed, map_counts)
+        # Scenario events and their detection; scenario_map is derived from it.
+        self.perception = perception if perception is not None else make_perception(map_dimensions, seed)
+        # Shortest paths around blocking scenarios, shared by all drones.
+        self.path_planner = path_planner if path_planner is not None else PathPlanner(map_dimensions, region_dimensions)
+        # With vectorized=True every drone is a view over one SwarmState that moves the whole swarm per tick.
+        self.swarm = SwarmState.from_drones(self.drones, map_dimensions, region_dimensions, np.random.default_rng(seed)) if vectorized else None
+        self.communication_threshold = communication_threshold
+        # Per-phase timings and counters of the run, disabled unless a Metrics is given.
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        if self.metrics.enabled:
+            planner = instrument_planner(planner, self.metrics)
+            if planning_stage is not None and hasattr(planning_stage, "planner"):
+                planning_stage.planner = instrument_planner(planning_stage.planner, self.metrics)
+        self.planner = planner
+        # Optional stage (e.g. ConcurrentPlanner) that plans for all drones at once instead of one by one.
+        self.planning_stage = planning_stage
+        self.tick_count = 0
+        # Drones each drone broadcast to during the last step.
+        self.neighbors = {drone.id: [] for drone in self.drones}
+        # (drone id, prompt, inference result) for every planner call during the last step.
+        self.planner_calls = []
+        # (drone id, event id) for every observation during the last step.
+        self.detections = []
+        self._observers = list(observers) if observers else []
+        # Optional CoverageExchange that merges visit counts between neighbors every tick.
+        self.coverage = coverage
+        # Gossip traffic of the last step and since the start of the run.
+        self.codec = MessageCodec(SCENARIO_DICT.values())
+        self.gossip_counters = GossipCounters(self.codec)
+        self.gossip_totals = GossipCounters(self.codec)
+        # Spatial index over drone list indices, kept in sync as drones move.
+        self._index = GridIndex(communication_threshold)
+        self._index.rebuild((i, drone.position.x, drone.position.y) for i, drone in enumerate(self.drones))
 
         for drone in self.drones:
             print(drone.position)
 
-        self.arrows = []
-        self.context_labels = []
-
-    def clear_arrows(self, ax):
-        for arrow in self.arrows:
-            arrow.remove()
-        self.arrows = []
-        plt.draw()
-
-    def draw_scenario_labels(self, ax):
-        for i, (pos, abbr) in enumerate(self.scenario_map.items()):
-            x, y = pos
-            ax.text(x + 0.1, y + 0.1, abbr, fontsize=8, ha='left', va='bottom', color='red')
-            ax.scatter(x, y, c='red', s=100, edgecolor='black', zorder=5)
-
-    def annotate_historical_context(self, ax):
-        # display historical context
-        for i, drone in enumerate(self.drones):
-            label = ax.text(drone.position.x + 0.1, drone.position.y + 0.1, drone.historical_data.get_prompt(drone.id), fontsize=8, ha='left', va='bottom')
-            label2 = ax.text(drone.position.x + 0.1, drone.position.y + 0.4, drone.current_data.get_prompt(drone.id), fontsize=8, ha='left', va='bottom')
-            self.context_labels.append(label)
-            self.context_labels.append(label2)
-
-    def clear_context(self, ax):
-        for label in self.context_labels:
-            label.remove()
-        self.context_labels = []
-        plt.draw()
-    
-    def tick(self, ax, texts):
-        self.clear_arrows(ax)
-        self.clear_context(ax)
-        
-        # Draw scenario labels
-        self.draw_scenario_labels(ax)
-
-        for drone in self.drones:
-            drone.move()
-            pos = drone.position
-            if (pos.x, pos.y) in self.scenario_map:
-                # In real life, the drone's perception stack derives a message from the scenario. We are mocking this here.
-                state = State(drone.id, pos, SCENARIO_DICT[self.scenario_map[(pos.x, pos.y)]], "")
-                message = Message()
-                message.data = {drone.id: state}
-                drone.update_current_data(message)
-
-        for drone in self.drones:
-            broad_cast_lst = []
-            for other_drone in self.drones:
-                if drone != other_drone and drone.can_communicate(other_drone, 4):
-                    broad_cast_lst.append(other_drone)
-
-            # Draw arrows for broadcasting information
-            for neighbor in broad_cast_lst:
-                arrow = ax.annotate(
-                    '', xy=(neighbor.position.x, neighbor.position.y), xytext=(drone.position.x, drone.position.y),
-                    arrowprops=dict(arrowstyle="->", color='blue')
-                )
-                self.arrows.append(arrow)
-
-            drone.set_neighbors(broad_cast_lst)
-
-        for drone in self.drones:
-            drone.update()
-
-        # Update texts for each drone's historical context
-        for i, drone in enumerate(self.drones):
-            texts[i].set_text(f'Drone {drone.id}')
-            texts[i].set_position((drone.position.x, drone.position.y))
-
-        self.annotate_historical_context(ax)
+    @property
+    def scenario_map(self) -> dict:
+        """{(x, y): kind} of the currently active scenario events."""
+        return self.perception.scenario_map
+
+    def add_observer(self, observer) -> None:
+        """Registers a callable that is invoked with the simulator after every step."""
+        self._observers.append(observer)
+
+    def remove_observer(self, observer) -> None:
+        self._observers.remove(observer)
+
+    def step(self) -> None:
+        """Advances the simulation by one tick. No rendering happens here."""
+        metrics = self.metrics
+        with metrics.phase("move"):
+            self.path_planner.set_obstacles(self.perception.cells(BLOCKING_SCENARIOS))
+            if self.swarm is not None:
+                self.swarm.move(self.path_planner)
+            for i, drone in enumerate(self.drones):
+                if self.swarm is not None:
+                    drone.map.visit_cell(drone.position)
+                else:
+                    drone.move(self.path_planner)
+                pos = drone.position
+                self._index.move(i, pos.x, pos.y)
+
+        with metrics.phase("perceive"):
+            self.perception.step()
+            if self.swarm is not None:
+                positions = self.swarm.positions
+            else:
+                positions = [(drone.position.x, drone.position.y) for drone in self.drones]
+            # In real life, the drone's perception stack derives a message from the scenario. We are mocking this here.
+            detected = self.perception.nearest(positions)
+            self.detections = []
+            for i in np.flatnonzero(detected >= 0):
+                self.drones[i].observe(self.perception.perception_context(detected[i]))
+                self.detections.append((self.drones[i].id, int(detected[i])))
+
+        with metrics.phase("neighbors"):
+            for i, drone in enumerate(self.drones):
+                # Keep the list order of the drones so broadcasts happen in the same order as a full scan.
+                self.neighbors[drone.id] = [self.drones[j] for j in sorted(self._index.neighbors(i))]
+
+        with metrics.phase("gossip"):
+            self.gossip_counters = GossipCounters(self.codec)
+            for drone in self.drones:
+                drone.set_neighbors(self.neighbors[drone.id], self.gossip_counters)
+            self.gossip_totals.add(self.gossip_counters)
+        if self.coverage is not None:
+            with metrics.phase("coverage"):
+                self.coverage.step(self.drones, self.neighbors)
+        if metrics.enabled:
+            # Planning archives current data, so its size peaks here.
+            self._record_data_sizes("current_data")
+
+        with metrics.phase("plan"):
+            if self.planning_stage is not None:
+                self.planner_calls = self.planning_stage.update(self.drones)
+            else:
+                self.planner_calls = []
+                for drone in self.drones:
+                    call = drone.update(self.planner)
+                    if call is not None:
+                        self.planner_calls.append((drone.id, *call))
+
+        self.tick_count += 1
+        if metrics.enabled:
+            self._record_metrics()
+        with metrics.phase("observers"):
+            for observer in self._observers:
+                observer(self)
+
+    def _record_data_sizes(self, name: str) -> None:
+        sizes = [len(getattr(drone, name).data) for drone in self.drones]
+        self.metrics.set_gauge(f"{name}_states", sum(sizes), stat="total")
+        self.metrics.set_gauge(f"{name}_states", max(sizes, default=0), stat="max")
+
+    def _record_metrics(self) -> None:
+        """Per-tick counters and gauges that are not timed inside a phase."""
+        metrics = self.metrics
+        metrics.increment("ticks")
+        metrics.increment("planner_calls", len(self.planner_calls))
+        metrics.increment("gossip_messages", self.gossip_counters.messages)
+        metrics.increment("gossip_bytes", self.gossip_counters.bytes)
+        metrics.increment("gossip_states", self.gossip_counters.states)
+        metrics.increment("gossip_full_bytes", self.gossip_counters.full_bytes)
+        self._record_data_sizes("historical_data")
+        if self.coverage is not None:
+            stats = self.coverage.history[-1]
+            metrics.increment("coverage_bytes", stats["bytes"])
+            metrics.increment("coverage_messages", stats["messages"])
+            metrics.set_gauge("coverage", stats["coverage"])
+            metrics.set_gauge("known_coverage", stats["known_coverage"])
+        for planner in (self.planner, getattr(self.planning_stage, "planner", None)):
+            cache = getattr(planner, "cache", None)
+            if cache is not None:
+                stats = cache.stats
+                for key in ("hits", "disk_hits", "misses", "evictions", "size"):
+                    metrics.set_gauge(f"cache_{key}", stats[key])
+        for key in ("timeouts", "failures", "abandoned"):
+            if hasattr(self.planning_stage, key):
+                metrics.set_gauge(f"planning_{key}", getattr(self.planning_stage, key))
+
+    def run(self, n_ticks: int) -> float:
+        """Runs n_ticks steps back to back and returns the achieved ticks per second."""
+        start = time.perf_counter()
+        for _ in range(n_ticks):
+            self.step()
+        elapsed = time.perf_counter() - start
+        return n_ticks / elapsed if elapsed > 0 else float("inf")
 
     def get_all_positions(self):
         return [drone.position for drone in self.drones]
 
-def tick_simulator(simulator, scatter, texts, ax):
-    simulator.tick(ax, texts)
-    all_positions = simulator.get_all_positions()
-    x_data = [pos.x for pos in all_positions]
-    y_data = [pos.y for pos in all_positions]
-
-    scatter.set_offsets(np.c_[x_data, y_data])
-
-    for text, pos in zip(texts, all_positions):
-        text.set_position((pos.x, pos.y))
-
-    plt.draw()
-
-def on_key_press(event, simulator, scatter, texts, ax):
+def on_key_press(event, simulator):
     if event.key == 'enter':
-        tick_simulator(simulator, scatter, texts, ax)
-
-def main():
-    map_dimensions = (9, 9)  # Map size (9x9 grid)
-    region_dimensions = (3, 3)  # Region (3x3 grid)
-    num_drones = 4  # Number of drones
-    simulator = Simulator(map_dimensions=map_dimensions, region_dimensions=region_dimensions, num_drones=num_drones)
+        simulator.step()
+
+def parse_dimensions(text: str) -> tuple[int, int]:
+    """Parses dimensions written as WIDTHxHEIGHT, e.g. 9x9."""
+    try:
+        width, height = (int(value) for value in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got {text!r}.")
+    return width, height
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive swarm simulation. Press enter to step.")
+    parser.add_argument("--map", type=parse_dimensions, default=(9, 9), help="map size, e.g. 9x9")
+    parser.add_argument("--regions", type=parse_dimensions, default=(3, 3), help="region size, e.g. 3x3")
+    parser.add_argument("--drones", type=int, default=4, help="number of drones")
+    parser.add_argument("--threshold", type=int, default=4, help="communication threshold in cells")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a reproducible run")
+    parser.add_argument("--vectorized", action="store_true", help="move the swarm in batched array operations")
+    parser.add_argument("--planner", type=parse_planner_config, default="replicate", help='planner backend name or JSON config, e.g. rules or \'{"backend": "recorded", "trace": "run.trace"}\'')
+    args = parser.parse_args(argv)
+    map_dimensions = args.map
+    simulator = Simulator(map_dimensions=map_dimensions, region_dimensions=args.regions, num_drones=args.drones, communication_threshold=args.threshold, vectorized=args.vectorized, seed=args.seed, planner=make_planner(args.planner))
+
+    # Rendering is only imported here, so headless users of the simulator never load matplotlib.
+    import matplotlib.pyplot as plt
+    from renderer import SwarmRenderer, describe_scenarios
 
     fig, ax = plt.subplots()
-    ax.set_xlim(-0.5, map_dimensions[0] - 0.5)
-    ax.set_ylim(-0.5, map_dimensions[1] - 0.5)
+    renderer = SwarmRenderer(ax, map_dimensions)
+    describe_scenarios(ax, simulator.scenario_map)
 
-    # Initialize drones with dummy data to match the number of colors
-    initial_positions = np.zeros((num_drones, 2))
-    colors = ['red', 'blue', 'green', 'purple']
-    scatter = ax.scatter(initial_positions[:, 0], initial_positions[:, 1], c=colors[:num_drones], s=100)
-    texts = [ax.text(0, 0, '', fontsize=8, ha='center', va='center', color='black', bbox=dict(facecolor='white', alpha=0.5)) for _ in range(num_drones)]
-
-    # Draw grid
-    ax.set_xticks(np.arange(0.5, map_dimensions[0], 1), minor=False)
-    ax.set_yticks(np.arange(0.5, map_dimensions[1], 1), minor=False)
-    ax.grid(which='major', color='gray', linestyle='--', linewidth=0.5)
+    # The UI is just another observer of the headless simulation.
+    simulator.add_observer(renderer)
+    renderer(simulator)
 
     # Connect the key press event
-    fig.canvas.mpl_connect('key_press_event', lambda event: on_key_press(event, simulator, scatter, texts, ax))
-
-    # Add scenario descriptions below the plot
-    for i, (_, abbr) in enumerate(simulator.scenario_map.items()):
-        text = abbr + ": " + SCENARIO_DICT[abbr]
-        plt.annotate(text, (0,0), (0, -20 - i * 10), xycoords='axes fraction', textcoords='offset points', va='top')
+    fig.canvas.mpl_connect('key_press_event', lambda event: on_key_press(event, simulator))
 
     plt.show()
 
@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+from simulator import *
+from robot.drone import Position
+from robot.coverage import CoverageExchange
+from robot.planning import ConcurrentPlanner, FakePlanner
+
+class StubPlanner:
+    @staticmethod
+    def execute_prompt(prompt: str) -> str:
+        return "up"
+
+def test_headless_run():
+    simulator = Simulator((9,9), (3,3), 20, planner=StubPlanner)
+    ticks = []
+    simulator.add_observer(lambda sim: ticks.append(sim.tick_count))
+    ticks_per_second = simulator.run(50)
+    assert ticks_per_second > 0
+    assert simulator.tick_count == 50
+    assert ticks == list(range(1, 51))
+    for drone in simulator.drones:
+        assert 0 <= drone.position.x < 9 and 0 <= drone.position.y < 9
+
+def test_vectorized_run():
+    simulator = Simulator((12,10), (3,3), 30, planner=StubPlanner, vectorized=True)
+    simulator.run(50)
+    for drone in simulator.drones:
+        assert 0 <= drone.position.x < 12 and 0 <= drone.position.y < 10
+        assert drone.position == Position(*simulator.swarm.get_xy(drone.id))
+
+def test_concurrent_planning_stage():
+    planner = FakePlanner(latency=0.001)
+    simulator = Simulator((9,9), (3,3), 20, planning_stage=ConcurrentPlanner(planner, max_concurrency=4))
+    simulator.run(30)
+    assert simulator.tick_count == 30
+    for drone in simulator.drones:
+        # Everything is archived but a fresh answer, which waits for the next exchange.
+        assert all(id == drone.id and state.inference_result for id, state in drone.current_data.data.items())
+
+def test_gossip_counters():
+    simulator = Simulator((9,9), (3,3), 40, planner=StubPlanner)
+    messages = events = 0
+    for _ in range(30):
+        simulator.step()
+        counters = simulator.gossip_counters
+        assert counters.messages >= counters.states
+        messages += counters.messages
+        events += len(counters.events)
+    assert simulator.gossip_totals.messages == messages
+    # Only the per-tick counters keep events, so the totals don't grow with the run.
+    assert events and not simulator.gossip_totals.events
+
+def test_neighbors_recorded():
+    simulator = Simulator((9,9), (3,3), 10, planner=StubPlanner)
+    simulator.step()
+    for drone in simulator.drones:
+        for neighbor in simulator.neighbors[drone.id]:
+            assert neighbor is not drone
+            assert drone.can_communicate(neighbor, simulator.communication_threshold)
+        expected = [other for other in simulator.drones if other is not drone and drone.can_communicate(other, simulator.communication_threshold)]
+        assert simulator.neighbors[drone.id] == expected
+
+def test_coverage_exchange():
+    def run(coverage):
+        simulator = Simulator((20,20), (3,3), 15, planner=StubPlanner, seed=3, metrics=Metrics(), coverage=coverage)
+        simulator.run(40)
+        return simulator
+    alone, shared = run(None), run(CoverageExchange((20,20)))
+    history = shared.coverage.history
+    assert len(history) == 40
+    assert shared.metrics.counter("coverage_bytes") == sum(stats["bytes"] for stats in history) > 0
+    assert shared.metrics.gauge("known_coverage") == history[-1]["known_coverage"]
+    # Merged maps know about more visited cells than the drones' own visits.
+    known = lambda simulator: sum(drone.map.visited_cells for drone in simulator.drones)
+    assert known(shared) > known(alone)
+
+def test_headless_imports_are_light():
+    # A headless worker neither renders nor calls the remote model.
+    code = "import sys, simulator, sweep, events; print(sorted(m for m in ('matplotlib', 'replicate', 'renderer') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+def test_rule_based_planner_backend():
+    simulator = Simulator((12,12), (3,3), 10, planner=make_planner("rules"), seed=5, metrics=Metrics())
+    simulator.run(20)
+    calls = simulator.metrics.counter("llm_calls")
+    assert calls > 0 and simulator.metrics.counter("llm_failures") == 0
+    replay = Simulator((12,12), (3,3), 10, planner=make_planner("rules"), seed=5)
+    replay.run(20)
+    assert [drone.position for drone in replay.drones] == [drone.position for drone in simulator.drones]
+
+if __name__ == "__main__":
+    test_headless_run()
+    test_vectorized_run()
+    test_concurrent_planning_stage()
+    test_gossip_counters()
+    test_neighbors_recorded()
+    test_coverage_exchange()
+    test_headless_imports_are_light()
+    test_rule_based_planner_backend()
@@ -0,0 +1,177 @@
+"""
+Parameter sweeps over simulator configurations.
+
+A sweep is the cartesian product of a grid of parameter values, repeated `repeats` times.
+Every run gets its own seed, spawned from the sweep seed with np.random.SeedSequence, so
+runs are independent, reproducible and do not depend on which worker process ran them.
+Runs are fanned out over a process pool and each result is appended to a JSON lines file
+as soon as its run finishes.
+
+Run from src/: python sweep.py --map 20x20 40x40 --drones 10 40 --repeats 3 --output sweep.jsonl
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from robot.planner import make_planner
+from robot.planning import REGION_OFFSETS, FakePlanner
+from simulator import Simulator, make_perception, parse_dimensions
+
+# Planner backends by name. Each takes the random stream of the run.
+PLANNERS = {
+    "random": lambda rng: FakePlanner(response=lambda prompt: rng.choice(list(REGION_OFFSETS)), rng=rng),
+    "up": lambda rng: FakePlanner(response="up", rng=rng),
+    "rules": lambda rng: make_planner("rules"),
+    "llm": lambda rng: make_planner("replicate"),
+}
+
+DEFAULT_GRID = {
+    "map_dimensions": [(20, 20)],
+    "region_dimensions": [(3, 3)],
+    "num_drones": [10],
+    "communication_threshold": [4],
+    "planner": ["random"],
+}
+
+def expand_grid(grid: dict, repeats: int = 1) -> list[dict]:
+    """Every combination of the grid values, `repeats` times, with a repeat index."""
+    grid = {**DEFAULT_GRID, **grid}
+    names = list(grid)
+    return [dict(zip(names, values), repeat=repeat) for values in itertools.product(*grid.values()) for repeat in range(repeats)]
+
+def run_seeds(num_runs: int, seed: int) -> list[int]:
+    """One independent seed per run."""
+    return [int(child.generate_state(1, dtype=np.uint64)[0]) for child in np.random.SeedSequence(seed).spawn(num_runs)]
+
+class RunStatistics:
+    """Observer collecting the outcome metrics of a run."""
+    def __init__(self, map_dimensions):
+        self._visited = np.zeros((map_dimensions[1], map_dimensions[0]), dtype=bool)
+        self.coverage = []
+        self.first_discovery = None
+        self.llm_calls = 0
+
+    def __call__(self, simulator) -> None:
+        if simulator.swarm is not None:
+            positions = simulator.swarm.positions
+        else:
+            positions = np.array([(drone.position.x, drone.position.y) for drone in simulator.drones], dtype=np.int64).reshape(-1, 2)
+        self._visited[positions[:, 1], positions[:, 0]] = True
+        self.coverage.append(float(self._visited.mean()))
+        self.llm_calls += len(simulator.planner_calls)
+        if self.first_discovery is None:
+            for _, event in simulator.detections:
+                if simulator.perception.event(event)[0] == "trapped_person":
+                    self.first_discovery = simulator.tick_count
+                    break
+
+def stream_seeds(seed: int) -> dict[str, int]:
+    """Seeds of the independent random streams of a run, spawned from the run seed."""
+    names = ("planner", "scenario", "drones")
+    return {name: int(child.generate_state(1, dtype=np.uint64)[0]) for name, child in zip(names, np.random.SeedSequence(seed).spawn(len(names)))}
+
+def run_one(config: dict, seed: int, n_ticks: int, stop_on_discovery: bool = False) -> dict:
+    """Runs one configuration and returns its outcome metrics."""
+    seeds = stream_seeds(seed)
+    start = time.perf_counter()
+    map_dimensions = tuple(config["map_dimensions"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulator = Simulator(
+            map_dimensions=map_dimensions,
+            region_dimensions=tuple(config["region_dimensions"]),
+            num_drones=config["num_drones"],
+            communication_threshold=config["communication_threshold"],
+            planner=PLANNERS[config["planner"]](random.Random(seeds["planner"])),
+            seed=seeds["drones"],
+            perception=make_perception(map_dimensions, seeds["scenario"]),
+        )
+    statistics = RunStatistics(simulator.perception.map_dimensions)
+    simulator.add_observer(statistics)
+    for _ in range(n_ticks):
+        simulator.step()
+        if stop_on_discovery and statistics.first_discovery is not None:
+            break
+    return {
+        **config,
+        "seed": seed,
+        "ticks": simulator.tick_count,
+        "time_to_trapped_person": statistics.first_discovery,
+        "final_coverage": statistics.coverage[-1] if statistics.coverage else 0.0,
+        "coverage": statistics.coverage,
+        "llm_calls": statistics.llm_calls,
+        "gossip_messages": simulator.gossip_totals.messages,
+        "gossip_bytes": simulator.gossip_totals.bytes,
+        "wall_seconds": time.perf_counter() - start,
+    }
+
+def sweep(configs: list[dict], n_ticks: int, seed: int = 0, workers: int | None = None, output: str | None = None, stop_on_discovery: bool = False):
+    """
+    Runs every configuration over a process pool and yields the results as they finish.
+    With an output path, every result is also appended to that JSON lines file right away.
+    """
+    seeds = run_seeds(len(configs), seed)
+    with contextlib.ExitStack() as stack:
+        file = stack.enter_context(open(output, "a")) if output else None
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        futures = {pool.submit(run_one, config, run_seed, n_ticks, stop_on_discovery): index for index, (config, run_seed) in enumerate(zip(configs, seeds))}
+        for future in as_completed(futures):
+            result = {"run": futures[future], **future.result()}
+            if file is not None:
+                file.write(json.dumps(result) + "\n")
+                file.flush()
+            yield result
+
+def summarize(results: list[dict]) -> list[dict]:
+    """Mean outcome metrics over the repeats of every configuration."""
+    groups = {}
+    for result in results:
+        key = json.dumps({name: result[name] for name in DEFAULT_GRID})
+        groups.setdefault(key, []).append(result)
+    summaries = []
+    for key, group in groups.items():
+        found = [result["time_to_trapped_person"] for result in group if result["time_to_trapped_person"] is not None]
+        summaries.append({
+            **json.loads(key),
+            "runs": len(group),
+            "found_fraction": len(found) / len(group),
+            "mean_time_to_trapped_person": float(np.mean(found)) if found else None,
+            "mean_final_coverage": float(np.mean([result["final_coverage"] for result in group])),
+            "mean_llm_calls": float(np.mean([result["llm_calls"] for result in group])),
+        })
+    return summaries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--map", type=parse_dimensions, nargs="+", default=DEFAULT_GRID["map_dimensions"], help="map sizes, e.g. 20x20 40x40")
+    parser.add_argument("--regions", type=parse_dimensions, nargs="+", default=DEFAULT_GRID["region_dimensions"], help="region sizes, e.g. 3x3")
+    parser.add_argument("--drones", type=int, nargs="+", default=DEFAULT_GRID["num_drones"], help="drone counts")
+    parser.add_argument("--threshold", type=int, nargs="+", default=DEFAULT_GRID["communication_threshold"], help="communication thresholds")
+    parser.add_argument("--planner", choices=PLANNERS, nargs="+", default=DEFAULT_GRID["planner"], help="planner backends")
+    parser.add_argument("--repeats", type=int, default=1, help="runs per configuration")
+    parser.add_argument("--ticks", type=int, default=200, help="ticks per run")
+    parser.add_argument("--seed", type=int, default=0, help="sweep seed")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--stop-on-discovery", action="store_true", help="end a run once the trapped person is found")
+    parser.add_argument("--output", default="sweep.jsonl", help="JSON lines file the results are appended to")
+    args = parser.parse_args(argv)
+    configs = expand_grid({
+        "map_dimensions": args.map,
+        "region_dimensions": args.regions,
+        "num_drones": args.drones,
+        "communication_threshold": args.threshold,
+        "planner": args.planner,
+    }, args.repeats)
+    results = []
+    for result in sweep(configs, args.ticks, args.seed, args.workers, args.output, args.stop_on_discovery):
+        results.append(result)
+        print(f"run {result['run']} finished ({len(results)}/{len(configs)}): found at tick {result['time_to_trapped_person']}, coverage {result['final_coverage']:.2f}")
+    for summary in summarize(results):
+        print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import json
+from sweep import *
+
+def without_timing(result):
+    return {name: value for name, value in result.items() if name not in ("wall_seconds", "run")}
+
+def test_expand_grid():
+    configs = expand_grid({"num_drones": [5, 10], "map_dimensions": [(10, 10), (12, 8)]}, repeats=3)
+    assert len(configs) == 12
+    assert {config["repeat"] for config in configs} == {0, 1, 2}
+    assert all(config["planner"] == "random" for config in configs)
+
+def test_run_seeds_are_reproducible():
+    seeds = run_seeds(50, 7)
+    assert seeds == run_seeds(50, 7)
+    assert len(set(seeds)) == 50
+    assert seeds != run_seeds(50, 8)
+
+def test_run_streams_are_independent():
+    seeds = stream_seeds(3)
+    assert seeds == stream_seeds(3)
+    assert len(set(seeds.values())) == 3 and 3 not in seeds.values()
+    # The planner's choices do not follow the draws that placed the scenarios.
+    planner, scenario = random.Random(seeds["planner"]), random.Random(seeds["scenario"])
+    assert [planner.random() for _ in range(5)] != [scenario.random() for _ in range(5)]
+
+def test_run_one_is_deterministic():
+    config = expand_grid({"map_dimensions": [(12, 10)], "num_drones": [15]})[0]
+    first, second = run_one(config, 3, 60), run_one(config, 3, 60)
+    assert without_timing(first) == without_timing(second)
+    assert len(first["coverage"]) == 60
+    assert first["coverage"] == sorted(first["coverage"])
+    assert 0 < first["final_coverage"] <= 1
+
+def test_sweep_streams_results(tmp_path):
+    configs = expand_grid({"map_dimensions": [(10, 10)], "num_drones": [4, 8]}, repeats=2)
+    output = tmp_path / "sweep.jsonl"
+    results = list(sweep(configs, 30, seed=1, workers=2, output=str(output)))
+    assert sorted(result["run"] for result in results) == [0, 1, 2, 3]
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(lines) == 4
+    # A run's result does not depend on the process it ran in.
+    seeds = run_seeds(len(configs), 1)
+    for line in lines:
+        expected = json.loads(json.dumps(run_one(configs[line["run"]], seeds[line["run"]], 30)))
+        assert without_timing(line) == without_timing(expected)
+    summaries = summarize(results)
+    assert len(summaries) == 2 and all(summary["runs"] == 2 for summary in summaries)
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    test_expand_grid()
+    test_run_seeds_are_reproducible()
+    test_run_streams_are_independent()
+    test_run_one_is_deterministic()
+    test_sweep_streams_results(pathlib.Path(tempfile.mkdtemp()))